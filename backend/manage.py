@@ -0,0 +1,64 @@
+"""
+UNIFY maintenance commands
+
+Usage:
+    python manage.py bcrypt-benchmark [--min-rounds 10] [--max-rounds 14] [--samples 3]
+    python manage.py rebuild-platform-counters
+    python manage.py rebuild-lead-rollups
+"""
+import argparse
+import asyncio
+
+
+def bcrypt_benchmark(args):
+    from services.password_service import benchmark, password_service
+
+    print(f"Configured BCRYPT_ROUNDS: {password_service.rounds}")
+    print(f"{'rounds':>6}  {'hash_ms':>10}  {'verify_ms':>10}")
+    for row in benchmark(range(args.min_rounds, args.max_rounds + 1), args.samples):
+        print(f"{row['rounds']:>6}  {row['hash_ms']:>10.2f}  {row['verify_ms']:>10.2f}")
+
+
+def rebuild_platform_counters(args):
+    from server import platform_counters
+
+    counters = asyncio.run(platform_counters.rebuild())
+    if counters is None:
+        print("Another worker is rebuilding platform counters; try again shortly")
+        return
+    for field in ("_id", "updated_at", "built_at"):
+        counters.pop(field, None)
+    print(f"Platform counters rebuilt: {counters}")
+
+
+def rebuild_lead_rollups(args):
+    from server import lead_rollups
+
+    if asyncio.run(lead_rollups.refresh(full=True)):
+        print("Lead rollups rebuilt")
+    else:
+        print("Another worker is refreshing lead rollups; try again shortly")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNIFY maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser("bcrypt-benchmark", help="Time bcrypt hash/verify per cost factor")
+    bench.add_argument("--min-rounds", type=int, default=10)
+    bench.add_argument("--max-rounds", type=int, default=14)
+    bench.add_argument("--samples", type=int, default=3)
+    bench.set_defaults(func=bcrypt_benchmark)
+
+    counters = subparsers.add_parser("rebuild-platform-counters", help="Recompute super admin dashboard counters")
+    counters.set_defaults(func=rebuild_platform_counters)
+
+    rollups = subparsers.add_parser("rebuild-lead-rollups", help="Recompute daily lead analytics rollups")
+    rollups.set_defaults(func=rebuild_lead_rollups)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,14 @@ class DocumentStatus(str, Enum):
     REJECTED = "rejected"
 
 
+class DocumentProcessingStatus(str, Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    READY = "ready"
+    INVALID = "invalid"  # content does not match the declared type, or is unreadable
+    FAILED = "failed"
+
+
 class Document(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -26,6 +34,14 @@ class Document(BaseModel):
     file_url: str
     file_type: str  # pdf, jpg, png
     file_size: int  # in bytes
+    sha256: Optional[str] = None  # content-addressed blob key; None for legacy files
+    
+    # Post-upload pipeline
+    processing_status: Optional[DocumentProcessingStatus] = None  # None for documents uploaded before it existed
+    processing_error: Optional[str] = None
+    detected_type: Optional[str] = None  # from magic bytes, e.g. "pdf", "jpeg"
+    page_count: Optional[int] = None
+    original_size: Optional[int] = None  # bytes before normalization, if the file was recompressed
     
     # Verification
     status: DocumentStatus = DocumentStatus.UPLOADED
@@ -28,6 +28,50 @@ class LeadSource(str, Enum):
     OTHER_API = "other_api"
 
 
+# Conversion funnel steps, in order
+LEAD_FUNNEL_STEPS = ["total", "contacted", "interested", "applied", "converted"]
+
+# Furthest funnel step each stage has reached. Drop-out stages sit at the
+# step where the lead left the pipeline.
+LEAD_STAGE_FUNNEL: Dict[str, str] = {
+    LeadStage.NEW_LEAD.value: "total",
+    LeadStage.CONTACTED.value: "contacted",
+    LeadStage.NOT_INTERESTED.value: "contacted",
+    LeadStage.CLOSED_LOST.value: "contacted",
+    LeadStage.INTERESTED.value: "interested",
+    LeadStage.FOLLOW_UP_SCHEDULED.value: "interested",
+    LeadStage.APPLICATION_STARTED.value: "applied",
+    LeadStage.DOCUMENTS_PENDING.value: "applied",
+    LeadStage.DOCUMENTS_SUBMITTED.value: "applied",
+    LeadStage.FEE_PENDING.value: "applied",
+    LeadStage.FEE_PAID.value: "converted",
+    LeadStage.ADMISSION_CONFIRMED.value: "converted",
+}
+
+
+def funnel_counts(
+    stage_counts: Dict[Optional[str], int],
+    steps: List[str] = LEAD_FUNNEL_STEPS,
+    stage_funnel: Dict[str, str] = LEAD_STAGE_FUNNEL
+) -> Dict[str, int]:
+    """Cumulative funnel from per-stage lead counts.
+
+    A lead counts toward every step up to the one its stage has reached.
+    Stages missing from stage_funnel are treated as past the first step.
+    """
+    reached = [0] * len(steps)
+    for stage, count in stage_counts.items():
+        step = stage_funnel.get(stage)
+        reached[steps.index(step) if step in steps else min(1, len(steps) - 1)] += count
+
+    funnel = {}
+    remaining = sum(reached)
+    for step, count in zip(steps, reached):
+        funnel[step] = remaining
+        remaining -= count
+    return funnel
+
+
 class TimelineEventType(str, Enum):
     CREATED = "created"
     ASSIGNED = "assigned"
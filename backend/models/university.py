@@ -95,6 +95,7 @@ class University(BaseModel):
     about: Optional[str] = None
     facilities: List[str] = []
     gallery: List[str] = []  # Image URLs
+    gallery_variants: List[Dict[str, Any]] = []  # {url, original, thumb, medium, full, width, height}
     brochures: List[Dict[str, str]] = []  # {name, url}
     
     is_active: bool = True
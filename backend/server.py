@@ -1,38 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Query, Body
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query, Body, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import RedirectResponse
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel as PydanticBaseModel
+from pymongo import ReturnDocument
+from pydantic import BaseModel as PydanticBaseModel, Field
 import os
 import logging
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 import jwt
-import bcrypt
 import uuid
 import json
 import hmac
 import hashlib
+import asyncio
+import time
+import mimetypes
+import re
 
 # Models
 from models.user import User, UserCreate, UserLogin, UserRole, Token, StudentLogin, UserUpdate
 from models.university import (
     University, UniversityCreate, UniversityUpdate, 
-    RegistrationConfig, RegistrationConfigUpdate, RazorpayConfig
+    RegistrationConfig, RegistrationConfigUpdate, RazorpayConfig, DocumentRequirement
 )
 from models.lead import (
     Lead, LeadCreate, LeadUpdate, LeadStage, LeadSource,
     LeadAssignment, LeadNote, LeadFollowUp, LeadStageUpdate,
-    LeadBulkReassign, TimelineEntry, TimelineEventType, Note, FollowUp
+    LeadBulkReassign, TimelineEntry, TimelineEventType, Note, FollowUp, funnel_counts
 )
 from models.application import (
     Application, ApplicationCreate, ApplicationStatus, ApplicationStep,
     ApplicationBasicInfo, ApplicationEducationalDetails, ApplicationCourseSelection, EducationalDetail
 )
 from models.payment import Payment, PaymentCreate, PaymentVerify, PaymentStatus, TransferStatus, Refund
-from models.document import Document, DocumentConfig, DocumentUpload, DocumentStatus, DocumentVerification
+from models.document import Document, DocumentConfig, DocumentUpload, DocumentStatus, DocumentVerification, DocumentProcessingStatus
 from models.test import (
     Question, QuestionCreate, QuestionUpdate, QuestionBank,
     TestConfig, TestConfigCreate, TestAttempt, TestAnswer, TestSubmit, TestResult
@@ -45,6 +50,25 @@ from models.department import (
 from models.email_log import EmailLog, EmailType, EmailStatus
 from models.query import StudentQuery, QueryCreate, QueryReply, QueryUpdate, QueryStatus, QueryMessage
 from services.email_service import email_service
+from services.password_service import password_service, PasswordServiceBusy
+from services.token_cache import token_cache
+from services.last_login_buffer import last_login_buffer
+from services.login_limiter import login_limiter, LoginRateLimited
+from services.token_revocation import token_revocation
+from services.platform_counters import platform_counters
+from services.query_cache import QueryCache
+from services.lead_rollups import lead_rollups
+from services.university_cache import university_cache
+from services.upload_service import upload_service, UploadError, ReceivedUpload
+from services.document_storage import document_storage
+from services.file_serving import serve_file
+from services.image_service import image_service, InvalidImage
+from services.document_pipeline import document_pipeline
+from services.resumable_uploads import resumable_uploads, OffsetMismatch
+from services.lead_import_jobs import ImportRowTooLarge, lead_import_jobs
+from services.lead_import import import_batch_size, normalize_email, normalize_phone, normalize_existing_leads
+from services.lead_files import LEAD_FILE_TYPES, LeadFileError, lead_file_max_bytes, parse_column_mapping, read_lead_file
+from services.lead_import_keys import lead_import_keys, HASH_FIELD as LEAD_IMPORT_KEY_HASH_FIELD
 
 
 ROOT_DIR = Path(__file__).parent
@@ -54,6 +78,14 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+platform_counters.bind(db)
+lead_rollups.bind(db)
+university_cache.bind(db.universities)
+document_storage.bind(db.document_blobs)
+document_pipeline.bind(db.documents)
+resumable_uploads.bind(db.resumable_uploads)
+lead_import_jobs.bind(db)
+lead_import_keys.bind(db.universities)
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'unify-secret-key-change-in-production')
@@ -96,17 +128,67 @@ logger = logging.getLogger(__name__)
 
 # ============== UTILITY FUNCTIONS ==============
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    try:
+        return await password_service.hash(password)
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await password_service.verify(password, hashed)
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
 
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def admit_login(request: Request, account_key: str):
+    """Reject throttled login attempts before any database or bcrypt work"""
+    client_address = login_limiter.client_address(
+        request.client.host if request.client else None, request.headers.get("x-forwarded-for")
+    )
+    try:
+        login_limiter.admit(account_key, client_address)
+    except LoginRateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def verify_login_password(password: str, hashed: str) -> bool:
+    """Verify a login password within the global verification cap"""
+    try:
+        with login_limiter.verification_slot():
+            return await verify_password(password, hashed)
+    except LoginRateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def rehash_password(user_id: str, password: str, old_hash: str):
+    """Re-hash a password stored with an outdated bcrypt cost factor"""
+    try:
+        new_hash = await password_service.hash(password)
+        # Only replace the hash we verified against, never a newer one
+        await db.users.update_one(
+            {"id": user_id, "password_hash": old_hash},
+            {"$set": {"password_hash": new_hash}}
+        )
+    except Exception as e:
+        logger.error(f"Failed to rehash password for user {user_id}: {str(e)}")
 
 
 def create_token(user_data: dict) -> str:
     payload = {
         **user_data,
+        "jti": uuid.uuid4().hex,
+        # Sub-second so a token issued right after a revoke_user_tokens cutoff stays valid
+        "iat": time.time(),
         "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
@@ -122,10 +204,26 @@ def decode_token(token: str) -> dict:
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    token_data = decode_token(credentials.credentials)
+    token = credentials.credentials
+    token_data = token_cache.get(token)
+    if token_data is None:
+        token_data = decode_token(token)
+        token_cache.put(token, token_data)
+    
+    # Checked on every request; user cutoffs are in memory and only Bloom
+    # filter hits reach the database
+    if token_revocation.is_user_revoked(token_data.get("id"), token_data.get("iat")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    if await token_revocation.is_revoked(token_data.get("jti")):
+        raise HTTPException(status_code=401, detail="Token revoked")
     return token_data
 
 
+async def revoke_user_tokens(user_id: str):
+    """Sign a user out everywhere; other workers see it within one revocation sync"""
+    await token_revocation.revoke_user(user_id, timedelta(hours=JWT_EXPIRATION_HOURS))
+
+
 def require_roles(*roles: UserRole):
     async def role_checker(current_user: dict = Depends(get_current_user)):
         if current_user.get("role") not in [r.value for r in roles]:
@@ -145,6 +243,47 @@ def serialize_doc(doc: dict) -> dict:
     return doc
 
 
+async def receive_upload(request: Request, file_field: str, prepare) -> ReceivedUpload:
+    """Stream a multipart upload to a temp file, mapping upload errors to HTTP errors"""
+    try:
+        return await upload_service.receive(request, file_field, prepare)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+def file_extension(file_name: str) -> str:
+    return Path(file_name).suffix.lower().lstrip(".")
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that identify one version of a response"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def doc_etag(doc: dict, *parts) -> str:
+    """ETag for a document whose writes all bump updated_at"""
+    return make_etag(doc.get("id"), doc.get("updated_at") or doc.get("created_at"), *parts)
+
+
+def university_etag(university: dict, *parts) -> str:
+    """ETag for a university document versioned by university_cache"""
+    return doc_etag(university, university.get("config_version", 0), *parts)
+
+
+def not_modified(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    """Attach validators to the response; return a 304 if the client already has this version"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match uses weak comparison, so a W/ prefix still matches
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 async def add_timeline_entry(
     lead_id: str,
     event_type: TimelineEventType,
@@ -170,8 +309,36 @@ async def add_timeline_entry(
     )
 
 
+async def update_payment_status(query: dict, update: dict) -> Optional[dict]:
+    """Update a payment and move platform counters if its status changed"""
+    previous = await db.payments.find_one_and_update(
+        query,
+        update,
+        projection={"_id": 0, "status": 1, "amount": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    new_status = update.get("$set", {}).get("status")
+    if previous and new_status and previous.get("status") != new_status:
+        await platform_counters.payment_status_changed(previous.get("status"), new_status, previous.get("amount", 0))
+    return previous
+
+
 # ============== STARTUP ==============
 
+async def run_migration(name: str, migrate):
+    """Run a one-off data migration unless it has already completed"""
+    if await db.migrations.find_one({"_id": name}):
+        return
+    try:
+        await migrate()
+    except Exception as e:
+        logger.error(f"Migration {name} failed: {str(e)}")
+        return
+    await db.migrations.update_one(
+        {"_id": name}, {"$set": {"completed_at": datetime.now(timezone.utc)}}, upsert=True
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database with super admin if not exists"""
@@ -179,9 +346,44 @@ async def startup_event():
     await db.users.create_index("email", unique=True, sparse=True)
     await db.users.create_index([("university_id", 1), ("person_id", 1)], unique=True, sparse=True)
     await db.universities.create_index("code", unique=True)
+    await db.universities.create_index("config_updated_at")
+    await db.universities.create_index(LEAD_IMPORT_KEY_HASH_FIELD, unique=True, sparse=True)
     await db.leads.create_index([("university_id", 1), ("email", 1)])
     await db.leads.create_index([("university_id", 1), ("phone", 1)])
+    await db.leads.create_index([("university_id", 1), ("created_at", 1)])
+    await db.leads.create_index("updated_at")
     await db.applications.create_index("application_number", unique=True)
+    await db.applications.create_index([("university_id", 1), ("created_at", 1)])
+    await db.applications.create_index("updated_at")
+    await db.revoked_tokens.create_index("jti", unique=True)
+    await db.revoked_tokens.create_index("revoked_at")
+    await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+    await db.pending_uploads.create_index("id", unique=True)
+    await db.pending_uploads.create_index("expires_at", expireAfterSeconds=0)
+    await db.documents.create_index([("processing_status", 1), ("created_at", 1)])
+    await db.documents.create_index([("student_id", 1), ("sha256", 1)])
+    await db.resumable_uploads.create_index("id", unique=True)
+    await db.resumable_uploads.create_index("expires_at")
+    await db.lead_import_jobs.create_index("id", unique=True)
+    await db.lead_import_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.lead_import_jobs.create_index([("university_id", 1), ("created_at", -1)])
+    await db.lead_import_chunks.create_index([("job_id", 1), ("index", 1)], unique=True)
+    # Backstop for chunks of jobs that never finished staging
+    await db.lead_import_chunks.create_index("created_at", expireAfterSeconds=7 * 24 * 3600)
+    
+    last_login_buffer.start(db.users)
+    await token_revocation.start(db.revoked_tokens)
+    await platform_counters.ensure()
+    await lead_import_keys.ensure()
+    await lead_rollups.start()
+    university_cache.start()
+    lead_import_keys.start()
+    document_pipeline.start()
+    resumable_uploads.start()
+    lead_import_jobs.start()
+    
+    # Leads stored before emails and phones were normalized; safe to run concurrently
+    asyncio.create_task(run_migration("normalize_lead_contacts", lambda: normalize_existing_leads(db.leads)))
     
     # Create super admin if not exists
     super_admin = await db.users.find_one({"email": "admin@unify.com"})
@@ -190,7 +392,7 @@ async def startup_event():
             email="admin@unify.com",
             name="Super Admin",
             role=UserRole.SUPER_ADMIN,
-            password_hash=hash_password("9939350820@#!")
+            password_hash=await hash_password("9939350820@#!")
         )
         await db.users.insert_one(admin.model_dump())
         logger.info("Super Admin created: admin@unify.com")
@@ -198,13 +400,23 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await last_login_buffer.stop()
+    await token_revocation.stop()
+    await lead_rollups.stop()
+    await university_cache.stop()
+    await lead_import_keys.stop()
+    await document_pipeline.stop()
+    await resumable_uploads.stop()
+    await lead_import_jobs.stop()
     client.close()
+    password_service.shutdown()
+    image_service.shutdown()
 
 
 # ============== AUTH ROUTES ==============
 
 @auth_router.post("/login", response_model=Token)
-async def login(login_data: UserLogin):
+async def login(login_data: UserLogin, request: Request, background_tasks: BackgroundTasks):
     """
     Universal login endpoint.
     - Super Admin: uses email + password
@@ -215,9 +427,13 @@ async def login(login_data: UserLogin):
     
     if login_data.email and login_data.role == UserRole.SUPER_ADMIN:
         # Super Admin login
+        account_key = f"super_admin:{login_data.email.lower()}"
+        admit_login(request, account_key)
         user = await db.users.find_one({"email": login_data.email, "role": "super_admin"}, {"_id": 0})
     elif login_data.university_id and login_data.person_id and login_data.role:
         # University staff login
+        account_key = f"{login_data.role.value}:{login_data.university_id}:{login_data.person_id}"
+        admit_login(request, account_key)
         user = await db.users.find_one({
             "university_id": login_data.university_id,
             "person_id": login_data.person_id,
@@ -232,14 +448,16 @@ async def login(login_data: UserLogin):
     if not user.get("is_active", True):
         raise HTTPException(status_code=401, detail="Account is deactivated")
     
-    if not verify_password(login_data.password, user["password_hash"]):
+    if not await verify_login_password(login_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Update last login
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
-    )
+    login_limiter.reset_account(account_key)
+    
+    if password_service.needs_rehash(user["password_hash"]):
+        background_tasks.add_task(rehash_password, user["id"], login_data.password, user["password_hash"])
+    
+    # Update last login (flushed in bulk by the write-behind buffer)
+    last_login_buffer.record(user["id"], datetime.now(timezone.utc).isoformat())
     
     token_data = {
         "id": user["id"],
@@ -257,8 +475,11 @@ async def login(login_data: UserLogin):
 
 
 @auth_router.post("/student/login", response_model=Token)
-async def student_login(login_data: StudentLogin):
+async def student_login(login_data: StudentLogin, request: Request, background_tasks: BackgroundTasks):
     """Student login with email and password"""
+    account_key = f"student:{login_data.email.lower()}"
+    admit_login(request, account_key)
+    
     user = await db.users.find_one({
         "email": login_data.email,
         "role": "student"
@@ -270,14 +491,16 @@ async def student_login(login_data: StudentLogin):
     if not user.get("is_active", True):
         raise HTTPException(status_code=401, detail="Account is deactivated")
     
-    if not verify_password(login_data.password, user["password_hash"]):
+    if not await verify_login_password(login_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Update last login
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
-    )
+    login_limiter.reset_account(account_key)
+    
+    if password_service.needs_rehash(user["password_hash"]):
+        background_tasks.add_task(rehash_password, user["id"], login_data.password, user["password_hash"])
+    
+    # Update last login (flushed in bulk by the write-behind buffer)
+    last_login_buffer.record(user["id"], datetime.now(timezone.utc).isoformat())
     
     token_data = {
         "id": user["id"],
@@ -293,6 +516,18 @@ async def student_login(login_data: StudentLogin):
     )
 
 
+@auth_router.post("/logout")
+async def logout(current_user: dict = Depends(get_current_user)):
+    """Revoke the current access token"""
+    if current_user.get("jti"):
+        await token_revocation.revoke(
+            jti=current_user["jti"],
+            user_id=current_user["id"],
+            expires_at=datetime.fromtimestamp(current_user["exp"], tz=timezone.utc)
+        )
+    return {"message": "Logged out successfully"}
+
+
 @auth_router.get("/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
@@ -313,7 +548,7 @@ async def change_password(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not bcrypt.checkpw(current_password.encode('utf-8'), user["password_hash"].encode('utf-8')):
+    if not await verify_password(current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Validate new password
@@ -321,13 +556,16 @@ async def change_password(
         raise HTTPException(status_code=400, detail="New password must be at least 8 characters")
     
     # Hash new password and update
-    new_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_hash = await hash_password(new_password)
     await db.users.update_one(
         {"id": current_user["id"]},
         {"$set": {"password_hash": new_hash, "updated_at": datetime.now(timezone.utc)}}
     )
+    # Sign out other sessions; this one continues with a fresh token
+    await revoke_user_tokens(current_user["id"])
+    token_data = {key: current_user[key] for key in ("id", "email", "name", "role", "university_id") if key in current_user}
     
-    return {"message": "Password changed successfully"}
+    return {"message": "Password changed successfully", "access_token": create_token(token_data)}
 
 
 # ============== SUPER ADMIN ROUTES ==============
@@ -335,31 +573,23 @@ async def change_password(
 @superadmin_router.get("/dashboard")
 async def superadmin_dashboard(current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))):
     """Get super admin dashboard stats"""
-    total_universities = await db.universities.count_documents({})
-    active_universities = await db.universities.count_documents({"is_active": True})
-    total_students = await db.users.count_documents({"role": "student"})
-    total_leads = await db.leads.count_documents({})
-    total_applications = await db.applications.count_documents({})
-    
-    # Payment stats
-    payment_pipeline = [
-        {"$group": {
-            "_id": "$status",
-            "count": {"$sum": 1},
-            "total": {"$sum": "$amount"}
-        }}
-    ]
-    payment_stats = await db.payments.aggregate(payment_pipeline).to_list(100)
+    # Materialized counters maintained on the write paths
+    counters = await platform_counters.read()
+    universities = counters.get("universities", {})
     
     return {
         "universities": {
-            "total": total_universities,
-            "active": active_universities
+            "total": universities.get("total", 0),
+            "active": universities.get("active", 0)
         },
-        "students": total_students,
-        "leads": total_leads,
-        "applications": total_applications,
-        "payments": {stat["_id"]: {"count": stat["count"], "total": stat["total"]} for stat in payment_stats}
+        "students": counters.get("students", 0),
+        "leads": counters.get("leads", 0),
+        "applications": counters.get("applications", 0),
+        "payments": {
+            status: {"count": stat.get("count", 0), "total": stat.get("total", 0)}
+            for status, stat in counters.get("payments", {}).items()
+            if stat.get("count", 0) > 0
+        }
     }
 
 
@@ -376,6 +606,10 @@ async def create_university(
     
     university = University(**university_data.model_dump())
     await db.universities.insert_one(university.model_dump())
+    await platform_counters.increment({
+        "universities.total": 1,
+        "universities.active": 1 if university.is_active else 0
+    })
     
     return serialize_doc(university.model_dump())
 
@@ -416,7 +650,7 @@ async def get_university(
     current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))
 ):
     """Get university details"""
-    university = await db.universities.find_one({"id": university_id}, {"_id": 0})
+    university = await university_cache.get(university_id)
     if not university:
         raise HTTPException(status_code=404, detail="University not found")
     return serialize_doc(university)
@@ -432,13 +666,19 @@ async def update_university(
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.universities.update_one(
+    previous = await db.universities.find_one_and_update(
         {"id": university_id},
-        {"$set": update_dict}
+        university_cache.versioned({"$set": update_dict}),
+        projection={"_id": 0, "is_active": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="University not found")
+    university_cache.invalidate(university_id)
+    
+    if "is_active" in update_dict and update_dict["is_active"] != previous.get("is_active", True):
+        await platform_counters.increment({"universities.active": 1 if update_dict["is_active"] else -1})
     
     university = await db.universities.find_one({"id": university_id}, {"_id": 0})
     return serialize_doc(university)
@@ -474,10 +714,11 @@ async def create_university_admin(
         await db.users.update_one(
             {"id": existing["id"]},
             {"$set": {
-                "password_hash": hash_password(password),
+                "password_hash": await hash_password(password),
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }}
         )
+        await revoke_user_tokens(existing["id"])
         return {"message": "Admin password updated successfully", "person_id": person_id}
     else:
         # Create new admin
@@ -487,33 +728,81 @@ async def create_university_admin(
             role=UserRole.UNIVERSITY_ADMIN,
             university_id=university_id,
             person_id=person_id,
-            password_hash=hash_password(password)
+            password_hash=await hash_password(password)
         )
         await db.users.insert_one(user.model_dump())
         return {"message": "Admin created successfully", "person_id": person_id, "user_id": user.id}
 
 
+SYSTEM_STATS_COLLECTIONS = ["users", "universities", "leads", "applications", "payments", "questions", "test_attempts"]
+
+
+async def collection_stats(name: str) -> dict:
+    """Size figures for one collection from metadata, without scanning it"""
+    started = time.perf_counter()
+    try:
+        stats = await db.command("collStats", name)
+        result = {
+            "count": stats.get("count", 0),
+            "storage_size": stats.get("storageSize", 0),
+            "index_size": stats.get("totalIndexSize", 0)
+        }
+    except Exception:
+        # collStats can be restricted on managed clusters; fall back to the estimate
+        result = {
+            "count": await db[name].estimated_document_count(),
+            "storage_size": None,
+            "index_size": None
+        }
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
 @superadmin_router.get("/system/stats")
 async def system_stats(current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))):
     """Get system statistics"""
-    # Database stats
-    collections = ["users", "universities", "leads", "applications", "payments", "questions", "test_attempts"]
-    db_stats = {}
-    for coll in collections:
-        count = await db[coll].count_documents({})
-        db_stats[coll] = count
+    started = time.perf_counter()
     
-    # Recent activity
-    recent_users = await db.users.find({}, {"_id": 0, "password_hash": 0}).sort("created_at", -1).limit(5).to_list(5)
-    recent_leads = await db.leads.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    # Collection stats and recent activity are independent, so run them together
+    results = await asyncio.gather(
+        *[collection_stats(coll) for coll in SYSTEM_STATS_COLLECTIONS],
+        db.users.find({}, {"_id": 0, "password_hash": 0}).sort("created_at", -1).limit(5).to_list(5),
+        db.leads.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    )
+    coll_stats = dict(zip(SYSTEM_STATS_COLLECTIONS, results[:len(SYSTEM_STATS_COLLECTIONS)]))
+    recent_users, recent_leads = results[len(SYSTEM_STATS_COLLECTIONS):]
     
     return {
-        "database_stats": db_stats,
+        "database_stats": {coll: stats["count"] for coll, stats in coll_stats.items()},
+        "collection_stats": coll_stats,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
         "recent_users": [serialize_doc(u) for u in recent_users],
         "recent_leads": [serialize_doc(l) for l in recent_leads]
     }
 
 
+@superadmin_router.get("/system/metrics")
+async def system_metrics(current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))):
+    """Get in-process performance metrics for this worker"""
+    return {
+        "password_hashing": password_service.stats(),
+        "token_cache": token_cache.stats(),
+        "last_login_buffer": last_login_buffer.stats(),
+        "login_limiter": login_limiter.stats(),
+        "token_revocation": token_revocation.stats(),
+        "lead_rollups": lead_rollups.stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "university_cache": university_cache.stats(),
+        "lead_import_keys": lead_import_keys.stats(),
+        "uploads": upload_service.stats(),
+        "document_storage": document_storage.stats(),
+        "image_derivatives": image_service.stats(),
+        "document_pipeline": document_pipeline.stats(),
+        "resumable_uploads": resumable_uploads.stats(),
+        "lead_import_jobs": lead_import_jobs.stats()
+    }
+
+
 @superadmin_router.get("/system/email-logs")
 async def email_logs(
     page: int = Query(1, ge=1),
@@ -532,39 +821,109 @@ async def email_logs(
     }
 
 
-@superadmin_router.get("/payments/overview")
-async def payments_overview(
-    current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))
-):
-    """Get platform-wide payment overview"""
+PAYMENT_OVERVIEW_SORT_FIELDS = [
+    "university_name", "total_collected", "total_refunded", "successful_payments",
+    "failed_payments", "pending_transfers", "successful_transfers"
+]
+PAYMENT_OVERVIEW_TOTAL_FIELDS = PAYMENT_OVERVIEW_SORT_FIELDS[1:]
+
+# Platform-wide payment rollups are refreshed at most once a minute
+payments_overview_cache = QueryCache(ttl=60)
+
+# Dashboards are cached per (view, tenant, user scope) for a few seconds so a
+# room full of managers opening the same page shares one set of queries
+dashboard_cache = QueryCache(ttl=float(os.environ.get('DASHBOARD_CACHE_SECONDS', 15)))
+
+
+async def cached_dashboard(key: tuple, compute) -> dict:
+    """Serve a dashboard payload from dashboard_cache, reporting its age"""
+    data, age = await dashboard_cache.get_with_age(key, compute)
+    return {**data, "cache_age_seconds": round(age, 1)}
+
+
+async def compute_payments_overview(page: int, limit: int, sort_by: str, order: str, search: Optional[str] = None) -> dict:
+    """Group payments per university, then join each group to its university once.
+
+    search filters the listed universities by name; totals stay platform-wide.
+    """
+    matching = [{"$match": {"university_name": {"$regex": re.escape(search), "$options": "i"}}}] if search else []
     pipeline = [
-        {"$lookup": {
-            "from": "universities",
-            "localField": "university_id",
-            "foreignField": "id",
-            "as": "university"
-        }},
-        {"$unwind": {"path": "$university", "preserveNullAndEmptyArrays": True}},
         {"$group": {
             "_id": "$university_id",
-            "university_name": {"$first": "$university.name"},
             "total_collected": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, "$amount", 0]}},
             "total_refunded": {"$sum": {"$cond": [{"$eq": ["$status", "refunded"]}, "$refund_amount", 0]}},
             "successful_payments": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}},
             "failed_payments": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}},
             "pending_transfers": {"$sum": {"$cond": [{"$eq": ["$transfer_status", "pending"]}, "$amount", 0]}},
             "successful_transfers": {"$sum": {"$cond": [{"$eq": ["$transfer_status", "success"]}, "$transfer_amount", 0]}}
+        }},
+        {"$lookup": {
+            "from": "universities",
+            "let": {"university_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$university_id"]}}},
+                {"$project": {"_id": 0, "name": 1, "kyc_status": "$razorpay_config.kyc_status"}}
+            ],
+            "as": "university"
+        }},
+        {"$addFields": {
+            "university_name": {"$arrayElemAt": ["$university.name", 0]},
+            "kyc_status": {"$ifNull": [{"$arrayElemAt": ["$university.kyc_status", 0]}, "pending"]}
+        }},
+        {"$project": {"university": 0}},
+        {"$facet": {
+            "data": [
+                *matching,
+                {"$sort": {sort_by: 1 if order == "asc" else -1, "_id": 1}},
+                {"$skip": (page - 1) * limit},
+                {"$limit": limit}
+            ],
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "universities": {"$sum": 1},
+                    **{field: {"$sum": f"${field}"} for field in PAYMENT_OVERVIEW_TOTAL_FIELDS}
+                }},
+                {"$project": {"_id": 0}}
+            ],
+            "matched": [*matching, {"$count": "universities"}]
         }}
     ]
     
-    stats = await db.payments.aggregate(pipeline).to_list(1000)
+    result = (await db.payments.aggregate(pipeline).to_list(1))[0]
+    totals = result["totals"][0] if result["totals"] else {field: 0 for field in ["universities", *PAYMENT_OVERVIEW_TOTAL_FIELDS]}
+    totals.pop("universities")
+    total = result["matched"][0]["universities"] if result["matched"] else 0
     
-    # Add KYC status from university
-    for stat in stats:
-        university = await db.universities.find_one({"id": stat["_id"]}, {"_id": 0, "razorpay_config": 1})
-        stat["kyc_status"] = university.get("razorpay_config", {}).get("kyc_status", "pending") if university else "pending"
-    
-    return {"data": stats}
+    return {
+        "data": result["data"],
+        "totals": totals,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit
+    }
+
+
+@superadmin_router.get("/payments/overview")
+async def payments_overview(
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: str = Query("total_collected"),
+    order: str = Query("desc"),
+    search: Optional[str] = Query(None, description="Filter universities by name"),
+    current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))
+):
+    """Get platform-wide payment overview"""
+    if sort_by not in PAYMENT_OVERVIEW_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(PAYMENT_OVERVIEW_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    return await payments_overview_cache.get_or_compute(
+        (page, limit, sort_by, order, search or None),
+        lambda: compute_payments_overview(page, limit, sort_by, order, search or None)
+    )
 
 
 @superadmin_router.get("/analytics")
@@ -572,23 +931,22 @@ async def platform_analytics(
     current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN))
 ):
     """Get platform analytics"""
-    # University-wise lead counts
-    lead_pipeline = [
-        {"$group": {"_id": "$university_id", "count": {"$sum": 1}}}
+    # Counts come from the daily rollups rather than the leads and applications collections
+    rollup_pipeline = [
+        {"$facet": {
+            "by_university": [{"$group": {"_id": "$university_id", "count": {"$sum": "$count"}}}],
+            "by_stage": [{"$group": {"_id": "$stage", "count": {"$sum": "$count"}}}]
+        }}
     ]
-    leads_by_university = await db.leads.aggregate(lead_pipeline).to_list(1000)
-    
-    # Application counts by status
     app_pipeline = [
-        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-    ]
-    apps_by_status = await db.applications.aggregate(app_pipeline).to_list(100)
-    
-    # Lead stage distribution
-    stage_pipeline = [
-        {"$group": {"_id": "$stage", "count": {"$sum": 1}}}
+        {"$group": {"_id": "$status", "count": {"$sum": "$count"}}}
     ]
-    leads_by_stage = await db.leads.aggregate(stage_pipeline).to_list(100)
+    rollups, apps_by_status = await asyncio.gather(
+        db.lead_daily_rollups.aggregate(rollup_pipeline).to_list(1),
+        db.application_daily_rollups.aggregate(app_pipeline).to_list(100)
+    )
+    leads_by_university = rollups[0]["by_university"]
+    leads_by_stage = rollups[0]["by_stage"]
     
     return {
         "leads_by_university": {item["_id"]: item["count"] for item in leads_by_university if item["_id"]},
@@ -606,19 +964,27 @@ async def university_dashboard(current_user: dict = Depends(require_roles(UserRo
     if not university_id:
         raise HTTPException(status_code=400, detail="University ID required")
     
-    total_leads = await db.leads.count_documents({"university_id": university_id})
-    total_applications = await db.applications.count_documents({"university_id": university_id})
-    total_staff = await db.users.count_documents({
-        "university_id": university_id,
-        "role": {"$in": ["counselling_manager", "counsellor"]}
-    })
-    
+    return await cached_dashboard(
+        ("university", university_id),
+        lambda: compute_university_dashboard(university_id)
+    )
+
+
+async def compute_university_dashboard(university_id: str) -> dict:
     # Lead stage distribution
     stage_pipeline = [
         {"$match": {"university_id": university_id}},
         {"$group": {"_id": "$stage", "count": {"$sum": 1}}}
     ]
-    leads_by_stage = await db.leads.aggregate(stage_pipeline).to_list(100)
+    total_leads, total_applications, total_staff, leads_by_stage = await asyncio.gather(
+        db.leads.count_documents({"university_id": university_id}),
+        db.applications.count_documents({"university_id": university_id}),
+        db.users.count_documents({
+            "university_id": university_id,
+            "role": {"$in": ["counselling_manager", "counsellor"]}
+        }),
+        db.leads.aggregate(stage_pipeline).to_list(100)
+    )
     
     return {
         "total_leads": total_leads,
@@ -633,10 +999,7 @@ async def get_university_config(
     current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN))
 ):
     """Get university registration configuration"""
-    university = await db.universities.find_one(
-        {"id": current_user["university_id"]},
-        {"_id": 0}
-    )
+    university = await university_cache.get(current_user["university_id"])
     if not university:
         raise HTTPException(status_code=404, detail="University not found")
     return serialize_doc(university)
@@ -657,8 +1020,9 @@ async def update_registration_config(
     
     await db.universities.update_one(
         {"id": current_user["university_id"]},
-        {"$set": update_dict}
+        university_cache.versioned({"$set": update_dict})
     )
+    university_cache.invalidate(current_user["university_id"])
     
     university = await db.universities.find_one({"id": current_user["university_id"]}, {"_id": 0})
     return serialize_doc(university)
@@ -695,59 +1059,69 @@ async def update_university_profile(
     
     await db.universities.update_one(
         {"id": current_user["university_id"]},
-        {"$set": update_dict}
+        university_cache.versioned({"$set": update_dict})
     )
+    university_cache.invalidate(current_user["university_id"])
     
     university = await db.universities.find_one({"id": current_user["university_id"]}, {"_id": 0})
     return {"message": "Profile updated successfully", "data": serialize_doc(university)}
 
 
+GALLERY_ALLOWED_TYPES = ["jpg", "jpeg", "png", "webp"]
+GALLERY_MAX_SIZE_MB = 5
+
+
 @university_router.post("/gallery/upload")
 async def upload_gallery_image(
-    file_name: str = Body(...),
-    file_type: str = Body(...),
-    file_data: str = Body(...),
+    request: Request,
     current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN))
 ):
-    """Upload a gallery image (base64 encoded)"""
-    import base64
-    
-    # Validate file type
-    allowed_types = ["jpg", "jpeg", "png", "webp"]
-    ext = file_type.lower().replace(".", "")
-    if ext not in allowed_types:
-        raise HTTPException(status_code=400, detail=f"File type {ext} not allowed")
+    """Upload a gallery image (multipart/form-data with a 'file' part)"""
+    async def prepare(fields: dict, file_name: str) -> int:
+        ext = file_extension(file_name)
+        if ext not in GALLERY_ALLOWED_TYPES:
+            raise HTTPException(status_code=400, detail=f"File type {ext} not allowed")
+        return GALLERY_MAX_SIZE_MB * 1024 * 1024
     
-    # Create upload directory
-    upload_dir = Path(f"/app/uploads/gallery/{current_user['university_id']}")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    upload = await receive_upload(request, "file", prepare)
     
     # Generate unique filename
     image_id = str(uuid.uuid4())
-    safe_filename = f"{image_id}.{ext}"
-    file_path = upload_dir / safe_filename
+    safe_filename = f"{image_id}.{file_extension(upload.file_name)}"
+    gallery_dir = Path(f"/app/uploads/gallery/{current_user['university_id']}")
+    await upload.move_to(gallery_dir / safe_filename)
     
-    # Decode and save file
+    # Resized WebP variants; the gallery entry itself points at the "full" one
     try:
-        file_bytes = base64.b64decode(file_data)
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to save file: {str(e)}")
+        rendered = await image_service.render_variants(upload.path, gallery_dir, image_id)
+    except InvalidImage:
+        await upload.discard()
+        raise HTTPException(status_code=400, detail="File is not a valid image")
     
-    # Generate URL
-    image_url = f"/uploads/gallery/{current_user['university_id']}/{safe_filename}"
+    url_prefix = f"/uploads/gallery/{current_user['university_id']}"
+    variants = {name: f"{url_prefix}/{variant['file_name']}" for name, variant in rendered.items()}
+    image_url = variants["full"]
     
     # Add to university gallery array
     await db.universities.update_one(
         {"id": current_user["university_id"]},
-        {
-            "$push": {"gallery": image_url},
+        university_cache.versioned({
+            "$push": {
+                "gallery": image_url,
+                "gallery_variants": {
+                    "url": image_url,
+                    "original": f"{url_prefix}/{safe_filename}",
+                    "width": rendered["full"]["width"],
+                    "height": rendered["full"]["height"],
+                    **variants
+                }
+            },
             "$set": {"updated_at": datetime.now(timezone.utc)}
-        }
+        })
     )
+    university_cache.invalidate(current_user["university_id"])
     
-    return {"message": "Image uploaded successfully", "image_url": image_url}
+    return {"message": "Image uploaded successfully", "image_url": image_url, "variants": variants}
 
 
 @university_router.delete("/gallery")
@@ -757,25 +1131,55 @@ async def delete_gallery_image(
 ):
     """Delete a gallery image"""
     # Remove from array
-    await db.universities.update_one(
+    previous = await db.universities.find_one_and_update(
         {"id": current_user["university_id"]},
-        {
-            "$pull": {"gallery": image_url},
+        university_cache.versioned({
+            "$pull": {"gallery": image_url, "gallery_variants": {"url": image_url}},
             "$set": {"updated_at": datetime.now(timezone.utc)}
-        }
+        }),
+        projection={"_id": 0, "gallery_variants": {"$elemMatch": {"url": image_url}}},
+        return_document=ReturnDocument.BEFORE
     )
+    university_cache.invalidate(current_user["university_id"])
     
-    # Delete file
-    try:
-        file_path = Path(f"/app{image_url}")
-        if file_path.exists():
-            file_path.unlink()
-    except Exception:
-        pass
+    # Delete files, including the original and every derivative
+    urls = {image_url}
+    for entry in (previous or {}).get("gallery_variants", []):
+        urls.update(entry.get(name) for name in ("original", "thumb", "medium", "full"))
+    for url in filter(None, urls):
+        try:
+            file_path = Path(f"/app{url}")
+            if file_path.exists():
+                file_path.unlink()
+        except Exception:
+            pass
     
     return {"message": "Image deleted successfully"}
 
 
+# Lead Import Webhook Key
+@university_router.post("/integrations/lead-import-key")
+async def rotate_lead_import_key(
+    current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN))
+):
+    """Issue a new API key for the lead import webhook, replacing the current one.
+
+    The key is shown only in this response; only its hash is stored.
+    """
+    issued = await lead_import_keys.rotate(current_user["university_id"])
+    return {"message": "Lead import API key generated", **serialize_doc(issued)}
+
+
+@university_router.delete("/integrations/lead-import-key")
+async def revoke_lead_import_key(
+    current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN))
+):
+    """Revoke the lead import webhook API key"""
+    if not await lead_import_keys.revoke(current_user["university_id"]):
+        raise HTTPException(status_code=404, detail="No lead import API key configured")
+    return {"message": "Lead import API key revoked"}
+
+
 # Staff Management
 @university_router.post("/staff")
 async def create_staff(
@@ -801,7 +1205,7 @@ async def create_staff(
         university_id=current_user["university_id"],
         person_id=staff_data.person_id,
         phone=staff_data.phone,
-        password_hash=hash_password(staff_data.password)
+        password_hash=await hash_password(staff_data.password)
     )
     
     await db.users.insert_one(user.model_dump())
@@ -809,7 +1213,7 @@ async def create_staff(
     # Send credentials email to staff
     if staff_data.email:
         try:
-            university = await db.universities.find_one({"id": current_user["university_id"]})
+            university = await university_cache.get(current_user["university_id"])
             await email_service.send_staff_credentials_email(
                 to_email=staff_data.email,
                 to_name=staff_data.name,
@@ -863,13 +1267,36 @@ async def reset_staff_password(
     """Reset staff password"""
     result = await db.users.update_one(
         {"id": user_id, "university_id": current_user["university_id"]},
-        {"$set": {"password_hash": hash_password(new_password)}}
+        {"$set": {"password_hash": await hash_password(new_password)}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await revoke_user_tokens(user_id)
     return {"message": "Password reset successfully"}
 
 
+@university_router.put("/staff/{user_id}/status")
+async def update_staff_status(
+    user_id: str,
+    is_active: bool = Body(..., embed=True),
+    current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN))
+):
+    """Activate or deactivate a staff account"""
+    result = await db.users.update_one(
+        {
+            "id": user_id,
+            "university_id": current_user["university_id"],
+            "role": {"$in": ["counselling_manager", "counsellor"]}
+        },
+        {"$set": {"is_active": is_active, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not is_active:
+        await revoke_user_tokens(user_id)
+    return {"message": "Staff activated" if is_active else "Staff deactivated"}
+
+
 # Department Management
 @university_router.post("/departments")
 async def create_department(
@@ -1005,20 +1432,22 @@ async def create_lead(
     """Create a new lead"""
     university_id = current_user["university_id"]
     
+    # Leads are stored normalized, so "+91 98765 43210" matches "919876543210"
+    email = normalize_email(lead_data.email)
+    phone = normalize_phone(lead_data.phone)
+    
     # Check for duplicate (same email or phone in this university)
+    conditions = [{"email": email}] + ([{"phone": phone}] if phone else [])
     existing = await db.leads.find_one({
         "university_id": university_id,
-        "$or": [
-            {"email": lead_data.email},
-            {"phone": lead_data.phone}
-        ]
+        "$or": conditions
     })
     if existing:
         raise HTTPException(status_code=400, detail="Lead with this email or phone already exists")
     
     lead = Lead(
         university_id=university_id,
-        **lead_data.model_dump()
+        **{**lead_data.model_dump(), "email": email, "phone": phone}
     )
     
     # Add creation timeline entry
@@ -1030,67 +1459,67 @@ async def create_lead(
     ))
     
     await db.leads.insert_one(lead.model_dump())
+    await platform_counters.increment({"leads": 1})
     return serialize_doc(lead.model_dump())
 
 
-@lead_router.post("/bulk-upload")
+@lead_router.post("/bulk-upload", status_code=202)
 async def bulk_upload_leads(
     leads: List[dict] = Body(..., embed=True),
     current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER))
 ):
-    """Bulk upload leads from CSV data (Counselling Manager only)"""
-    university_id = current_user["university_id"]
-    
-    created = 0
-    failed = 0
-    duplicates = 0
-    
-    for lead_data in leads:
+    """Queue a bulk upload of leads from CSV data (Counselling Manager only).
+
+    Returns 202 with a job id; poll GET /leads/import-jobs/{job_id} for progress.
+    """
+    job = await queue_lead_import(
+        "bulk_upload", current_user["university_id"], current_user["id"], current_user["name"], leads
+    )
+    return import_job_accepted(job)
+
+
+@lead_router.post("/import-file", status_code=202)
+async def import_lead_file(
+    request: Request,
+    current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER))
+):
+    """Queue a bulk upload of leads from a CSV or XLSX file (Counselling Manager only).
+
+    multipart/form-data with an optional 'mapping' field (JSON object of lead
+    field -> column header) followed by a 'file' part. The file is read in
+    batches, so large files do not have to fit in memory.
+    """
+    mapping = None
+
+    async def prepare(fields: dict, file_name: str) -> int:
+        nonlocal mapping
+        ext = file_extension(file_name)
+        if ext not in LEAD_FILE_TYPES:
+            raise HTTPException(status_code=400, detail=f"File type {ext} not allowed; upload a CSV or XLSX file")
         try:
-            # Skip if missing required fields
-            if not lead_data.get('name') or not (lead_data.get('email') or lead_data.get('phone')):
-                failed += 1
-                continue
-            
-            # Check for duplicate
-            query_conditions = []
-            if lead_data.get('email'):
-                query_conditions.append({"email": lead_data['email']})
-            if lead_data.get('phone'):
-                query_conditions.append({"phone": lead_data['phone']})
-            
-            existing = await db.leads.find_one({
-                "university_id": university_id,
-                "$or": query_conditions
-            }) if query_conditions else None
-            
-            if existing:
-                duplicates += 1
-                continue
-            
-            lead = Lead(
-                university_id=university_id,
-                name=lead_data.get('name', ''),
-                email=lead_data.get('email', ''),
-                phone=lead_data.get('phone', ''),
-                source=lead_data.get('source', 'bulk_upload'),
-                course_interest=lead_data.get('course_interest', '')
-            )
-            
-            lead.timeline.append(TimelineEntry(
-                event_type=TimelineEventType.CREATED,
-                description="Lead imported via bulk upload",
-                created_by=current_user["id"],
-                created_by_name=current_user["name"]
-            ))
-            
-            await db.leads.insert_one(lead.model_dump())
-            created += 1
-            
-        except Exception as e:
-            failed += 1
-    
-    return {"created": created, "failed": failed, "duplicates": duplicates}
+            mapping = parse_column_mapping(fields.get("mapping"))
+        except LeadFileError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return lead_file_max_bytes()
+
+    upload = await receive_upload(request, "file", prepare)
+    try:
+        writer = await lead_import_jobs.begin(
+            "bulk_upload", current_user["university_id"], current_user["id"], current_user["name"]
+        )
+        try:
+            async for batch in read_lead_file(upload.path, file_extension(upload.file_name), mapping, import_batch_size()):
+                await writer.add_many(batch)
+        except (LeadFileError, ImportRowTooLarge) as e:
+            await writer.discard()
+            raise HTTPException(status_code=400, detail=str(e))
+        except BaseException:
+            await writer.discard()
+            raise
+        job = await writer.submit()
+    finally:
+        await upload.discard()
+    return import_job_accepted(job)
 
 
 @lead_router.put("/assignment-rules")
@@ -1105,7 +1534,7 @@ async def update_assignment_rules(
     
     await db.universities.update_one(
         {"id": university_id},
-        {"$set": {
+        university_cache.versioned({"$set": {
             "assignment_rules": {
                 "enabled": enabled,
                 "method": method,
@@ -1113,8 +1542,9 @@ async def update_assignment_rules(
                 "updated_at": datetime.now(timezone.utc)
             },
             "updated_at": datetime.now(timezone.utc)
-        }}
+        }})
     )
+    university_cache.invalidate(university_id)
     
     return {"message": "Assignment rules updated"}
 
@@ -1128,153 +1558,51 @@ class ThirdPartyLeadImport(PydanticBaseModel):
     api_key: Optional[str] = None
 
 
-@lead_router.post("/import/shiksha")
+async def queue_lead_import(kind: str, university_id: str, created_by: str, created_by_name: str,
+                            rows: List[Any], source: Optional[str] = None) -> dict:
+    """Stage rows as an import job; a row too large to stage is refused"""
+    try:
+        return await lead_import_jobs.submit_rows(kind, university_id, created_by, created_by_name, rows, source=source)
+    except ImportRowTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def import_job_accepted(job: dict) -> dict:
+    return {
+        "message": "Import queued",
+        "job_id": job["id"],
+        "status": job["status"],
+        "total_rows": job["total_rows"]
+    }
+
+
+@lead_router.post("/import/shiksha", status_code=202)
 async def import_shiksha_leads(
     data: ThirdPartyLeadImport,
     current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER, UserRole.UNIVERSITY_ADMIN))
 ):
-    """Import leads from Shiksha platform"""
-    university_id = current_user["university_id"]
-    
-    created = 0
-    failed = 0
-    duplicates = 0
-    
-    for lead_data in data.leads:
-        try:
-            # Check for duplicates
-            query_conditions = []
-            if lead_data.get('email'):
-                query_conditions.append({"email": lead_data['email']})
-            if lead_data.get('phone'):
-                query_conditions.append({"phone": lead_data['phone']})
-            
-            existing = await db.leads.find_one({
-                "university_id": university_id,
-                "$or": query_conditions
-            }) if query_conditions else None
-            
-            if existing:
-                duplicates += 1
-                continue
-            
-            lead = Lead(
-                university_id=university_id,
-                name=lead_data.get('name', ''),
-                email=lead_data.get('email', ''),
-                phone=lead_data.get('phone', ''),
-                source=LeadSource.SHIKSHA,
-                source_details=lead_data.get('campaign', 'Shiksha Import'),
-                course_interest=lead_data.get('course_interest', ''),
-                notes=[]
-            )
-            
-            # Add initial note with source info
-            if lead_data.get('inquiry_details'):
-                lead.notes.append(Note(
-                    content=f"Shiksha Inquiry: {lead_data.get('inquiry_details')}",
-                    created_by="system",
-                    created_by_name="System Import"
-                ))
-            
-            lead.timeline.append(TimelineEntry(
-                event_type=TimelineEventType.CREATED,
-                description=f"Lead imported from Shiksha",
-                created_by=current_user["id"],
-                created_by_name=current_user["name"],
-                metadata={"source": "shiksha", "campaign": lead_data.get('campaign')}
-            ))
-            
-            await db.leads.insert_one(lead.model_dump())
-            created += 1
-            
-        except Exception as e:
-            logger.error(f"Failed to import Shiksha lead: {str(e)}")
-            failed += 1
-    
-    return {
-        "message": f"Shiksha import complete",
-        "created": created, 
-        "failed": failed, 
-        "duplicates": duplicates,
-        "source": "shiksha"
-    }
+    """Queue an import of leads from Shiksha platform"""
+    job = await queue_lead_import(
+        "partner", current_user["university_id"], current_user["id"], current_user["name"],
+        data.leads, source="shiksha"
+    )
+    return {**import_job_accepted(job), "source": "shiksha"}
 
 
-@lead_router.post("/import/collegedunia")
+@lead_router.post("/import/collegedunia", status_code=202)
 async def import_collegedunia_leads(
     data: ThirdPartyLeadImport,
     current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER, UserRole.UNIVERSITY_ADMIN))
 ):
-    """Import leads from Collegedunia platform"""
-    university_id = current_user["university_id"]
-    
-    created = 0
-    failed = 0
-    duplicates = 0
-    
-    for lead_data in data.leads:
-        try:
-            # Check for duplicates
-            query_conditions = []
-            if lead_data.get('email'):
-                query_conditions.append({"email": lead_data['email']})
-            if lead_data.get('phone'):
-                query_conditions.append({"phone": lead_data['phone']})
-            
-            existing = await db.leads.find_one({
-                "university_id": university_id,
-                "$or": query_conditions
-            }) if query_conditions else None
-            
-            if existing:
-                duplicates += 1
-                continue
-            
-            lead = Lead(
-                university_id=university_id,
-                name=lead_data.get('name', ''),
-                email=lead_data.get('email', ''),
-                phone=lead_data.get('phone', ''),
-                source=LeadSource.COLLEGEDUNIA,
-                source_details=lead_data.get('campaign', 'Collegedunia Import'),
-                course_interest=lead_data.get('course_interest', ''),
-                notes=[]
-            )
-            
-            # Add initial note with source info
-            if lead_data.get('inquiry_details'):
-                lead.notes.append(Note(
-                    content=f"Collegedunia Inquiry: {lead_data.get('inquiry_details')}",
-                    created_by="system",
-                    created_by_name="System Import"
-                ))
-            
-            lead.timeline.append(TimelineEntry(
-                event_type=TimelineEventType.CREATED,
-                description=f"Lead imported from Collegedunia",
-                created_by=current_user["id"],
-                created_by_name=current_user["name"],
-                metadata={"source": "collegedunia", "campaign": lead_data.get('campaign')}
-            ))
-            
-            await db.leads.insert_one(lead.model_dump())
-            created += 1
-            
-        except Exception as e:
-            logger.error(f"Failed to import Collegedunia lead: {str(e)}")
-            failed += 1
-    
-    return {
-        "message": f"Collegedunia import complete",
-        "created": created, 
-        "failed": failed, 
-        "duplicates": duplicates,
-        "source": "collegedunia"
-    }
+    """Queue an import of leads from Collegedunia platform"""
+    job = await queue_lead_import(
+        "partner", current_user["university_id"], current_user["id"], current_user["name"],
+        data.leads, source="collegedunia"
+    )
+    return {**import_job_accepted(job), "source": "collegedunia"}
 
 
-@lead_router.post("/import/webhook")
+@lead_router.post("/import/webhook", status_code=202)
 async def lead_import_webhook(
     request: Request,
     source: str = Query(..., description="Lead source: shiksha, collegedunia, other"),
@@ -1282,68 +1610,55 @@ async def lead_import_webhook(
 ):
     """Webhook endpoint for third-party lead imports (no auth required, uses API key)"""
     # Validate API key against university settings
-    university = await db.universities.find_one({
-        "integration_settings.lead_import_api_key": api_key
-    })
+    university_id = await lead_import_keys.resolve(api_key)
     
-    if not university:
+    if not university_id:
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    body = await request.json()
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
     leads = body.get('leads', [body]) if isinstance(body, dict) else body
+    if not isinstance(leads, list):
+        raise HTTPException(status_code=400, detail="Body must be a lead, a list of leads or {\"leads\": [...]}")
     
-    created = 0
-    failed = 0
-    duplicates = 0
-    
-    source_enum = {
-        'shiksha': LeadSource.SHIKSHA,
-        'collegedunia': LeadSource.COLLEGEDUNIA
-    }.get(source, LeadSource.OTHER_API)
-    
-    for lead_data in leads:
-        try:
-            query_conditions = []
-            if lead_data.get('email'):
-                query_conditions.append({"email": lead_data['email']})
-            if lead_data.get('phone'):
-                query_conditions.append({"phone": lead_data['phone']})
-            
-            existing = await db.leads.find_one({
-                "university_id": university["id"],
-                "$or": query_conditions
-            }) if query_conditions else None
-            
-            if existing:
-                duplicates += 1
-                continue
-            
-            lead = Lead(
-                university_id=university["id"],
-                name=lead_data.get('name', lead_data.get('student_name', '')),
-                email=lead_data.get('email', lead_data.get('student_email', '')),
-                phone=lead_data.get('phone', lead_data.get('mobile', '')),
-                source=source_enum,
-                source_details=f"Webhook import from {source}",
-                course_interest=lead_data.get('course_interest', lead_data.get('course', '')),
-            )
-            
-            lead.timeline.append(TimelineEntry(
-                event_type=TimelineEventType.CREATED,
-                description=f"Lead received via {source} webhook",
-                created_by="webhook",
-                created_by_name="System Webhook",
-                metadata={"source": source, "raw_data": lead_data}
-            ))
-            
-            await db.leads.insert_one(lead.model_dump())
-            created += 1
-            
-        except Exception as e:
-            logger.error(f"Failed to process webhook lead: {str(e)}")
-            failed += 1
-    
-    return {"status": "success", "created": created, "failed": failed, "duplicates": duplicates}
+    job = await queue_lead_import(
+        "webhook", university_id, "webhook", "System Webhook", leads, source=source
+    )
+    return {"status": "accepted", "job_id": job["id"], "total_rows": job["total_rows"]}
+
+
+@lead_router.get("/import-jobs")
+async def list_lead_import_jobs(
+    current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER, UserRole.UNIVERSITY_ADMIN))
+):
+    """Recent lead imports for this university, newest first"""
+    jobs = await lead_import_jobs.recent(current_user["university_id"])
+    return {"data": [serialize_doc(job) for job in jobs]}
+
+
+@lead_router.get("/import-jobs/{job_id}")
+async def get_lead_import_job(
+    job_id: str,
+    current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER, UserRole.UNIVERSITY_ADMIN))
+):
+    """Progress of a lead import: row counts and up to 50 per-row errors"""
+    job = await lead_import_jobs.get(job_id, current_user["university_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return serialize_doc(job)
+
+
+@lead_router.post("/import-jobs/{job_id}/cancel")
+async def cancel_lead_import_job(
+    job_id: str,
+    current_user: dict = Depends(require_roles(UserRole.COUNSELLING_MANAGER, UserRole.UNIVERSITY_ADMIN))
+):
+    """Stop an import; leads already imported are kept"""
+    if not await lead_import_jobs.cancel(job_id, current_user["university_id"]):
+        raise HTTPException(status_code=409, detail="Import job not found or already finished")
+    return {"message": "Import cancelled"}
 
 
 @lead_router.get("")
@@ -1373,6 +1688,9 @@ async def list_leads(
             {"email": {"$regex": search, "$options": "i"}},
             {"phone": {"$regex": search, "$options": "i"}}
         ]
+        # Phones are stored as digits, so also match a formatted search like "+91 98765"
+        if normalize_phone(search) and normalize_phone(search) != search:
+            query["$or"].append({"phone": {"$regex": normalize_phone(search)}})
     
     total = await db.leads.count_documents(query)
     leads = await db.leads.find(query, {"_id": 0}).sort("created_at", -1).skip((page - 1) * limit).limit(limit).to_list(limit)
@@ -1389,6 +1707,8 @@ async def list_leads(
 @lead_router.get("/{lead_id}")
 async def get_lead(
     lead_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_roles(UserRole.UNIVERSITY_ADMIN, UserRole.COUNSELLING_MANAGER, UserRole.COUNSELLOR))
 ):
     """Get lead details with full timeline"""
@@ -1401,6 +1721,9 @@ async def get_lead(
     lead = await db.leads.find_one(query, {"_id": 0})
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
+    cached = not_modified(request, response, doc_etag(lead), "private, no-cache")
+    if cached:
+        return cached
     return serialize_doc(lead)
 
 
@@ -1687,6 +2010,7 @@ async def create_application(
     )
     
     await db.applications.insert_one(application.model_dump())
+    await platform_counters.increment({"applications": 1})
     return serialize_doc(application.model_dump())
 
 
@@ -1705,6 +2029,8 @@ async def get_my_applications(
 @application_router.get("/{application_id}")
 async def get_application(
     application_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     """Get application details"""
@@ -1720,6 +2046,9 @@ async def get_application(
     application = await db.applications.find_one(query, {"_id": 0})
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
+    cached = not_modified(request, response, doc_etag(application), "private, no-cache")
+    if cached:
+        return cached
     return serialize_doc(application)
 
 
@@ -1806,7 +2135,7 @@ async def submit_application(
         raise HTTPException(status_code=404, detail="Application not found")
     
     # Verify all required steps are completed
-    university = await db.universities.find_one({"id": application["university_id"]})
+    university = await university_cache.get(application["university_id"])
     config = university.get("registration_config", {})
     
     required_steps = ["basic_info"]
@@ -1844,7 +2173,7 @@ async def submit_application(
     if application.get("lead_id"):
         await db.leads.update_one(
             {"id": application["lead_id"]},
-            {"$set": {"stage": "documents_submitted"}}
+            {"$set": {"stage": "documents_submitted", "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
     
     # Send application status email
@@ -1972,7 +2301,7 @@ async def start_test(
         raise HTTPException(status_code=400, detail="Test already completed")
     
     # Get test config for this course/university
-    university = await db.universities.find_one({"id": application["university_id"]})
+    university = await university_cache.get(application["university_id"])
     test_config = await db.test_configs.find_one({
         "university_id": application["university_id"],
         "is_active": True,
@@ -2153,7 +2482,7 @@ async def create_payment_order(
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    university = await db.universities.find_one({"id": application["university_id"]})
+    university = await university_cache.get(application["university_id"])
     
     # Create payment record
     payment = Payment(
@@ -2193,6 +2522,7 @@ async def create_payment_order(
         payment.razorpay_order_id = f"order_mock_{uuid.uuid4().hex[:12]}"
     
     await db.payments.insert_one(payment.model_dump())
+    await platform_counters.payment_status_changed(None, payment.status.value, payment.amount)
     
     return {
         "payment_id": payment.id,
@@ -2228,14 +2558,14 @@ async def verify_payment(
                 'razorpay_signature': verify_data.razorpay_signature
             })
         except Exception as e:
-            await db.payments.update_one(
+            await update_payment_status(
                 {"id": payment["id"]},
                 {"$set": {"status": "failed", "updated_at": datetime.now(timezone.utc).isoformat()}}
             )
             raise HTTPException(status_code=400, detail="Payment verification failed")
     
     # Update payment status
-    await db.payments.update_one(
+    await update_payment_status(
         {"id": payment["id"]},
         {
             "$set": {
@@ -2266,7 +2596,7 @@ async def verify_payment(
     if application and application.get("lead_id"):
         await db.leads.update_one(
             {"id": application["lead_id"]},
-            {"$set": {"stage": "fee_paid"}}
+            {"$set": {"stage": "fee_paid", "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
         await add_timeline_entry(
             lead_id=application["lead_id"],
@@ -2277,7 +2607,7 @@ async def verify_payment(
     
     # Send payment receipt email
     student = await db.users.find_one({"id": payment["student_id"]})
-    university = await db.universities.find_one({"id": payment["university_id"]})
+    university = await university_cache.get(payment["university_id"])
     if student and student.get("email"):
         try:
             await email_service.send_payment_receipt_email(
@@ -2351,7 +2681,7 @@ async def initiate_refund(
     
     # Update payment
     new_status = "refunded" if refund_amount >= payment["amount"] else "partially_refunded"
-    await db.payments.update_one(
+    await update_payment_status(
         {"id": payment_id},
         {
             "$set": {
@@ -2437,7 +2767,7 @@ async def student_register(
         phone=registration_data.get("phone"),
         role=UserRole.STUDENT,
         university_id=university["id"],
-        password_hash=hash_password(password)
+        password_hash=await hash_password(password)
     )
     
     await db.users.insert_one(student.model_dump())
@@ -2446,8 +2776,8 @@ async def student_register(
     lead = Lead(
         university_id=university["id"],
         name=registration_data["name"],
-        email=registration_data["email"],
-        phone=registration_data.get("phone", ""),
+        email=normalize_email(registration_data["email"]),
+        phone=normalize_phone(registration_data.get("phone")),
         source=LeadSource.WEBSITE
     )
     lead.timeline.append(TimelineEntry(
@@ -2463,11 +2793,12 @@ async def student_register(
         lead_id=lead.id
     )
     await db.applications.insert_one(application.model_dump())
+    await platform_counters.increment({"students": 1, "leads": 1, "applications": 1})
     
     # Update lead with application
     await db.leads.update_one(
         {"id": lead.id},
-        {"$set": {"application_id": application.id, "stage": "application_started"}}
+        {"$set": {"application_id": application.id, "stage": "application_started", "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
     
     # Generate token
@@ -2510,15 +2841,17 @@ async def student_register(
 
 @student_router.get("/registration-config")
 async def get_registration_config(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_roles(UserRole.STUDENT))
 ):
     """Get registration workflow configuration for student"""
-    university = await db.universities.find_one(
-        {"id": current_user["university_id"]},
-        {"_id": 0, "registration_config": 1, "name": 1}
-    )
+    university = await university_cache.get(current_user["university_id"])
     if not university:
         raise HTTPException(status_code=404, detail="University not found")
+    cached = not_modified(request, response, university_etag(university, "registration-config"), "private, no-cache")
+    if cached:
+        return cached
     
     config = university.get("registration_config", {})
     
@@ -2560,90 +2893,374 @@ async def get_registration_config(
     }
 
 
+# Public profile fields shown to students; everything else stays server-side
+UNIVERSITY_INFO_FIELDS = ["name", "about", "facilities", "gallery", "gallery_variants", "brochures", "website", "address", "phone", "email"]
+
+
 @student_router.get("/university-info")
 async def get_university_info(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_roles(UserRole.STUDENT))
 ):
     """Get Know Your Institution info"""
-    university = await db.universities.find_one(
-        {"id": current_user["university_id"]},
-        {"_id": 0, "name": 1, "about": 1, "facilities": 1, "gallery": 1, "brochures": 1, "website": 1, "address": 1, "phone": 1, "email": 1}
-    )
+    university = await university_cache.get(current_user["university_id"])
     if not university:
         raise HTTPException(status_code=404, detail="University not found")
-    return serialize_doc(university)
+    cached = not_modified(request, response, university_etag(university, "info"), "private, no-cache")
+    if cached:
+        return cached
+    return serialize_doc({field: university[field] for field in UNIVERSITY_INFO_FIELDS if field in university})
 
 
 # ============== DOCUMENT ROUTES ==============
 
 document_router = APIRouter(prefix="/documents", tags=["Documents"])
 
+async def document_requirement(university_id: str, document_name: str) -> DocumentRequirement:
+    """The university's requirement for a named document, or the defaults"""
+    university = await university_cache.get(university_id) or {}
+    for requirement in university.get("registration_config", {}).get("required_documents", []):
+        if requirement.get("name") == document_name:
+            return DocumentRequirement(**requirement)
+    return DocumentRequirement(name=document_name)
+
+
 @document_router.post("/upload")
 async def upload_document(
-    application_id: str = Body(...),
-    document_name: str = Body(...),
-    file_name: str = Body(...),
-    file_type: str = Body(...),
-    file_size: int = Body(...),
-    file_data: str = Body(...),  # Base64 encoded file data
+    request: Request,
     current_user: dict = Depends(require_roles(UserRole.STUDENT))
 ):
-    """Upload a document for an application"""
-    import base64
+    """Upload a document for an application.
+
+    Expects multipart/form-data with application_id and document_name fields
+    followed by a 'file' part; the size limit is enforced while streaming.
+    """
+    async def prepare(fields: dict, file_name: str) -> int:
+        application_id = fields.get("application_id")
+        document_name = fields.get("document_name")
+        if not application_id or not document_name:
+            raise HTTPException(status_code=400, detail="application_id and document_name must precede the file")
+        return await validate_document_upload(current_user, application_id, document_name, file_name)
+    
+    upload = await receive_upload(request, "file", prepare)
+    
+    # Identical content (e.g. the same marksheet for two applications) shares one blob
+    await document_storage.put(upload)
     
+    try:
+        doc = await create_document_record(
+            current_user, upload.fields["application_id"], upload.fields["document_name"],
+            upload.file_name, upload.size, upload.sha256
+        )
+    except Exception:
+        # Drop the reference put() took, or the blob could never be collected
+        await document_storage.release(upload.sha256)
+        raise
+    return {"message": "Document uploaded successfully", "document_id": doc.id}
+
+
+async def validate_document_upload(current_user: dict, application_id: str, document_name: str, file_name: str) -> int:
+    """Check a student's upload against the application and requirement; returns the size limit in bytes"""
     # Verify application belongs to student
     application = await db.applications.find_one({
         "id": application_id,
         "student_id": current_user["id"]
-    })
+    }, {"_id": 1})
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    # Validate file type
-    allowed_types = ["pdf", "jpg", "jpeg", "png"]
-    ext = file_type.lower().replace(".", "")
-    if ext not in allowed_types:
-        raise HTTPException(status_code=400, detail=f"File type {ext} not allowed. Allowed: {', '.join(allowed_types)}")
-    
-    # Validate file size (max 5MB)
-    max_size = 5 * 1024 * 1024
-    if file_size > max_size:
-        raise HTTPException(status_code=400, detail="File size exceeds 5MB limit")
-    
-    # Create upload directory if it doesn't exist
-    upload_dir = Path("/app/uploads/documents")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    doc_id = str(uuid.uuid4())
-    safe_filename = f"{doc_id}_{file_name}"
-    file_path = upload_dir / safe_filename
-    
-    # Decode and save file
-    try:
-        file_bytes = base64.b64decode(file_data)
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to save file: {str(e)}")
-    
-    # Create document record
+    # Validate file type against the university's requirement
+    requirement = await document_requirement(current_user["university_id"], document_name)
+    ext = file_extension(file_name)
+    if ext not in requirement.allowed_types:
+        raise HTTPException(status_code=400, detail=f"File type {ext} not allowed. Allowed: {', '.join(requirement.allowed_types)}")
+    return requirement.max_size_mb * 1024 * 1024
+
+
+async def create_document_record(
+    current_user: dict, application_id: str, document_name: str,
+    file_name: str, file_size: int, sha256: str, document_id: Optional[str] = None
+) -> Document:
     doc = Document(
-        id=doc_id,
+        **({"id": document_id} if document_id else {}),
         university_id=current_user["university_id"],
         student_id=current_user["id"],
         application_id=application_id,
         name=document_name,
         file_name=file_name,
-        file_url=f"/uploads/documents/{safe_filename}",
-        file_type=ext,
+        file_url=document_storage.url_for(sha256),
+        file_type=file_extension(file_name),
         file_size=file_size,
-        status=DocumentStatus.UPLOADED
+        sha256=sha256,
+        status=DocumentStatus.UPLOADED,
+        processing_status=DocumentProcessingStatus.QUEUED
     )
-    
     await db.documents.insert_one(doc.model_dump())
+    document_pipeline.submit(doc.id)
+    return doc
+
+
+class DirectUploadRequest(PydanticBaseModel):
+    application_id: str
+    document_name: str
+    file_name: str
+    file_size: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern="^[0-9a-f]{64}$")
+    content_type: str = "application/octet-stream"
+
+
+# How long a presigned upload stays claimable
+DIRECT_UPLOAD_TTL = timedelta(hours=1)
+
+
+@document_router.post("/upload-url")
+async def create_document_upload_url(
+    upload_data: DirectUploadRequest,
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Start a direct-to-storage upload.
+
+    With an S3 backend this returns a presigned PUT (or no URL at all if this
+    student already has a document with the same content); the client then
+    calls /upload-complete.
+    With local storage it returns direct=false and the client should use the
+    multipart /upload endpoint instead.
+    """
+    max_bytes = await validate_document_upload(
+        current_user, upload_data.application_id, upload_data.document_name, upload_data.file_name
+    )
+    if upload_data.file_size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File size exceeds {max_bytes // (1024 * 1024)}MB limit")
+    
+    if not document_storage.backend.supports_presigned:
+        return {"direct": False}
+    
+    # Skip the upload only for content this student already owns: knowing a
+    # hash must never be enough to obtain someone else's file
+    owned = await db.documents.find_one(
+        {"student_id": current_user["id"], "sha256": upload_data.sha256, "file_size": upload_data.file_size},
+        {"_id": 1}
+    ) is not None
+    
+    upload_id = str(uuid.uuid4())
+    await db.pending_uploads.insert_one({
+        "id": upload_id,
+        "student_id": current_user["id"],
+        **upload_data.model_dump(),
+        "owned": owned,
+        "expires_at": datetime.now(timezone.utc) + DIRECT_UPLOAD_TTL
+    })
+    
+    upload = None
+    if not owned:
+        upload = document_storage.presigned_put(upload_id, upload_data.sha256, upload_data.file_size, upload_data.content_type)
+    return {"direct": True, "upload_id": upload_id, "upload": upload}
+
+
+@document_router.post("/upload-complete")
+async def complete_document_upload(
+    upload_id: str = Body(..., embed=True),
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Record a document once its bytes are in storage"""
+    pending = await db.pending_uploads.find_one_and_delete({
+        "id": upload_id,
+        "student_id": current_user["id"],
+        "expires_at": {"$gt": datetime.now(timezone.utc)}
+    })
+    if not pending:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    
+    # Unless the student already owns the content, it must be in this
+    # upload's staging object with a checksum S3 verified
+    staged_as = None if pending.get("owned") else pending["id"]
+    if not await document_storage.claim(pending["sha256"], pending["file_size"], staged_as):
+        raise HTTPException(status_code=409, detail="File not found in storage; request a new upload URL")
+    
+    try:
+        doc = await create_document_record(
+            current_user, pending["application_id"], pending["document_name"],
+            pending["file_name"], pending["file_size"], pending["sha256"]
+        )
+    except Exception:
+        await document_storage.release(pending["sha256"])
+        raise
+    return {"message": "Document uploaded successfully", "document_id": doc.id}
+
+
+class ResumableUploadRequest(PydanticBaseModel):
+    application_id: str
+    document_name: str
+    file_name: str
+    file_size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")  # checked on completion when given
+    content_type: str = "application/octet-stream"
+
+
+def resumable_upload_status(upload: dict) -> dict:
+    return {
+        "upload_id": upload["id"],
+        "offset": upload["offset"],
+        "file_size": upload["file_size"],
+        "status": upload["status"],
+        "expires_at": upload["expires_at"].isoformat()
+    }
+
+
+@document_router.post("/uploads")
+async def create_resumable_upload(
+    upload_data: ResumableUploadRequest,
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Start a resumable upload.
+
+    Send the bytes with PUT /uploads/{upload_id}?offset=N in chunks of about
+    chunk_size. After a failure, GET /uploads/{upload_id} for the offset to
+    resume from; once every byte is in, POST /uploads/{upload_id}/complete.
+    """
+    max_bytes = await validate_document_upload(
+        current_user, upload_data.application_id, upload_data.document_name, upload_data.file_name
+    )
+    if upload_data.file_size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File size exceeds {max_bytes // (1024 * 1024)}MB limit")
     
-    return {"message": "Document uploaded successfully", "document_id": doc_id}
+    upload = await resumable_uploads.create(current_user["id"], upload_data.model_dump())
+    return {**resumable_upload_status(upload), "chunk_size": resumable_uploads.chunk_size}
+
+
+@document_router.get("/uploads/{upload_id}")
+async def get_resumable_upload(
+    upload_id: str,
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """How many bytes of an upload have been received"""
+    try:
+        upload = await resumable_uploads.get(upload_id, current_user["id"])
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return resumable_upload_status(upload)
+
+
+@document_router.put("/uploads/{upload_id}")
+async def put_resumable_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Append the raw request body at offset, which must equal the received offset"""
+    try:
+        received = await resumable_uploads.append(upload_id, current_user["id"], offset, request.stream())
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=e.detail, headers={"Upload-Offset": str(e.offset)})
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"upload_id": upload_id, "offset": received}
+
+
+@document_router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Create the document for a fully received upload; retries return the same document"""
+    try:
+        upload = await resumable_uploads.begin_complete(upload_id, current_user["id"])
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    # The document id is fixed when the upload starts, so a retry after a
+    # lost response finds the document instead of creating a second one
+    if not await db.documents.find_one({"id": upload["document_id"]}, {"_id": 1}):
+        try:
+            received = await resumable_uploads.received_file(upload)
+            await document_storage.put(received)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except Exception:
+            await resumable_uploads.release(upload_id)
+            raise
+        try:
+            await create_document_record(
+                current_user, upload["application_id"], upload["document_name"],
+                upload["file_name"], upload["file_size"], received.sha256, document_id=upload["document_id"]
+            )
+        except Exception:
+            # The bytes now belong to the blob store; the upload cannot be retried
+            await document_storage.release(received.sha256)
+            await resumable_uploads.abort(upload_id, current_user["id"])
+            raise
+    
+    await resumable_uploads.finish(upload_id, upload["document_id"])
+    return {"message": "Document uploaded successfully", "document_id": upload["document_id"]}
+
+
+@document_router.delete("/uploads/{upload_id}")
+async def cancel_resumable_upload(
+    upload_id: str,
+    current_user: dict = Depends(require_roles(UserRole.STUDENT))
+):
+    """Discard an unfinished upload"""
+    if not await resumable_uploads.abort(upload_id, current_user["id"]):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"message": "Upload cancelled"}
+
+
+def check_document_access(doc: dict, current_user: dict):
+    # Students can only access their own documents
+    if current_user["role"] == "student" and doc["student_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Staff can access documents from their university
+    if current_user["role"] in ["university_admin", "counselling_manager", "counsellor"]:
+        if doc["university_id"] != current_user.get("university_id"):
+            raise HTTPException(status_code=403, detail="Access denied")
+
+
+@document_router.get("/{document_id}/url")
+async def get_document_url(
+    document_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a URL to fetch a document; presigned and short-lived on S3 storage"""
+    doc = await db.documents.find_one({"id": document_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    check_document_access(doc, current_user)
+    
+    if doc.get("sha256") and document_storage.backend.supports_presigned:
+        return document_storage.presigned_get(doc["sha256"], doc["file_name"], mimetypes.guess_type(doc["file_name"])[0])
+    return {"url": f"/api/documents/{document_id}/download", "expires_in": None}
+
+
+@document_router.get("/{document_id}/download")
+async def download_document(
+    document_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Download a document; supports Range, ETag and If-Modified-Since"""
+    doc = await db.documents.find_one({"id": document_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    check_document_access(doc, current_user)
+    
+    media_type = mimetypes.guess_type(doc["file_name"])[0]
+    if doc.get("sha256"):
+        if document_storage.backend.supports_presigned:
+            # Object storage serves the bytes (and ranges) itself
+            url = document_storage.presigned_get(doc["sha256"], doc["file_name"], media_type)["url"]
+            return RedirectResponse(url, status_code=307)
+        # Blobs are content-addressed, so the hash is a perfect strong ETag
+        path, etag = document_storage.local_path(doc["sha256"]), f'"{doc["sha256"]}"'
+    else:
+        path, etag = Path(f"/app{doc['file_url']}"), None
+    
+    response = await serve_file(request, path, doc["file_name"], media_type, etag)
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="File not found")
+    return response
 
 
 @document_router.get("/application/{application_id}")
@@ -2742,16 +3359,19 @@ async def delete_document(
     if doc["status"] == "verified":
         raise HTTPException(status_code=400, detail="Cannot delete verified documents")
     
-    # Delete file
-    try:
-        file_path = Path(f"/app{doc['file_url']}")
-        if file_path.exists():
-            file_path.unlink()
-    except Exception:
-        pass
-    
     await db.documents.delete_one({"id": document_id})
     
+    # Delete file; blobs shared with other documents stay until the last one goes
+    if doc.get("sha256"):
+        await document_storage.release(doc["sha256"])
+    else:
+        try:
+            file_path = Path(f"/app{doc['file_url']}")
+            if file_path.exists():
+                file_path.unlink()
+        except Exception:
+            pass
+    
     return {"message": "Document deleted"}
 
 
@@ -2764,23 +3384,22 @@ async def counselling_manager_dashboard(
     """Get counselling manager dashboard"""
     university_id = current_user["university_id"]
     
-    # Get counsellors
-    counsellors = await db.users.find({
-        "university_id": university_id,
-        "role": "counsellor"
-    }, {"_id": 0, "id": 1, "name": 1}).to_list(100)
-    
-    # Get lead counts by counsellor
-    pipeline = [
+    return await cached_dashboard(
+        ("counselling", university_id),
+        lambda: compute_counselling_manager_dashboard(university_id)
+    )
+
+
+async def compute_counselling_manager_dashboard(university_id: str) -> dict:
+    # Lead counts by counsellor
+    leads_pipeline = [
         {"$match": {"university_id": university_id}},
         {"$group": {"_id": "$assigned_to", "count": {"$sum": 1}}}
     ]
-    leads_by_counsellor = await db.leads.aggregate(pipeline).to_list(100)
-    leads_map = {item["_id"]: item["count"] for item in leads_by_counsellor}
     
     # Pending follow-ups
     today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    pipeline = [
+    overdue_pipeline = [
         {"$match": {"university_id": university_id}},
         {"$unwind": "$follow_ups"},
         {"$match": {
@@ -2789,7 +3408,20 @@ async def counselling_manager_dashboard(
         }},
         {"$group": {"_id": "$assigned_to", "overdue_count": {"$sum": 1}}}
     ]
-    overdue_by_counsellor = await db.leads.aggregate(pipeline).to_list(100)
+    
+    counsellors, leads_by_counsellor, overdue_by_counsellor, unassigned = await asyncio.gather(
+        db.users.find({
+            "university_id": university_id,
+            "role": "counsellor"
+        }, {"_id": 0, "id": 1, "name": 1}).to_list(100),
+        db.leads.aggregate(leads_pipeline).to_list(100),
+        db.leads.aggregate(overdue_pipeline).to_list(100),
+        db.leads.count_documents({
+            "university_id": university_id,
+            "assigned_to": None
+        })
+    )
+    leads_map = {item["_id"]: item["count"] for item in leads_by_counsellor}
     overdue_map = {item["_id"]: item["overdue_count"] for item in overdue_by_counsellor}
     
     # Build counsellor stats
@@ -2802,12 +3434,6 @@ async def counselling_manager_dashboard(
             "overdue_follow_ups": overdue_map.get(c["id"], 0)
         })
     
-    # Unassigned leads
-    unassigned = await db.leads.count_documents({
-        "university_id": university_id,
-        "assigned_to": None
-    })
-    
     return {
         "counsellor_stats": counsellor_stats,
         "unassigned_leads": unassigned,
@@ -2822,71 +3448,39 @@ async def get_lead_analytics(
     """Get lead source analytics and stage distribution"""
     university_id = current_user["university_id"]
     
-    # Leads by source
-    pipeline = [
-        {"$match": {"university_id": university_id}},
-        {"$group": {"_id": "$source", "count": {"$sum": 1}}}
-    ]
-    leads_by_source = await db.leads.aggregate(pipeline).to_list(20)
-    
-    # Leads by stage
+    return await cached_dashboard(
+        ("lead_analytics", university_id),
+        lambda: compute_lead_analytics(university_id)
+    )
+
+
+async def compute_lead_analytics(university_id: str) -> dict:
+    # All figures come from the daily rollups in a single query
+    thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%d")
     pipeline = [
         {"$match": {"university_id": university_id}},
-        {"$group": {"_id": "$stage", "count": {"$sum": 1}}}
+        {"$facet": {
+            "by_source": [{"$group": {"_id": "$source", "count": {"$sum": "$count"}}}],
+            "by_stage": [{"$group": {"_id": "$stage", "count": {"$sum": "$count"}}}],
+            "over_time": [
+                {"$match": {"day": {"$gte": thirty_days_ago}}},
+                {"$group": {"_id": "$day", "count": {"$sum": "$count"}}},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
     ]
-    leads_by_stage = await db.leads.aggregate(pipeline).to_list(20)
-    
-    # Conversion funnel
-    total = await db.leads.count_documents({"university_id": university_id})
-    contacted = await db.leads.count_documents({
-        "university_id": university_id,
-        "stage": {"$nin": ["new_lead"]}
-    })
-    interested = await db.leads.count_documents({
-        "university_id": university_id,
-        "stage": {"$in": ["interested", "follow_up_scheduled", "application_started", 
-                         "documents_pending", "documents_submitted", "fee_pending", 
-                         "fee_paid", "admission_confirmed"]}
-    })
-    applied = await db.leads.count_documents({
-        "university_id": university_id,
-        "stage": {"$in": ["application_started", "documents_pending", "documents_submitted",
-                         "fee_pending", "fee_paid", "admission_confirmed"]}
-    })
-    converted = await db.leads.count_documents({
-        "university_id": university_id,
-        "stage": {"$in": ["admission_confirmed", "fee_paid"]}
-    })
+    rollups = (await db.lead_daily_rollups.aggregate(pipeline).to_list(1))[0]
+    leads_by_source = rollups["by_source"]
+    leads_by_stage = rollups["by_stage"]
+    leads_over_time = rollups["over_time"]
     
-    # Leads over time (last 30 days)
-    thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
-    pipeline = [
-        {"$match": {
-            "university_id": university_id,
-            "created_at": {"$gte": thirty_days_ago}
-        }},
-        {"$project": {
-            "date": {"$substr": ["$created_at", 0, 10]},
-            "source": 1
-        }},
-        {"$group": {
-            "_id": "$date",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    leads_over_time = await db.leads.aggregate(pipeline).to_list(31)
+    # Conversion funnel, derived from the single group-by-stage above
+    funnel = funnel_counts({item["_id"]: item["count"] for item in leads_by_stage})
     
     return {
         "by_source": [{"source": item["_id"] or "unknown", "count": item["count"]} for item in leads_by_source],
         "by_stage": [{"stage": item["_id"] or "unknown", "count": item["count"]} for item in leads_by_stage],
-        "funnel": {
-            "total": total,
-            "contacted": contacted,
-            "interested": interested,
-            "applied": applied,
-            "converted": converted
-        },
+        "funnel": funnel,
         "over_time": [{"date": item["_id"], "count": item["count"]} for item in leads_over_time]
     }
 
@@ -2901,29 +3495,16 @@ async def counsellor_dashboard(
     user_id = current_user["id"]
     university_id = current_user["university_id"]
     
-    # Total leads assigned to this counsellor
-    total_leads = await db.leads.count_documents({
-        "university_id": university_id,
-        "assigned_to": user_id
-    })
-    
-    # New leads (stage = new_lead)
-    new_leads = await db.leads.count_documents({
-        "university_id": university_id,
-        "assigned_to": user_id,
-        "stage": "new_lead"
-    })
-    
-    # Converted leads
-    converted_leads = await db.leads.count_documents({
-        "university_id": university_id,
-        "assigned_to": user_id,
-        "stage": {"$in": ["converted", "admission_confirmed"]}
-    })
-    
+    return await cached_dashboard(
+        ("counsellor", university_id, user_id),
+        lambda: compute_counsellor_dashboard(university_id, user_id)
+    )
+
+
+async def compute_counsellor_dashboard(university_id: str, user_id: str) -> dict:
     # Overdue follow-ups
     today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    pipeline = [
+    overdue_pipeline = [
         {"$match": {"university_id": university_id, "assigned_to": user_id}},
         {"$unwind": "$follow_ups"},
         {"$match": {
@@ -2932,18 +3513,10 @@ async def counsellor_dashboard(
         }},
         {"$count": "overdue"}
     ]
-    overdue_result = await db.leads.aggregate(pipeline).to_list(1)
-    overdue_follow_ups = overdue_result[0]["overdue"] if overdue_result else 0
-    
-    # Recent leads
-    recent_leads = await db.leads.find(
-        {"university_id": university_id, "assigned_to": user_id},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(10).to_list(10)
     
     # Today's follow-ups
     tomorrow = today + timedelta(days=1)
-    pipeline = [
+    today_pipeline = [
         {"$match": {"university_id": university_id, "assigned_to": user_id}},
         {"$unwind": "$follow_ups"},
         {"$match": {
@@ -2962,7 +3535,34 @@ async def counsellor_dashboard(
         }},
         {"$limit": 10}
     ]
-    today_follow_ups = await db.leads.aggregate(pipeline).to_list(10)
+    
+    total_leads, new_leads, converted_leads, overdue_result, recent_leads, today_follow_ups = await asyncio.gather(
+        # Total leads assigned to this counsellor
+        db.leads.count_documents({
+            "university_id": university_id,
+            "assigned_to": user_id
+        }),
+        # New leads (stage = new_lead)
+        db.leads.count_documents({
+            "university_id": university_id,
+            "assigned_to": user_id,
+            "stage": "new_lead"
+        }),
+        # Converted leads
+        db.leads.count_documents({
+            "university_id": university_id,
+            "assigned_to": user_id,
+            "stage": {"$in": ["converted", "admission_confirmed"]}
+        }),
+        db.leads.aggregate(overdue_pipeline).to_list(1),
+        # Recent leads
+        db.leads.find(
+            {"university_id": university_id, "assigned_to": user_id},
+            {"_id": 0}
+        ).sort("created_at", -1).limit(10).to_list(10),
+        db.leads.aggregate(today_pipeline).to_list(10)
+    )
+    overdue_follow_ups = overdue_result[0]["overdue"] if overdue_result else 0
     
     return {
         "total_leads": total_leads,
@@ -3000,7 +3600,7 @@ async def razorpay_webhook(request: Request):
         payment_data = payload.get("payload", {}).get("payment", {}).get("entity", {})
         order_id = payment_data.get("order_id")
         
-        await db.payments.update_one(
+        await update_payment_status(
             {"razorpay_order_id": order_id},
             {
                 "$set": {
@@ -3015,7 +3615,7 @@ async def razorpay_webhook(request: Request):
         payment_data = payload.get("payload", {}).get("payment", {}).get("entity", {})
         order_id = payment_data.get("order_id")
         
-        await db.payments.update_one(
+        await update_payment_status(
             {"razorpay_order_id": order_id},
             {
                 "$set": {
@@ -3047,14 +3647,28 @@ async def razorpay_webhook(request: Request):
 
 # ============== PUBLIC ROUTES ==============
 
-@api_router.get("/public/universities")
-async def list_public_universities():
-    """Get list of active universities for login dropdown"""
+# The login dropdown is identical for everyone, so browsers and proxies may reuse it briefly
+PUBLIC_UNIVERSITIES_CACHE_CONTROL = "public, max-age=60"
+public_universities_cache = QueryCache(ttl=60, max_entries=1)
+
+
+async def compute_public_universities() -> dict:
     universities = await db.universities.find(
         {"is_active": True},
         {"_id": 0, "id": 1, "name": 1, "code": 1}
     ).to_list(1000)
-    return {"data": [serialize_doc(u) for u in universities]}
+    body = {"data": [serialize_doc(u) for u in universities]}
+    return {"body": body, "etag": make_etag(json.dumps(body, sort_keys=True))}
+
+
+@api_router.get("/public/universities")
+async def list_public_universities(request: Request, response: Response):
+    """Get list of active universities for login dropdown"""
+    result = await public_universities_cache.get_or_compute("active", compute_public_universities)
+    cached = not_modified(request, response, result["etag"], PUBLIC_UNIVERSITIES_CACHE_CONTROL)
+    if cached:
+        return cached
+    return result["body"]
 
 
 @api_router.get("/")
@@ -3145,23 +3759,33 @@ async def get_email_stats(
     current_user: dict = Depends(require_roles(UserRole.SUPER_ADMIN, UserRole.UNIVERSITY_ADMIN))
 ):
     """Get email statistics"""
-    query = {}
+    university_id = None
     if current_user["role"] != "super_admin":
-        query["university_id"] = current_user["university_id"]
+        university_id = current_user["university_id"]
     
-    # Count by status
-    pipeline = [
+    return await cached_dashboard(
+        ("email_stats", university_id),
+        lambda: compute_email_stats(university_id)
+    )
+
+
+async def compute_email_stats(university_id: Optional[str]) -> dict:
+    query = {}
+    if university_id:
+        query["university_id"] = university_id
+    
+    status_pipeline = [
         {"$match": query},
         {"$group": {"_id": "$status", "count": {"$sum": 1}}}
     ]
-    status_counts = await db.email_logs.aggregate(pipeline).to_list(10)
-    
-    # Count by type
-    pipeline = [
+    type_pipeline = [
         {"$match": query},
         {"$group": {"_id": "$email_type", "count": {"$sum": 1}}}
     ]
-    type_counts = await db.email_logs.aggregate(pipeline).to_list(20)
+    status_counts, type_counts = await asyncio.gather(
+        db.email_logs.aggregate(status_pipeline).to_list(10),
+        db.email_logs.aggregate(type_pipeline).to_list(20)
+    )
     
     return {
         "by_status": {item["_id"]: item["count"] for item in status_counts},
@@ -3182,7 +3806,7 @@ async def create_query(
     """Create a new query from student"""
     # Get student's lead to find assigned counsellor
     lead = await db.leads.find_one({
-        "email": current_user.get("email"),
+        "email": normalize_email(current_user.get("email")),
         "university_id": current_user["university_id"]
     })
     
@@ -0,0 +1,457 @@
+"""
+Document Pipeline for UNIFY Platform
+Post-upload checks for student documents, run on a process pool behind a
+bounded queue: magic bytes must match the declared type, oversized photos
+are downscaled and recompressed, PDFs are linearized and stripped of unused
+objects, and the real size and page count are recorded on the document.
+
+Documents wait in MongoDB with processing_status "queued". New uploads are
+handed to the in-memory queue directly; when it is full (or after a
+restart) the sweeper refills it from the database, so bursts queue up
+instead of piling work onto the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from PIL import Image, ImageOps
+from pymongo import ReturnDocument
+
+from models.document import DocumentProcessingStatus, DocumentStatus
+from services.document_storage import document_storage
+from services.upload_service import ReceivedUpload, upload_service
+
+logger = logging.getLogger(__name__)
+
+# Declared extension -> content kind its magic bytes must show
+EXPECTED_KINDS = {
+    "pdf": "pdf",
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "png": "png",
+    "webp": "webp",
+    "gif": "gif",
+    "doc": "ole",
+    "xls": "ole",
+    "docx": "zip",
+    "xlsx": "zip"
+}
+
+# Image kinds Pillow may re-encode, and the format to save them in
+NORMALIZABLE_IMAGES = {"jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+# Photos under this size and edge length are left untouched
+IMAGE_TARGET_BYTES = 1536 * 1024
+
+# A linearized PDF is kept if it grows by at most this factor
+PDF_GROWTH_ALLOWANCE = 1.05
+
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Documents stuck in "processing" this long (e.g. the worker died) are retried
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _detect_kind(head: bytes) -> Optional[str]:
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "ole"
+    if head.startswith(b"PK\x03\x04"):
+        return "zip"
+    return None
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalized(output: str, source_size: int) -> Optional[Dict]:
+    """Describe the output file if it is worth keeping, else delete it"""
+    size = os.path.getsize(output)
+    if size >= source_size:
+        os.unlink(output)
+        return None
+    return {"path": output, "size": size, "sha256": _sha256_file(output)}
+
+
+def _inspect_image(source: str, kind: str, size: int, output: str, max_edge: int, quality: int) -> Dict:
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with Image.open(source) as image:
+        image.load()  # Decode fully so truncated files fail here
+        result = {"width": image.width, "height": image.height, "normalized": None}
+        if size <= IMAGE_TARGET_BYTES and max(image.size) <= max_edge:
+            return result
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        image_format = NORMALIZABLE_IMAGES[kind]
+        if image_format == "JPEG":
+            image = image.convert("RGB")
+            image.save(output, image_format, quality=quality, optimize=True, progressive=True)
+        elif image_format == "PNG":
+            image.save(output, image_format, optimize=True)
+        else:
+            image.save(output, image_format, quality=quality, method=4)
+
+    result["normalized"] = _normalized(output, size)
+    if result["normalized"] is not None:
+        result["width"], result["height"] = image.width, image.height
+    return result
+
+
+def _inspect_pdf(source: str, size: int, output: str) -> Dict:
+    try:
+        import pikepdf
+    except ImportError:
+        # Without pikepdf only the trailer and uncompressed page objects can be checked
+        with open(source, "rb") as f:
+            data = f.read()
+        if b"%%EOF" not in data[-2048:]:
+            raise ValueError("PDF is truncated")
+        pages = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", data))
+        return {"page_count": pages or None, "normalized": None}
+
+    try:
+        with pikepdf.open(source) as pdf:
+            page_count = len(pdf.pages)
+            pdf.remove_unreferenced_resources()
+            pdf.save(
+                output, linearize=True, compress_streams=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate
+            )
+    except pikepdf.PasswordError:
+        raise ValueError("PDF is password protected") from None
+    except pikepdf.PdfError as e:
+        raise ValueError(f"PDF is damaged: {e}") from None
+
+    normalized = None
+    output_size = os.path.getsize(output)
+    if output_size <= size * PDF_GROWTH_ALLOWANCE:
+        normalized = {"path": output, "size": output_size, "sha256": _sha256_file(output)}
+    else:
+        os.unlink(output)
+    return {"page_count": page_count, "normalized": normalized}
+
+
+def _inspect_document(source: str, file_type: str, output: str, max_edge: int, quality: int) -> Dict:
+    """Validate and normalize one file; runs in a worker process.
+
+    Returns {"valid": False, "error": ...} for content problems. A normalized
+    copy, if any, is written to output and described under "normalized".
+    """
+    size = os.path.getsize(source)
+    with open(source, "rb") as f:
+        head = f.read(1024)
+
+    kind = _detect_kind(head)
+    expected = EXPECTED_KINDS.get(file_type)
+    if expected is not None and kind != expected:
+        found = kind or "unknown"
+        return {"valid": False, "error": f"File content ({found}) does not match its .{file_type} extension"}
+
+    result = {"valid": True, "detected_type": kind, "size": size, "page_count": None, "normalized": None}
+    try:
+        if kind in NORMALIZABLE_IMAGES:
+            result.update(_inspect_image(source, kind, size, output, max_edge, quality))
+            result["page_count"] = 1
+        elif kind == "pdf":
+            result.update(_inspect_pdf(source, size, output))
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        if os.path.exists(output):
+            os.unlink(output)
+        return {"valid": False, "error": str(e) or "File could not be read"}
+    return result
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class DocumentPipeline:
+    """Bounded queue of uploaded documents drained by a process pool"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._workers = None
+        self._queue_size = None
+        self._max_edge = None
+        self._quality = None
+        self._sweep_interval = None
+        self._collection = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._pending: Set[str] = set()
+        self.processed = 0
+        self.normalized = 0
+        self.invalid = 0
+        self.failed = 0
+        self.deferred = 0
+        self.bytes_saved = 0
+
+    @property
+    def workers(self) -> int:
+        if self._workers is None:
+            self._workers = max(1, int(os.environ.get('DOCUMENT_WORKERS', 1)))
+        return self._workers
+
+    @property
+    def queue_size(self) -> int:
+        if self._queue_size is None:
+            self._queue_size = max(1, int(os.environ.get('DOCUMENT_QUEUE_SIZE', 100)))
+        return self._queue_size
+
+    @property
+    def max_edge(self) -> int:
+        """Longest edge, in pixels, of a normalized photo"""
+        if self._max_edge is None:
+            self._max_edge = max(320, int(os.environ.get('DOCUMENT_MAX_IMAGE_EDGE', 2400)))
+        return self._max_edge
+
+    @property
+    def quality(self) -> int:
+        if self._quality is None:
+            self._quality = min(100, max(1, int(os.environ.get('DOCUMENT_IMAGE_QUALITY', 85))))
+        return self._quality
+
+    @property
+    def sweep_interval(self) -> float:
+        if self._sweep_interval is None:
+            self._sweep_interval = max(1.0, float(os.environ.get('DOCUMENT_PIPELINE_SWEEP_SECONDS', 30)))
+        return self._sweep_interval
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs the event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Document pipeline pool started: process x {self.workers}")
+        return self._executor
+
+    def bind(self, collection):
+        self._collection = collection
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, document_id: str):
+        """Queue a document saved with processing_status "queued"; never blocks.
+
+        When the queue is full the document stays queued in the database and
+        the sweeper picks it up once there is room.
+        """
+        if self._queue is None or document_id in self._pending:
+            return
+        try:
+            self._queue.put_nowait(document_id)
+        except asyncio.QueueFull:
+            self.deferred += 1
+            return
+        self._pending.add(document_id)
+
+    async def _consume(self):
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self.process(document_id)
+            except Exception as e:
+                logger.error(f"Failed to process document {document_id}: {str(e)}")
+            finally:
+                self._pending.discard(document_id)
+                self._queue.task_done()
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Failed to sweep document queue: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def sweep(self):
+        """Retry stale work and refill the queue from the database"""
+        now = datetime.now(timezone.utc)
+        await self._collection.update_many(
+            {
+                "processing_status": DocumentProcessingStatus.PROCESSING.value,
+                "processing_started_at": {"$lt": now - STALE_AFTER}
+            },
+            {"$set": {"processing_status": DocumentProcessingStatus.QUEUED.value}}
+        )
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return
+        queued = await self._collection.find(
+            {"processing_status": DocumentProcessingStatus.QUEUED.value, "id": {"$nin": list(self._pending)}},
+            {"_id": 0, "id": 1}
+        ).sort("created_at", 1).limit(room).to_list(room)
+        for doc in queued:
+            self.submit(doc["id"])
+
+    async def process(self, document_id: str):
+        """Inspect one queued document and record the outcome on it"""
+        doc = await self._collection.find_one_and_update(
+            {"id": document_id, "processing_status": DocumentProcessingStatus.QUEUED.value},
+            {"$set": {
+                "processing_status": DocumentProcessingStatus.PROCESSING.value,
+                "processing_started_at": datetime.now(timezone.utc)
+            }},
+            projection={"_id": 0, "id": 1, "sha256": 1, "file_name": 1, "file_type": 1, "file_size": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return  # Claimed by another worker, or deleted
+        if not doc.get("sha256"):
+            await self._finish(document_id, DocumentProcessingStatus.READY)
+            return
+
+        scratch = upload_service.temp_dir / uuid.uuid4().hex
+        await asyncio.to_thread(scratch.parent.mkdir, parents=True, exist_ok=True)
+        source_copy = scratch.with_suffix(".src")
+        output = scratch.with_suffix(".out")
+        try:
+            source = await document_storage.fetch(doc["sha256"], source_copy)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor, _inspect_document,
+                str(source), doc["file_type"], str(output), self.max_edge, self.quality
+            )
+        except Exception as e:
+            self.failed += 1
+            await asyncio.to_thread(_unlink, output)
+            await self._finish(document_id, DocumentProcessingStatus.FAILED, {"processing_error": str(e)})
+            raise
+        finally:
+            await asyncio.to_thread(_unlink, source_copy)
+
+        if not result["valid"]:
+            self.invalid += 1
+            await self._reject(document_id, result["error"])
+            return
+
+        fields = {
+            "file_size": result["size"],
+            "page_count": result["page_count"],
+            "detected_type": result["detected_type"]
+        }
+        if result["normalized"] is not None:
+            await self._replace_blob(doc, result["normalized"], fields)
+            return
+        self.processed += 1
+        await self._finish(document_id, DocumentProcessingStatus.READY, fields)
+
+    async def _replace_blob(self, doc: Dict, normalized: Dict, fields: Dict):
+        """Swap the document onto its normalized blob and mark it ready.
+
+        If the document was replaced or deleted meanwhile, the new blob is
+        released again and the document is left alone.
+        """
+        content_type = mimetypes.guess_type(doc["file_name"])[0] or "application/octet-stream"
+        upload = ReceivedUpload(
+            {}, doc["file_name"], content_type, Path(normalized["path"]), normalized["size"], normalized["sha256"]
+        )
+        try:
+            await document_storage.put(upload)
+        finally:
+            await asyncio.to_thread(_unlink, upload.path)
+
+        now = datetime.now(timezone.utc)
+        result = await self._collection.update_one(
+            {"id": doc["id"], "sha256": doc["sha256"]},
+            {"$set": {
+                **fields,
+                "sha256": normalized["sha256"],
+                "file_url": document_storage.url_for(normalized["sha256"]),
+                "file_size": normalized["size"],
+                "original_size": fields["file_size"],
+                "processing_status": DocumentProcessingStatus.READY.value,
+                "processed_at": now,
+                "updated_at": now
+            }}
+        )
+        if result.modified_count == 0:
+            await document_storage.release(normalized["sha256"])
+            return
+        await document_storage.release(doc["sha256"])
+        self.normalized += 1
+        self.processed += 1
+        self.bytes_saved += fields["file_size"] - normalized["size"]
+
+    async def _reject(self, document_id: str, error: str):
+        await self._finish(document_id, DocumentProcessingStatus.INVALID, {"processing_error": error})
+        # Reject it for the student unless staff have already reviewed it
+        await self._collection.update_one(
+            {"id": document_id, "status": {"$in": [DocumentStatus.UPLOADED.value, DocumentStatus.PENDING_VERIFICATION.value]}},
+            {"$set": {"status": DocumentStatus.REJECTED.value, "rejection_reason": error}}
+        )
+
+    async def _finish(self, document_id: str, status: DocumentProcessingStatus, fields: Optional[Dict] = None):
+        now = datetime.now(timezone.utc)
+        await self._collection.update_one(
+            {"id": document_id},
+            {"$set": {**(fields or {}), "processing_status": status.value, "processed_at": now, "updated_at": now}}
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "processed": self.processed,
+            "normalized": self.normalized,
+            "invalid": self.invalid,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "bytes_saved": self.bytes_saved
+        }
+
+
+# Singleton instance
+document_pipeline = DocumentPipeline()
@@ -0,0 +1,351 @@
+"""
+Document Storage for UNIFY Platform
+Content-addressed blob store: files are named by SHA-256 under two levels of
+shard directories and reference-counted, so identical uploads share one blob
+and the blob is removed only when its last document is deleted.
+
+Bytes live on a pluggable backend chosen by STORAGE_BACKEND: "local" (the
+default, a directory on this node) or "s3" (any S3-compatible service). The
+S3 backend can presign PUT/GET URLs so clients move bytes without the API.
+
+A blob whose last reference is dropped is first marked "deleting"; new
+references wait until the bytes are gone and the record is removed, so a
+concurrent upload of the same content can never end up pointing at a blob
+that is being deleted.
+"""
+import asyncio
+import base64
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from services.file_serving import content_disposition
+
+logger = logging.getLogger(__name__)
+
+# A blob marked deleting for longer than this belongs to a release() that died
+STALE_DELETE = timedelta(minutes=5)
+
+# Pause between checks while another request finishes deleting a blob
+DELETE_WAIT_SECONDS = 0.05
+
+
+def _rename(source: Path, destination: Path) -> bool:
+    try:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, destination)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class LocalBackend:
+    """Blobs in a directory on this node"""
+
+    supports_presigned = False
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key
+
+    def url_for(self, key: str) -> str:
+        return f"/uploads/blobs/{key}"
+
+    async def store(self, source: Path, key: str, content_type: str):
+        await asyncio.to_thread(_rename, source, self.path_for(key))
+
+    async def exists(self, key: str, size: Optional[int] = None) -> bool:
+        path = self.path_for(key)
+        try:
+            stat = await asyncio.to_thread(path.stat)
+        except FileNotFoundError:
+            return False
+        return size is None or stat.st_size == size
+
+    async def fetch(self, key: str, destination: Path) -> Path:
+        """Blobs are already local files, so destination is unused"""
+        return self.path_for(key)
+
+    async def remove(self, key: str):
+        await asyncio.to_thread(_unlink, self.path_for(key))
+
+
+def _checksum(sha256: str) -> str:
+    """Hex SHA-256 in the base64 form S3 uses for x-amz-checksum-sha256"""
+    return base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+
+
+class S3Backend:
+    """Blobs in an S3-compatible bucket, e.g. AWS S3 or a local MinIO"""
+
+    supports_presigned = True
+
+    def __init__(self, bucket: str, prefix: str, endpoint_url: Optional[str],
+                 region: Optional[str], presign_seconds: int):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_seconds = presign_seconds
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"})
+        )
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def url_for(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.object_key(key)}"
+
+    async def store(self, source: Path, key: str, content_type: str):
+        await asyncio.to_thread(
+            self.client.upload_file, str(source), self.bucket, self.object_key(key),
+            ExtraArgs={"ContentType": content_type}
+        )
+        await asyncio.to_thread(_unlink, source)
+
+    async def exists(self, key: str, size: Optional[int] = None) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return size is None or head["ContentLength"] == size
+
+    async def fetch(self, key: str, destination: Path) -> Path:
+        await asyncio.to_thread(self.client.download_file, self.bucket, self.object_key(key), str(destination))
+        return destination
+
+    async def remove(self, key: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key))
+
+    async def adopt(self, staging_key: str, key: str, sha256: str, size: int) -> bool:
+        """Move a client upload from its staging key to the blob key.
+
+        False unless the staged object exists and S3 verified its SHA-256
+        and size, so a client cannot claim content it never uploaded.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(
+                self.client.head_object, Bucket=self.bucket, Key=self.object_key(staging_key), ChecksumMode="ENABLED"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        if head["ContentLength"] != size or head.get("ChecksumSHA256") != _checksum(sha256):
+            return False
+        await asyncio.to_thread(
+            self.client.copy_object, Bucket=self.bucket, Key=self.object_key(key),
+            CopySource={"Bucket": self.bucket, "Key": self.object_key(staging_key)}
+        )
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.object_key(staging_key))
+        return True
+
+    def presigned_put(self, key: str, sha256: str, size: int, content_type: str) -> Dict:
+        """URL plus headers the client must send; S3 rejects bodies whose hash or size differ"""
+        checksum = _checksum(sha256)
+        params = {
+            "Bucket": self.bucket,
+            "Key": self.object_key(key),
+            "ContentType": content_type,
+            "ContentLength": size,
+            "ChecksumSHA256": checksum
+        }
+        url = self.client.generate_presigned_url("put_object", Params=params, ExpiresIn=self.presign_seconds)
+        return {
+            "method": "PUT",
+            "url": url,
+            "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+            "expires_in": self.presign_seconds
+        }
+
+    def presigned_get(self, key: str, file_name: str, content_type: Optional[str] = None) -> Dict:
+        params = {
+            "Bucket": self.bucket,
+            "Key": self.object_key(key),
+            "ResponseContentDisposition": content_disposition("inline", file_name)
+        }
+        if content_type:
+            params["ResponseContentType"] = content_type
+        url = self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presign_seconds)
+        return {"url": url, "expires_in": self.presign_seconds}
+
+
+class DocumentStorage:
+    """Sharded, deduplicated blob storage with reference counts in MongoDB"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._backend = None
+        self._collection = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.deleted = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            kind = os.environ.get('STORAGE_BACKEND', 'local').lower()
+            if kind == 's3':
+                self._backend = S3Backend(
+                    bucket=os.environ['S3_BUCKET'],
+                    prefix=os.environ.get('S3_PREFIX', 'blobs/'),
+                    endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None,
+                    region=os.environ.get('S3_REGION') or None,
+                    presign_seconds=int(os.environ.get('S3_PRESIGN_SECONDS', 900))
+                )
+            elif kind == 'local':
+                self._backend = LocalBackend(Path(os.environ.get('DOCUMENT_STORAGE_ROOT', '/app/uploads/blobs')))
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+        return self._backend
+
+    def bind(self, collection):
+        self._collection = collection
+
+    @staticmethod
+    def key_path(sha256: str) -> str:
+        """Relative blob path, e.g. ab/cd/abcd…; two shard levels keep directories small"""
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def url_for(self, sha256: str) -> str:
+        return self.backend.url_for(self.key_path(sha256))
+
+    def local_path(self, sha256: str) -> Path:
+        """Filesystem path of a blob; only meaningful for the local backend"""
+        return self.backend.path_for(self.key_path(sha256))
+
+    async def fetch(self, sha256: str, destination: Path) -> Path:
+        """A readable local copy of a blob; it is written to destination only
+        when the backend is remote, so compare the result before deleting it"""
+        return await self.backend.fetch(self.key_path(sha256), destination)
+
+    async def _reference(self, sha256: str, size: int) -> bool:
+        """Take a reference; True if the blob record is new.
+
+        Waits while a release() is deleting the blob, so the caller always
+        writes or checks the bytes after the deletion has finished.
+        """
+        while True:
+            try:
+                previous = await self._collection.find_one_and_update(
+                    {"_id": sha256, "deleting": {"$ne": True}},
+                    {
+                        "$inc": {"refs": 1},
+                        "$setOnInsert": {"size": size, "created_at": datetime.now(timezone.utc)}
+                    },
+                    upsert=True
+                )
+                break
+            except DuplicateKeyError:
+                # The record exists but is being deleted; take over if its deleter died
+                stale = await self._collection.delete_one({
+                    "_id": sha256,
+                    "deleting": True,
+                    "deleting_at": {"$lt": datetime.now(timezone.utc) - STALE_DELETE}
+                })
+                if stale.deleted_count == 0:
+                    await asyncio.sleep(DELETE_WAIT_SECONDS)
+        if previous is None:
+            self.stored += 1
+            return True
+        self.deduplicated += 1
+        return False
+
+    async def put(self, upload) -> bool:
+        """Store a received upload under its hash and take a reference.
+
+        Returns True if the content was new. The bytes are always written
+        after the reference is taken, which keeps the blob present even if a
+        concurrent release() is deleting the previous copy.
+        """
+        created = await self._reference(upload.sha256, upload.size)
+        await self.backend.store(upload.path, self.key_path(upload.sha256), upload.content_type)
+        return created
+
+    @staticmethod
+    def staging_key(upload_id: str) -> str:
+        """Where a direct upload lands until it is claimed and verified.
+
+        Abandoned uploads stay there; give the bucket a lifecycle rule that
+        expires incoming/ after a day or so.
+        """
+        return f"incoming/{upload_id}"
+
+    def presigned_put(self, upload_id: str, sha256: str, size: int, content_type: str) -> Dict:
+        return self.backend.presigned_put(self.staging_key(upload_id), sha256, size, content_type)
+
+    def presigned_get(self, sha256: str, file_name: str, content_type: Optional[str] = None) -> Dict:
+        return self.backend.presigned_get(self.key_path(sha256), file_name, content_type)
+
+    async def claim(self, sha256: str, size: int, upload_id: Optional[str] = None) -> bool:
+        """Take a reference to bytes a client uploaded directly; False if they are missing.
+
+        With upload_id the bytes must be in that upload's staging object with
+        a matching checksum. Without it the blob must already exist, which
+        callers may only rely on when the client already owns this content.
+        """
+        await self._reference(sha256, size)
+        if upload_id is not None:
+            found = await self.backend.adopt(self.staging_key(upload_id), self.key_path(sha256), sha256, size)
+        else:
+            found = await self.backend.exists(self.key_path(sha256), size)
+        if found:
+            return True
+        await self.release(sha256)
+        return False
+
+    async def release(self, sha256: str):
+        """Drop one reference; delete the blob when none remain"""
+        await self._collection.update_one({"_id": sha256}, {"$inc": {"refs": -1}})
+        marked = await self._collection.update_one(
+            {"_id": sha256, "refs": {"$lte": 0}, "deleting": {"$ne": True}},
+            {"$set": {"deleting": True, "deleting_at": datetime.now(timezone.utc)}}
+        )
+        if marked.modified_count == 0:
+            return
+
+        # No reference can be taken from here until the record is gone
+        try:
+            await self.backend.remove(self.key_path(sha256))
+        except Exception as e:
+            # Leave the mark; a later reference takes over once it is stale
+            logger.error(f"Failed to delete blob {sha256}: {str(e)}")
+            return
+        await self._collection.delete_one({"_id": sha256, "deleting": True})
+        self.deleted += 1
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "deleted": self.deleted
+        }
+
+
+# Singleton instance
+document_storage = DocumentStorage()
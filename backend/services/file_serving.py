@@ -0,0 +1,151 @@
+"""
+File Serving for UNIFY Platform
+Conditional and ranged file responses: ETag / If-None-Match, Last-Modified /
+If-Modified-Since and single-range Range requests, with full bodies sent via
+FileResponse so servers that support pathsend can hand the file to the kernel
+"""
+import os
+import re
+import stat as stat_module
+import unicodedata
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._() -]')
+
+
+def content_disposition(disposition: str, file_name: str) -> str:
+    """Content-Disposition for a user-supplied file name.
+
+    An ASCII fallback in filename= for old clients, and the real name in
+    RFC 5987 filename*= so quotes and non-ASCII characters survive intact.
+    """
+    fallback = unicodedata.normalize("NFKD", file_name).encode("ascii", "ignore").decode("ascii")
+    fallback = _UNSAFE_FILENAME_CHARS.sub("_", fallback).strip() or "download"
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(file_name, safe='')}"
+
+
+class FileRangeResponse(FileResponse):
+    """206 response carrying bytes [start, end] of a file"""
+
+    def __init__(self, path: Path, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) for a single 'bytes=' range; None if absent or multi-range,
+    raises ValueError if unsatisfiable"""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the final N bytes
+            start = max(0, size - int(last))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+async def serve_file(
+    request: Request,
+    path: Path,
+    file_name: str,
+    media_type: Optional[str] = None,
+    etag: Optional[str] = None,
+    cache_control: str = "private, no-cache"
+) -> Response:
+    """Serve a file honouring conditional and Range headers; 404 if it is missing.
+
+    Pass a content-derived etag (e.g. the blob hash) when there is one;
+    otherwise it is derived from size and mtime.
+    """
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    except FileNotFoundError:
+        return Response(status_code=404)
+    if not stat_module.S_ISREG(stat_result.st_mode):
+        return Response(status_code=404)
+
+    size = stat_result.st_size
+    etag = etag or f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers: Dict[str, str] = {
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes"
+    }
+    disposition = {"content-disposition": content_disposition("inline", file_name)}
+
+    # If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if int(stat_result.st_mtime) <= since.timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, last_modified)):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range is not None:
+            return FileRangeResponse(
+                path, *byte_range, size,
+                headers={**headers, **disposition}, media_type=media_type
+            )
+
+    return FileResponse(
+        path, headers={**headers, **disposition}, media_type=media_type, stat_result=stat_result
+    )
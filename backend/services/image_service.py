@@ -0,0 +1,133 @@
+"""
+Image Derivative Service for UNIFY Platform
+Renders resized WebP variants of uploaded images with Pillow on a process
+pool, so decoding and encoding large photos never runs on the event loop
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> longest edge in pixels; images are never upscaled
+VARIANTS = {
+    "thumb": 320,
+    "medium": 960,
+    "full": 1920
+}
+
+# Refuse images that decode to more than this many pixels (decompression bombs)
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidImage(Exception):
+    """The upload is not an image Pillow can decode"""
+
+
+def _render_variants(source: str, directory: str, stem: str, quality: int) -> Dict[str, Dict]:
+    """Write {stem}_{variant}.webp files next to each other; runs in a worker process.
+
+    On failure no variant file is left behind.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    written = []
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            variants = {}
+            for name, edge in VARIANTS.items():
+                variant = image.copy()
+                variant.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                file_name = f"{stem}_{name}.webp"
+                written.append(os.path.join(directory, file_name))
+                variant.save(written[-1], "WEBP", quality=quality, method=4)
+                variants[name] = {"file_name": file_name, "width": variant.width, "height": variant.height}
+            return variants
+    except Exception as e:
+        for path in written:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if isinstance(e, (OSError, Image.DecompressionBombError, SyntaxError)):
+            raise InvalidImage(str(e)) from None
+        raise
+
+
+class ImageService:
+    """Async facade over Pillow backed by a process pool"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = None
+        self._quality = None
+        self.rendered = 0
+        self.failed = 0
+        self.total_ms = 0.0
+
+    @property
+    def workers(self) -> int:
+        if self._workers is None:
+            default = min(2, os.cpu_count() or 1)
+            self._workers = max(1, int(os.environ.get('IMAGE_WORKERS', default)))
+        return self._workers
+
+    @property
+    def quality(self) -> int:
+        if self._quality is None:
+            self._quality = min(100, max(1, int(os.environ.get('IMAGE_WEBP_QUALITY', 80))))
+        return self._quality
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs the event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Image derivative pool started: process x {self.workers}")
+        return self._executor
+
+    async def render_variants(self, source: Path, directory: Path, stem: str) -> Dict[str, Dict]:
+        """Render every variant of source into directory; raises InvalidImage"""
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(directory.mkdir, parents=True, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            variants = await loop.run_in_executor(
+                self.executor, _render_variants, str(source), str(directory), stem, self.quality
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        self.rendered += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return variants
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "quality": self.quality,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "avg_ms": round(self.total_ms / self.rendered, 2) if self.rendered else 0.0
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance
+image_service = ImageService()
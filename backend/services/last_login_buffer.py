@@ -0,0 +1,108 @@
+"""
+Last Login Write-Behind Buffer for UNIFY Platform
+Collects last_login timestamps in memory and flushes them to MongoDB in
+periodic unordered bulk writes instead of one update per login
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """Buffers user_id -> last_login and flushes with bulk_write"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._interval = None
+        self._max_pending = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, str] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+
+    @property
+    def interval(self) -> float:
+        if self._interval is None:
+            self._interval = max(0.1, float(os.environ.get('LAST_LOGIN_FLUSH_SECONDS', 5)))
+        return self._interval
+
+    @property
+    def max_pending(self) -> int:
+        if self._max_pending is None:
+            self._max_pending = max(1, int(os.environ.get('LAST_LOGIN_MAX_PENDING', 1000)))
+        return self._max_pending
+
+    def start(self, collection):
+        """Start the periodic flusher against the users collection"""
+        self._collection = collection
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, user_id: str, timestamp: str):
+        """Remember a login; the latest timestamp per user wins"""
+        self._pending[user_id] = timestamp
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if self._collection is None or not self._pending:
+            return
+
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            operations = [
+                UpdateOne({"id": user_id}, {"$set": {"last_login": timestamp}})
+                for user_id, timestamp in batch.items()
+            ]
+            try:
+                await self._collection.bulk_write(operations, ordered=False)
+                self.flushes += 1
+                self.written += len(operations)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Failed to flush last_login updates: {str(e)}")
+                # Put the batch back unless a newer login arrived meanwhile
+                for user_id, timestamp in batch.items():
+                    self._pending.setdefault(user_id, timestamp)
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self._pending),
+            "flush_interval_seconds": self.interval,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failures": self.failures
+        }
+
+
+# Singleton instance
+last_login_buffer = LastLoginBuffer()
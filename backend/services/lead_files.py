@@ -0,0 +1,170 @@
+"""
+Lead Files for UNIFY Platform
+Incremental readers for uploaded CSV and XLSX lead files. Rows are read in
+fixed-size batches on a worker thread and mapped to lead fields through a
+configurable column mapping, so memory use does not grow with file size.
+"""
+import asyncio
+import csv
+import json
+import os
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from services.lead_import import ROW_NUMBER_FIELD
+
+LEAD_FILE_TYPES = ("csv", "xlsx")
+
+# Default upload limit; LEAD_IMPORT_MAX_FILE_MB overrides it
+LEAD_FILE_MAX_SIZE_MB = 50
+
+# Lead field -> column headers accepted for it when no mapping is given
+DEFAULT_COLUMN_ALIASES: Dict[str, List[str]] = {
+    "name": ["name", "full_name", "full name", "student_name"],
+    "email": ["email", "email_address", "email address"],
+    "phone": ["phone", "mobile", "phone_number", "phone number", "contact"],
+    "source": ["source"],
+    "course_interest": ["course_interest", "course", "course interest"]
+}
+
+
+def lead_file_max_bytes() -> int:
+    return max(1, int(os.environ.get('LEAD_IMPORT_MAX_FILE_MB', LEAD_FILE_MAX_SIZE_MB))) * 1024 * 1024
+
+
+class LeadFileError(ValueError):
+    """The file or the column mapping cannot be used"""
+
+
+def parse_column_mapping(raw: Optional[str]) -> Dict[str, List[str]]:
+    """Column mapping from the form field: a JSON object of lead field -> header.
+
+    Fields left out fall back to DEFAULT_COLUMN_ALIASES.
+    """
+    if not raw:
+        return DEFAULT_COLUMN_ALIASES
+    try:
+        mapping = json.loads(raw)
+    except ValueError:
+        raise LeadFileError("mapping must be a JSON object") from None
+    if not isinstance(mapping, dict):
+        raise LeadFileError("mapping must be a JSON object")
+
+    unknown = set(mapping) - set(DEFAULT_COLUMN_ALIASES)
+    if unknown:
+        raise LeadFileError(f"Unknown lead fields in mapping: {', '.join(sorted(unknown))}")
+    resolved = dict(DEFAULT_COLUMN_ALIASES)
+    for field, header in mapping.items():
+        if not isinstance(header, str) or not header.strip():
+            raise LeadFileError(f"Column for {field} must be a header name")
+        resolved[field] = [header]
+    return resolved
+
+
+def _column_indexes(header: List, mapping: Dict[str, List[str]]) -> Dict[str, int]:
+    positions = {str(cell).strip().lower(): index for index, cell in enumerate(header) if cell is not None}
+    indexes = {}
+    for field, aliases in mapping.items():
+        for alias in aliases:
+            if alias.strip().lower() in positions:
+                indexes[field] = positions[alias.strip().lower()]
+                break
+    if "name" not in indexes or not ({"email", "phone"} & set(indexes)):
+        raise LeadFileError("File needs a name column and an email or phone column")
+    return indexes
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store phone numbers as numbers: 9876543210.0
+        return str(int(value))
+    return str(value).strip()
+
+
+def _csv_rows(path: str) -> Iterator[Tuple[int, List]]:
+    """(line number, row) pairs; a quoted field spanning lines is numbered by its first line"""
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(8192)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        line = 1
+        try:
+            for row in reader:
+                yield line, row
+                line = reader.line_num + 1
+        except csv.Error as e:
+            raise LeadFileError(f"Line {reader.line_num}: {e}") from None
+
+
+def _xlsx_rows(path: str) -> Iterator[Tuple[int, List]]:
+    try:
+        import openpyxl
+    except ImportError:
+        raise LeadFileError("XLSX files are not supported on this server; upload a CSV") from None
+
+    try:
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        raise LeadFileError("File is not a valid XLSX workbook") from None
+    try:
+        # Rows come back in sheet order from row 1, empty ones included
+        rows = enumerate(workbook.active.iter_rows(values_only=True), start=1)
+        while True:
+            try:
+                row = next(rows, None)
+            except Exception:
+                raise LeadFileError("File is not a valid XLSX workbook") from None
+            if row is None:
+                return
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_lead_rows(path: str, file_type: str, mapping: Dict[str, List[str]]) -> Iterator[Dict[str, str]]:
+    """Lead rows from a file, one dict per non-empty line after the header.
+
+    Each row carries its line (CSV) or sheet row (XLSX) number, so error
+    samples point at the line the user sees in their editor.
+    """
+    rows = _csv_rows(path) if file_type == "csv" else _xlsx_rows(path)
+    first = next(rows, None)
+    if first is None:
+        raise LeadFileError("File is empty")
+    indexes = _column_indexes(list(first[1]), mapping)
+    for line, row in rows:
+        if not row or all(value in (None, "") for value in row):
+            continue
+        lead = {field: _cell_text(row[index]) if index < len(row) else "" for field, index in indexes.items()}
+        lead[ROW_NUMBER_FIELD] = line
+        yield lead
+
+
+def _next_batch(rows: Iterator[Dict[str, str]], size: int) -> List[Dict[str, str]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+async def read_lead_file(path: str, file_type: str, mapping: Dict[str, List[str]],
+                         batch_size: int) -> AsyncIterator[List[Dict[str, str]]]:
+    """Yield batches of at most batch_size rows, parsing off the event loop"""
+    if file_type not in LEAD_FILE_TYPES:
+        raise LeadFileError(f"Unsupported file type: {file_type}")
+    rows = iter_lead_rows(path, file_type, mapping)
+    try:
+        while True:
+            batch = await asyncio.to_thread(_next_batch, rows, batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        await asyncio.to_thread(rows.close)
@@ -0,0 +1,318 @@
+"""
+Lead Import for UNIFY Platform
+Set-based bulk import of leads: rows are normalized and validated in
+chunks, duplicates within the file are dropped, existing leads are matched
+with one $in query per chunk and new leads are written with one unordered
+insert_many, so round trips grow with the number of chunks, not rows
+
+Every path that writes a lead stores its email lowercased and its phone as
+digits only, so matching on the stored values finds a lead however it was
+typed. normalize_existing_leads() brings older leads into the same form.
+"""
+import logging
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.lead import Lead, LeadSource, Note, TimelineEntry, TimelineEventType
+
+logger = logging.getLogger(__name__)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_email(value) -> str:
+    return str(value or "").strip().lower()
+
+
+def normalize_phone(value) -> str:
+    """Digits only, so "+91 98765-43210" and "919876543210" match"""
+    return _NON_DIGITS.sub("", str(value or ""))
+
+
+async def normalize_existing_leads(collection, batch_size: int = 1000) -> int:
+    """Rewrite emails and phones of leads stored before normalization; returns leads changed.
+
+    Only leads whose values are not yet normalized are read, so after the
+    first run this is a single query that matches nothing.
+    """
+    changed = 0
+    cursor = collection.find(
+        {"$or": [
+            {"email": {"$regex": r"[A-Z]|^\s|\s$"}},
+            {"phone": {"$regex": r"\D"}}
+        ]},
+        {"_id": 0, "id": 1, "email": 1, "phone": 1}
+    )
+    updates = []
+    async for lead in cursor:
+        updates.append(UpdateOne(
+            {"id": lead["id"]},
+            {"$set": {"email": normalize_email(lead.get("email")), "phone": normalize_phone(lead.get("phone"))}}
+        ))
+        if len(updates) >= batch_size:
+            changed += (await collection.bulk_write(updates, ordered=False)).modified_count
+            updates = []
+    if updates:
+        changed += (await collection.bulk_write(updates, ordered=False)).modified_count
+    if changed:
+        logger.info(f"Normalized email and phone on {changed} existing leads")
+    return changed
+
+
+# Per-row errors kept for the caller; the counts still cover every row
+ERROR_SAMPLE_LIMIT = 50
+
+# Optional row key holding the row's number in its source file, used in
+# error samples instead of the row's position in the import
+ROW_NUMBER_FIELD = "_row"
+
+_LEAD_SOURCES = {lead_source.value for lead_source in LeadSource}
+
+# Third-party platforms whose exports share one row format
+PARTNER_SOURCES = {
+    "shiksha": (LeadSource.SHIKSHA, "Shiksha"),
+    "collegedunia": (LeadSource.COLLEGEDUNIA, "Collegedunia")
+}
+
+
+def import_batch_size() -> int:
+    return max(1, int(os.environ.get('LEAD_IMPORT_BATCH_SIZE', 1000)))
+
+
+class MissingLeadFields(ValueError):
+    pass
+
+
+def build_bulk_upload_lead(row: Dict, job: Dict) -> Lead:
+    """A row from the counselling manager's CSV upload"""
+    # Skip if missing required fields
+    if not row.get('name') or not (row.get('email') or row.get('phone')):
+        raise MissingLeadFields("name and an email or phone are required")
+
+    source = row.get('source')
+    lead = Lead(
+        university_id=job["university_id"],
+        name=row.get('name', ''),
+        email=row.get('email', ''),
+        phone=row.get('phone', ''),
+        source=source if source in _LEAD_SOURCES else LeadSource.MANUAL,
+        source_details=source or 'bulk_upload',
+        course_interest=row.get('course_interest', '')
+    )
+    lead.timeline.append(TimelineEntry(
+        event_type=TimelineEventType.CREATED,
+        description="Lead imported via bulk upload",
+        created_by=job["created_by"],
+        created_by_name=job["created_by_name"]
+    ))
+    return lead
+
+
+def build_partner_lead(row: Dict, job: Dict) -> Lead:
+    """A row from a Shiksha or Collegedunia export"""
+    lead_source, name = PARTNER_SOURCES[job["source"]]
+    lead = Lead(
+        university_id=job["university_id"],
+        name=row.get('name', ''),
+        email=row.get('email', ''),
+        phone=row.get('phone', ''),
+        source=lead_source,
+        source_details=row.get('campaign', f'{name} Import'),
+        course_interest=row.get('course_interest', ''),
+        notes=[]
+    )
+
+    # Add initial note with source info
+    if row.get('inquiry_details'):
+        lead.notes.append(Note(
+            content=f"{name} Inquiry: {row.get('inquiry_details')}",
+            created_by="system",
+            created_by_name="System Import"
+        ))
+
+    lead.timeline.append(TimelineEntry(
+        event_type=TimelineEventType.CREATED,
+        description=f"Lead imported from {name}",
+        created_by=job["created_by"],
+        created_by_name=job["created_by_name"],
+        metadata={"source": job["source"], "campaign": row.get('campaign')}
+    ))
+    return lead
+
+
+def build_webhook_lead(row: Dict, job: Dict) -> Lead:
+    """A lead pushed by a partner to the import webhook"""
+    source = job["source"]
+    lead = Lead(
+        university_id=job["university_id"],
+        name=row.get('name', row.get('student_name', '')),
+        email=row.get('email', row.get('student_email', '')),
+        phone=row.get('phone', row.get('mobile', '')),
+        source=PARTNER_SOURCES.get(source, (LeadSource.OTHER_API,))[0],
+        source_details=f"Webhook import from {source}",
+        course_interest=row.get('course_interest', row.get('course', '')),
+    )
+    lead.timeline.append(TimelineEntry(
+        event_type=TimelineEventType.CREATED,
+        description=f"Lead received via {source} webhook",
+        created_by="webhook",
+        created_by_name="System Webhook",
+        metadata={"source": source, "raw_data": row}
+    ))
+    return lead
+
+
+# Import kind -> how to turn one of its rows into a Lead. Jobs store only the
+# kind and these fields, so any worker can rebuild the builder after a restart.
+LEAD_ROW_BUILDERS: Dict[str, Callable[[Dict, Dict], Lead]] = {
+    "bulk_upload": build_bulk_upload_lead,
+    "partner": build_partner_lead,
+    "webhook": build_webhook_lead
+}
+
+
+class LeadImportResult:
+    """Running counts for one import"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.errors: List[Dict] = []
+
+    def fail(self, row_number: int, error: str):
+        self.failed += 1
+        if len(self.errors) < ERROR_SAMPLE_LIMIT:
+            self.errors.append({"row": row_number, "error": error})
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"created": self.created, "failed": self.failed, "duplicates": self.duplicates}
+
+
+class LeadImporter:
+    """Imports rows for one university, remembering what it has already seen.
+
+    ``make_lead(row)`` turns a raw row into a Lead and raises for rows that
+    should count as failed. Emails and phones on the result are normalized
+    before matching and storing. Rows are numbered from 1 in error samples,
+    unless they carry their own number under ROW_NUMBER_FIELD.
+    """
+
+    def __init__(self, collection, university_id: str, make_lead: Callable[[Dict], Lead]):
+        self.collection = collection
+        self.university_id = university_id
+        self.make_lead = make_lead
+        self.result = LeadImportResult()
+        self._seen_emails: Set[str] = set()
+        self._seen_phones: Set[str] = set()
+
+    def _is_new(self, email: str, phone: str) -> bool:
+        """False if an earlier row already used the email or phone"""
+        if (email and email in self._seen_emails) or (phone and phone in self._seen_phones):
+            return False
+        if email:
+            self._seen_emails.add(email)
+        if phone:
+            self._seen_phones.add(phone)
+        return True
+
+    def _build(self, rows: Iterable[Dict], first_row: int) -> Tuple[List[Dict], List[int], Set[str], Set[str]]:
+        """Validated, normalized lead documents for rows not seen earlier in
+        this import with their row numbers, plus emails and phones as given
+        (older leads were stored as typed)"""
+        leads, row_numbers = [], []
+        given_emails, given_phones = set(), set()
+        for row_number, row in enumerate(rows, start=first_row):
+            if isinstance(row, dict):
+                row_number = row.get(ROW_NUMBER_FIELD, row_number)
+            try:
+                lead = self.make_lead(row)
+            except Exception as e:
+                self.result.fail(row_number, _describe(e))
+                continue
+            given_emails.add(lead.email)
+            given_phones.add(lead.phone)
+            lead.email = normalize_email(lead.email)
+            lead.phone = normalize_phone(lead.phone)
+            if not self._is_new(lead.email, lead.phone):
+                self.result.duplicates += 1
+                continue
+            leads.append(lead.model_dump())
+            row_numbers.append(row_number)
+        return leads, row_numbers, given_emails, given_phones
+
+    async def _existing(self, leads: List[Dict], given_emails: Set[str], given_phones: Set[str]) -> Tuple[Set[str], Set[str]]:
+        """Normalized emails and phones of stored leads matching this chunk, in one query"""
+        emails = [email for email in {lead["email"] for lead in leads} | given_emails if email]
+        phones = [phone for phone in {lead["phone"] for lead in leads} | given_phones if phone]
+        conditions = []
+        if emails:
+            conditions.append({"email": {"$in": emails}})
+        if phones:
+            conditions.append({"phone": {"$in": phones}})
+        if not conditions:
+            return set(), set()
+
+        matches = await self.collection.find(
+            {"university_id": self.university_id, "$or": conditions},
+            {"_id": 0, "email": 1, "phone": 1}
+        ).to_list(None)
+        return (
+            {normalize_email(match.get("email")) for match in matches},
+            {normalize_phone(match.get("phone")) for match in matches}
+        )
+
+    async def add_chunk(self, rows: Iterable[Dict], first_row: int = 1) -> LeadImportResult:
+        """Import one chunk of rows: one find and at most one insert_many"""
+        leads, row_numbers, given_emails, given_phones = self._build(rows, first_row)
+        if not leads:
+            return self.result
+
+        existing_emails, existing_phones = await self._existing(leads, given_emails, given_phones)
+        new_leads, new_row_numbers = [], []
+        for lead, row_number in zip(leads, row_numbers):
+            if (lead["email"] and lead["email"] in existing_emails) or (lead["phone"] and lead["phone"] in existing_phones):
+                self.result.duplicates += 1
+            else:
+                new_leads.append(lead)
+                new_row_numbers.append(row_number)
+        if not new_leads:
+            return self.result
+
+        try:
+            await self.collection.insert_many(new_leads, ordered=False)
+            self.result.created += len(new_leads)
+        except BulkWriteError as e:
+            self.result.created += e.details.get("nInserted", 0)
+            for error in e.details.get("writeErrors", []):
+                self.result.fail(new_row_numbers[error["index"]], error.get("errmsg", "Write failed"))
+        return self.result
+
+    async def add_rows(self, rows: Iterable[Dict], batch_size: Optional[int] = None) -> LeadImportResult:
+        """Import rows in chunks of batch_size"""
+        batch_size = batch_size or import_batch_size()
+        chunk, first_row = [], 1
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                await self.add_chunk(chunk, first_row)
+                first_row += len(chunk)
+                chunk = []
+        if chunk:
+            await self.add_chunk(chunk, first_row)
+        return self.result
+
+
+def _describe(error: Exception) -> str:
+    """Short message for a row that failed validation"""
+    errors = getattr(error, "errors", None)
+    if callable(errors):
+        # pydantic ValidationError: name the offending fields
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in errors()
+        )
+    return str(error) or type(error).__name__
@@ -0,0 +1,381 @@
+"""
+Lead Import Jobs for UNIFY Platform
+Runs lead imports outside the request: rows are staged in MongoDB in
+chunks, the request returns a job id, and a background worker imports one
+chunk at a time, recording counts and error samples on the job as it goes.
+
+Workers hold a lease on the job they run and advance next_chunk after each
+chunk, so a job whose worker died is picked up where it stopped by any
+other worker once the lease lapses. A chunk interrupted mid-way is simply
+imported again; leads it already wrote are then counted as duplicates.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import bson
+from pymongo import ReturnDocument
+
+from services.lead_import import ERROR_SAMPLE_LIMIT, LEAD_ROW_BUILDERS, LeadImporter, import_batch_size
+from services.platform_counters import platform_counters
+
+logger = logging.getLogger(__name__)
+
+STAGING = "staging"
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+ACTIVE_STATUSES = [STAGING, QUEUED, RUNNING]
+
+# A worker renews its lease after every chunk; a dead worker's job is retried after this
+LEASE = timedelta(seconds=60)
+
+# Claims of the same job before it is marked failed rather than retried again
+MAX_ATTEMPTS = 5
+
+# A job still staging after this was abandoned by a request that died mid-upload
+STAGING_TIMEOUT = timedelta(hours=1)
+
+# How often a worker looks for abandoned staging jobs
+STAGING_SWEEP_INTERVAL = timedelta(minutes=5)
+
+# Staged rows per chunk document are capped by size as well as count, well
+# inside MongoDB's 16MB document limit
+CHUNK_MAX_BYTES = 8 * 1024 * 1024
+
+# Larger than any real lead; such a row is refused rather than staged
+ROW_MAX_BYTES = 256 * 1024
+
+# Fields only the worker needs
+_INTERNAL_FIELDS = ("_id", "worker", "lease_until", "attempts", "batch_size", "next_chunk", "total_chunks")
+
+
+class ImportRowTooLarge(ValueError):
+    """A row is too large to stage"""
+
+
+class ImportJobWriter:
+    """Stages rows for a new job in chunks; submit() hands the job to the workers"""
+
+    def __init__(self, service: "LeadImportJobs", job: Dict):
+        self.service = service
+        self.job = job
+        self._buffer: List[Dict] = []
+        self._buffer_bytes = 0
+
+    async def add(self, row: Dict):
+        size = len(bson.encode({"row": row}))
+        if size > ROW_MAX_BYTES:
+            row_number = self.job["total_rows"] + len(self._buffer) + 1
+            raise ImportRowTooLarge(f"Row {row_number} is larger than {ROW_MAX_BYTES // 1024}KB")
+        if self._buffer_bytes + size > CHUNK_MAX_BYTES:
+            await self._flush()
+        self._buffer.append(row)
+        self._buffer_bytes += size
+        if len(self._buffer) >= self.job["batch_size"]:
+            await self._flush()
+
+    async def add_many(self, rows: Iterable[Dict]):
+        for row in rows:
+            await self.add(row)
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        await self.service._chunks.insert_one({
+            "job_id": self.job["id"],
+            "index": self.job["total_chunks"],
+            # Chunks vary in length, so each records where its rows start
+            "first_row": self.job["total_rows"] + 1,
+            "rows": self._buffer,
+            "created_at": datetime.now(timezone.utc)
+        })
+        self.job["total_chunks"] += 1
+        self.job["total_rows"] += len(self._buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    async def submit(self) -> Dict:
+        await self._flush()
+        result = await self.service._jobs.update_one(
+            {"id": self.job["id"], "status": STAGING},
+            {"$set": {
+                "status": QUEUED,
+                "total_rows": self.job["total_rows"],
+                "total_chunks": self.job["total_chunks"]
+            }}
+        )
+        if result.modified_count == 0:
+            # Staging outlived STAGING_TIMEOUT and the sweep failed the job
+            self.job["status"] = FAILED
+            return self.job
+        self.job["status"] = QUEUED
+        self.service.wake()
+        return self.job
+
+    async def discard(self):
+        await self.service._jobs.delete_one({"id": self.job["id"], "status": STAGING})
+        await self.service._chunks.delete_many({"job_id": self.job["id"]})
+
+
+class LeadImportJobs:
+    """Queue of lead import jobs in MongoDB, drained by a background worker"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._poll_interval = None
+        self._jobs = None
+        self._chunks = None
+        self._leads = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._swept_at: Optional[datetime] = None
+        self.worker_id = uuid.uuid4().hex
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.chunks_processed = 0
+
+    @property
+    def poll_interval(self) -> float:
+        if self._poll_interval is None:
+            self._poll_interval = max(0.5, float(os.environ.get('LEAD_IMPORT_POLL_SECONDS', 5)))
+        return self._poll_interval
+
+    def bind(self, db):
+        self._jobs = db.lead_import_jobs
+        self._chunks = db.lead_import_chunks
+        self._leads = db.leads
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Start on newly queued work now rather than at the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def begin(self, kind: str, university_id: str, created_by: str,
+                    created_by_name: str, source: Optional[str] = None) -> ImportJobWriter:
+        """Create a job in the staging state and return a writer for its rows"""
+        job = {
+            "id": str(uuid.uuid4()),
+            "university_id": university_id,
+            "kind": kind,
+            "source": source,
+            "created_by": created_by,
+            "created_by_name": created_by_name,
+            "status": STAGING,
+            "batch_size": import_batch_size(),
+            "total_rows": 0,
+            "total_chunks": 0,
+            "next_chunk": 0,
+            "processed_rows": 0,
+            "created": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "errors": [],
+            "error": None,
+            "attempts": 0,
+            "worker": None,
+            "lease_until": None,
+            "created_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None
+        }
+        await self._jobs.insert_one(job)
+        job.pop("_id", None)
+        return ImportJobWriter(self, job)
+
+    async def submit_rows(self, kind: str, university_id: str, created_by: str,
+                          created_by_name: str, rows: Iterable[Dict], source: Optional[str] = None) -> Dict:
+        """Stage a list of rows as a new job and queue it"""
+        writer = await self.begin(kind, university_id, created_by, created_by_name, source)
+        try:
+            await writer.add_many(rows)
+        except BaseException:
+            await writer.discard()
+            raise
+        return await writer.submit()
+
+    @staticmethod
+    def public(job: Dict) -> Dict:
+        return {key: value for key, value in job.items() if key not in _INTERNAL_FIELDS}
+
+    async def get(self, job_id: str, university_id: str) -> Optional[Dict]:
+        job = await self._jobs.find_one({"id": job_id, "university_id": university_id}, {"_id": 0})
+        return self.public(job) if job else None
+
+    async def recent(self, university_id: str, limit: int = 20) -> List[Dict]:
+        jobs = await self._jobs.find(
+            {"university_id": university_id}, {"_id": 0, "errors": 0}
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+        return [self.public(job) for job in jobs]
+
+    async def cancel(self, job_id: str, university_id: str) -> bool:
+        """Stop a job; rows already imported stay imported"""
+        result = await self._jobs.update_one(
+            {"id": job_id, "university_id": university_id, "status": {"$in": ACTIVE_STATUSES}},
+            {"$set": {"status": CANCELLED, "finished_at": datetime.now(timezone.utc), "lease_until": None}}
+        )
+        if result.modified_count == 0:
+            return False
+        # A running worker notices at its next lease renewal
+        await self._chunks.delete_many({"job_id": job_id})
+        return True
+
+    async def sweep_staging(self) -> int:
+        """Fail jobs whose staging request died; returns how many were failed"""
+        now = datetime.now(timezone.utc)
+        abandoned = await self._jobs.find(
+            {"status": STAGING, "created_at": {"$lt": now - STAGING_TIMEOUT}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        failed = 0
+        for job in abandoned:
+            result = await self._jobs.update_one(
+                {"id": job["id"], "status": STAGING},
+                {"$set": {
+                    "status": FAILED,
+                    "error": "Import was interrupted before all rows were received",
+                    "finished_at": now
+                }}
+            )
+            if result.modified_count:
+                await self._chunks.delete_many({"job_id": job["id"]})
+                failed += 1
+        self.jobs_failed += failed
+        return failed
+
+    async def _run(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            if self._swept_at is None or now - self._swept_at >= STAGING_SWEEP_INTERVAL:
+                self._swept_at = now
+                try:
+                    await self.sweep_staging()
+                except Exception as e:
+                    logger.error(f"Failed to sweep staging lead import jobs: {str(e)}")
+
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim lead import job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.process(job)
+            except Exception as e:
+                # Leave the lease to lapse; the job is retried up to MAX_ATTEMPTS
+                logger.error(f"Lead import job {job['id']} failed at chunk {job['next_chunk']}: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim(self) -> Optional[Dict]:
+        """Take the oldest queued job, or a running one whose worker stopped renewing"""
+        now = datetime.now(timezone.utc)
+        return await self._jobs.find_one_and_update(
+            {
+                "status": {"$in": [QUEUED, RUNNING]},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {
+                "$set": {"status": RUNNING, "worker": self.worker_id, "lease_until": now + LEASE},
+                "$min": {"started_at": now},
+                "$inc": {"attempts": 1}
+            },
+            projection={"_id": 0},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def process(self, job: Dict):
+        """Import the job's remaining chunks, recording progress after each"""
+        if job["attempts"] > MAX_ATTEMPTS:
+            await self._finish(job, FAILED, "Import stopped after repeated worker failures")
+            return
+
+        build = LEAD_ROW_BUILDERS[job["kind"]]
+        importer = LeadImporter(self._leads, job["university_id"], lambda row: build(row, job))
+        result = importer.result
+
+        for index in range(job["next_chunk"], job["total_chunks"]):
+            chunk = await self._chunks.find_one({"job_id": job["id"], "index": index}, {"_id": 0, "rows": 1, "first_row": 1})
+            chunk = chunk or {"rows": []}
+            before = (result.created, result.duplicates, result.failed, len(result.errors))
+            await importer.add_chunk(chunk["rows"], first_row=chunk.get("first_row", index * job["batch_size"] + 1))
+            created = result.created - before[0]
+
+            now = datetime.now(timezone.utc)
+            update = await self._jobs.update_one(
+                {"id": job["id"], "worker": self.worker_id, "status": RUNNING, "next_chunk": index},
+                {
+                    "$inc": {
+                        "processed_rows": len(chunk["rows"]),
+                        "created": created,
+                        "duplicates": result.duplicates - before[1],
+                        "failed": result.failed - before[2]
+                    },
+                    "$push": {"errors": {"$each": result.errors[before[3]:], "$slice": ERROR_SAMPLE_LIMIT}},
+                    "$set": {"next_chunk": index + 1, "lease_until": now + LEASE}
+                }
+            )
+            if created:
+                await platform_counters.increment({"leads": created})
+            self.chunks_processed += 1
+            if update.modified_count == 0:
+                # Cancelled, or the lease lapsed and another worker took over
+                return
+
+        await self._finish(job, COMPLETED)
+
+    async def _finish(self, job: Dict, status: str, error: Optional[str] = None):
+        result = await self._jobs.update_one(
+            {"id": job["id"], "worker": self.worker_id, "status": RUNNING},
+            {"$set": {
+                "status": status,
+                "error": error,
+                "finished_at": datetime.now(timezone.utc),
+                "lease_until": None
+            }}
+        )
+        if result.modified_count:
+            await self._chunks.delete_many({"job_id": job["id"]})
+            if status == COMPLETED:
+                self.jobs_completed += 1
+            else:
+                self.jobs_failed += 1
+
+    def stats(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "chunks_processed": self.chunks_processed
+        }
+
+
+# Singleton instance
+lead_import_jobs = LeadImportJobs()
@@ -0,0 +1,259 @@
+"""
+Lead Import Keys for UNIFY Platform
+API keys partners use to push leads to the import webhook. Only a SHA-256
+of each key is stored, under a unique index, and each worker keeps an LRU
+of key digest -> university id so a webhook call is usually authenticated
+without a database round trip. Unknown keys are cached too, briefly, so a
+partner retrying with a bad key does not hit the database on every call.
+
+Rotation and revocation bump the university's config version; every worker
+polls for recently changed universities and drops cached digests that are
+no longer the university's current key.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from services.university_cache import university_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "uli_"
+HASH_FIELD = "integration_settings.lead_import_api_key_hash"
+# Plaintext keys from before keys were hashed; moved to HASH_FIELD at startup
+LEGACY_FIELD = "integration_settings.lead_import_api_key"
+
+# Re-read a few seconds before the watermark to cover in-flight writes
+WATERMARK_SAFETY = timedelta(seconds=5)
+
+
+def hash_key(api_key: str) -> str:
+    """Keys are 256 random bits, so a fast unsalted hash is enough"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class LeadImportKeys:
+    """Issues lead import API keys and resolves them to university ids"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._max_size = None
+        self._ttl = None
+        self._negative_ttl = None
+        self._sync_interval = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._watermark: Optional[datetime] = None
+        self._keys: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._by_university: Dict[str, Set[str]] = {}
+        # Kept apart from _keys so a flood of bad keys cannot evict good ones
+        self._rejected: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            self._max_size = max(1, int(os.environ.get('LEAD_IMPORT_KEY_CACHE_SIZE', 10000)))
+        return self._max_size
+
+    @property
+    def ttl(self) -> float:
+        """Upper bound on staleness should a sync be missed"""
+        if self._ttl is None:
+            self._ttl = float(os.environ.get('LEAD_IMPORT_KEY_CACHE_TTL_SECONDS', 300))
+        return self._ttl
+
+    @property
+    def negative_ttl(self) -> float:
+        if self._negative_ttl is None:
+            self._negative_ttl = float(os.environ.get('LEAD_IMPORT_KEY_NEGATIVE_TTL_SECONDS', 30))
+        return self._negative_ttl
+
+    @property
+    def sync_interval(self) -> float:
+        if self._sync_interval is None:
+            self._sync_interval = max(0.5, float(os.environ.get('LEAD_IMPORT_KEY_SYNC_SECONDS', 2)))
+        return self._sync_interval
+
+    def bind(self, collection):
+        self._collection = collection
+
+    async def ensure(self):
+        """Hash any plaintext keys left from before keys were hashed"""
+        legacy = await self._collection.find(
+            {LEGACY_FIELD: {"$type": "string"}}, {"_id": 0, "id": 1, LEGACY_FIELD: 1}
+        ).to_list(None)
+        for university in legacy:
+            api_key = university["integration_settings"]["lead_import_api_key"]
+            try:
+                await self._collection.update_one(
+                    {"id": university["id"]},
+                    university_cache.versioned({
+                        "$set": {
+                            HASH_FIELD: hash_key(api_key),
+                            "integration_settings.lead_import_api_key_prefix": api_key[:8]
+                        },
+                        "$unset": {LEGACY_FIELD: ""}
+                    })
+                )
+            except DuplicateKeyError:
+                logger.error(f"University {university['id']} shares its lead import API key; rotate it")
+
+    def start(self):
+        if self._task is None:
+            self._watermark = datetime.now(timezone.utc)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync lead import key cache: {str(e)}")
+
+    async def sync(self):
+        """Drop cached digests that another worker rotated or revoked"""
+        started = datetime.now(timezone.utc)
+        changed = await self._collection.find(
+            {"config_updated_at": {"$gte": self._watermark - WATERMARK_SAFETY}},
+            {"_id": 0, "id": 1, HASH_FIELD: 1}
+        ).to_list(None)
+        for university in changed:
+            current = (university.get("integration_settings") or {}).get("lead_import_api_key_hash")
+            for digest in list(self._by_university.get(university["id"], ())):
+                if digest != current:
+                    self._remove(digest)
+                    self.invalidations += 1
+            if current is not None:
+                self._rejected.pop(current, None)
+        self._watermark = started
+
+    def _remove(self, digest: str):
+        entry = self._keys.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._by_university.get(entry[0])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_university[entry[0]]
+
+    def _put(self, digest: str, university_id: str):
+        self._remove(digest)
+        self._keys[digest] = (university_id, time.monotonic() + self.ttl)
+        self._by_university.setdefault(university_id, set()).add(digest)
+        while len(self._keys) > self.max_size:
+            self._remove(next(iter(self._keys)))
+
+    def _reject(self, digest: str):
+        self._rejected[digest] = time.monotonic() + self.negative_ttl
+        self._rejected.move_to_end(digest)
+        while len(self._rejected) > self.max_size:
+            self._rejected.popitem(last=False)
+
+    async def resolve(self, api_key: str) -> Optional[str]:
+        """University id the key belongs to, or None for an unknown key"""
+        digest = hash_key(api_key)
+        now = time.monotonic()
+
+        entry = self._keys.get(digest)
+        if entry is not None and entry[1] > now:
+            self._keys.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+        rejected_until = self._rejected.get(digest)
+        if rejected_until is not None and rejected_until > now:
+            self.negative_hits += 1
+            return None
+
+        self.misses += 1
+        university = await self._collection.find_one({HASH_FIELD: digest}, {"_id": 0, "id": 1})
+        if university is None:
+            self._reject(digest)
+            return None
+        self._rejected.pop(digest, None)
+        self._put(digest, university["id"])
+        return university["id"]
+
+    async def rotate(self, university_id: str) -> Dict:
+        """Issue a new key, replacing any current one. The key is only returned here."""
+        api_key = KEY_PREFIX + secrets.token_urlsafe(32)
+        created_at = datetime.now(timezone.utc)
+        await self._collection.update_one(
+            {"id": university_id},
+            university_cache.versioned({
+                "$set": {
+                    HASH_FIELD: hash_key(api_key),
+                    "integration_settings.lead_import_api_key_prefix": api_key[:8],
+                    "integration_settings.lead_import_api_key_created_at": created_at
+                },
+                "$unset": {LEGACY_FIELD: ""}
+            })
+        )
+        self.invalidate(university_id)
+        return {"api_key": api_key, "key_prefix": api_key[:8], "created_at": created_at}
+
+    async def revoke(self, university_id: str) -> bool:
+        result = await self._collection.update_one(
+            {"id": university_id, HASH_FIELD: {"$exists": True}},
+            university_cache.versioned({"$unset": {
+                HASH_FIELD: "",
+                "integration_settings.lead_import_api_key_prefix": "",
+                "integration_settings.lead_import_api_key_created_at": ""
+            }})
+        )
+        self.invalidate(university_id)
+        return bool(result.modified_count)
+
+    def invalidate(self, university_id: str):
+        """Forget this worker's cached keys for a university"""
+        university_cache.invalidate(university_id)
+        for digest in list(self._by_university.get(university_id, ())):
+            self._remove(digest)
+            self.invalidations += 1
+
+    def clear(self):
+        self._keys.clear()
+        self._by_university.clear()
+        self._rejected.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._keys),
+            "rejected_size": len(self._rejected),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "sync_interval_seconds": self.sync_interval,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+# Singleton instance
+lead_import_keys = LeadImportKeys()
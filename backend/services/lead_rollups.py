@@ -0,0 +1,217 @@
+"""
+Lead Analytics Rollups for UNIFY Platform
+Daily lead counts keyed by (university_id, day, source, stage), and daily
+application counts keyed by (university_id, day, status), refreshed
+incrementally with $merge from the last watermark so analytics reads scale
+with the number of days rather than the number of leads.
+
+A refresh replaces rollup documents in place and only then deletes the ones
+it did not produce, so readers never see a bucket missing mid-refresh.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "lead_daily_rollups"
+
+# Re-read a few seconds before the watermark to cover in-flight writes
+WATERMARK_SAFETY = timedelta(seconds=5)
+
+# How long one worker may hold the refresh lease
+LEASE_DURATION = timedelta(minutes=5)
+
+# Source collection -> (rollup collection, fields counted per university and day)
+ROLLUPS = {
+    "leads": ("lead_daily_rollups", ["source", "stage"]),
+    "applications": ("application_daily_rollups", ["status"])
+}
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class LeadRollups:
+    """Maintains the lead_daily_rollups and application_daily_rollups collections"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._db = None
+        self._interval = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.refreshed_days = 0
+
+    def bind(self, db):
+        self._db = db
+
+    @property
+    def interval(self) -> float:
+        if self._interval is None:
+            self._interval = max(5.0, float(os.environ.get('ANALYTICS_ROLLUP_REFRESH_SECONDS', 60)))
+        return self._interval
+
+    @property
+    def state(self):
+        return self._db.analytics_state
+
+    async def start(self):
+        for into, _ in ROLLUPS.values():
+            await self._db[into].create_index([("university_id", 1), ("day", 1)])
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh lead rollups: {str(e)}")
+
+    async def _acquire(self) -> Optional[Dict]:
+        """Take the refresh lease so only one worker refreshes at a time"""
+        now = datetime.now(timezone.utc)
+        await self.state.update_one(
+            {"_id": STATE_ID},
+            {"$setOnInsert": {"watermark": None, "lease_until": None}},
+            upsert=True
+        )
+        return await self.state.find_one_and_update(
+            {"_id": STATE_ID, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_until": now + LEASE_DURATION}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _merge(self, source: str, match: Dict, refresh_id: str):
+        """Replace the rollup documents for the matched source documents, tagged with refresh_id"""
+        into, fields = ROLLUPS[source]
+        pipeline = [
+            {"$match": match},
+            {"$match": {"created_at": {"$type": "date"}}},
+            {"$group": {
+                "_id": {
+                    "university_id": "$university_id",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    **{field: f"${field}" for field in fields}
+                },
+                "count": {"$sum": 1}
+            }},
+            {"$addFields": {
+                "university_id": "$_id.university_id",
+                "day": "$_id.day",
+                **{field: f"$_id.{field}" for field in fields},
+                "refresh_id": refresh_id
+            }},
+            {"$merge": {
+                "into": into,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await self._db[source].aggregate(pipeline).to_list(None)
+
+    async def _affected_days(self, source: str, watermark: datetime) -> List[Dict]:
+        """(university_id, day) buckets holding documents created or changed since the watermark"""
+        # updated_at is written both as a date and as an ISO string; match either
+        since = [watermark, watermark.isoformat()]
+        pipeline = [
+            {"$match": {"$or": [
+                *[{"updated_at": {"$gte": value}} for value in since],
+                {"created_at": {"$gte": watermark}}
+            ]}},
+            {"$match": {"created_at": {"$type": "date"}}},
+            {"$group": {"_id": {
+                "university_id": "$university_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+            }}}
+        ]
+        return [item["_id"] for item in await self._db[source].aggregate(pipeline).to_list(None)]
+
+    async def _refresh_source(self, source: str, watermark: Optional[datetime], refresh_id: str):
+        into = self._db[ROLLUPS[source][0]]
+        if watermark is None:
+            await self._merge(source, {}, refresh_id)
+            # Whatever the merge did not write no longer has any documents behind it
+            await into.delete_many({"refresh_id": {"$ne": refresh_id}})
+            return
+
+        buckets = await self._affected_days(source, watermark - WATERMARK_SAFETY)
+        if not buckets:
+            return
+        ranges = []
+        for bucket in buckets:
+            day_start = datetime.strptime(bucket["day"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            ranges.append({
+                "university_id": bucket["university_id"],
+                "created_at": {"$gte": day_start, "$lt": day_start + timedelta(days=1)}
+            })
+        await self._merge(source, {"$or": ranges}, refresh_id)
+        # Documents may have moved stage or status, emptying some rows of a bucket
+        await into.delete_many({
+            "$or": [
+                {"university_id": bucket["university_id"], "day": bucket["day"]}
+                for bucket in buckets
+            ],
+            "refresh_id": {"$ne": refresh_id}
+        })
+        self.refreshed_days += len(buckets)
+
+    async def refresh(self, full: bool = False) -> bool:
+        """Recompute every day bucket touched since the watermark"""
+        state = await self._acquire()
+        if state is None:
+            return False
+
+        started = datetime.now(timezone.utc)
+        refresh_id = uuid.uuid4().hex
+        try:
+            watermark = None if full or state.get("watermark") is None else _as_utc(state["watermark"])
+            # A rollup added since the last refresh starts with a full build
+            built = state.get("sources") or []
+            for source in ROLLUPS:
+                await self._refresh_source(source, watermark if source in built else None, refresh_id)
+
+            await self.state.update_one(
+                {"_id": STATE_ID},
+                {"$set": {
+                    "watermark": started,
+                    "refreshed_at": started,
+                    "sources": list(ROLLUPS),
+                    "lease_until": None
+                }}
+            )
+            self.refreshes += 1
+            return True
+        except Exception:
+            await self.state.update_one({"_id": STATE_ID}, {"$set": {"lease_until": None}})
+            raise
+
+    def stats(self) -> Dict:
+        return {
+            "refresh_interval_seconds": self.interval,
+            "refreshes": self.refreshes,
+            "refreshed_days": self.refreshed_days
+        }
+
+
+# Singleton instance
+lead_rollups = LeadRollups()
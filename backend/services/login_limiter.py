@@ -0,0 +1,156 @@
+"""
+Login Admission Control for UNIFY Platform
+Token-bucket throttling per account and per client address, plus a global
+cap on concurrent password verifications, so credential-stuffing bursts are
+rejected before any bcrypt work is done
+"""
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bound on tracked buckets per scope; least recently used are dropped
+MAX_TRACKED_KEYS = 100000
+
+
+class LoginRateLimited(Exception):
+    """Raised when a login attempt is not admitted"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _TokenBuckets:
+    """A set of token buckets sharing one capacity and refill rate"""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Consume one token; returns 0 if admitted, otherwise seconds to wait"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1 - tokens) / self.rate if self.rate else 60.0
+
+        while len(self._buckets) > MAX_TRACKED_KEYS:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def reset(self, key: str):
+        self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoginLimiter:
+    """Admission control in front of login password checks"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._accounts = None
+        self._clients = None
+        self._max_concurrent = None
+        self._trusted_proxy_hops = None
+        self._active = 0
+        self.admitted = 0
+        self.rejected = {"account": 0, "client": 0, "concurrency": 0}
+
+    @property
+    def accounts(self) -> _TokenBuckets:
+        if self._accounts is None:
+            self._accounts = _TokenBuckets(
+                float(os.environ.get('LOGIN_ACCOUNT_BURST', 5)),
+                float(os.environ.get('LOGIN_ACCOUNT_PER_MINUTE', 5))
+            )
+        return self._accounts
+
+    @property
+    def clients(self) -> _TokenBuckets:
+        if self._clients is None:
+            self._clients = _TokenBuckets(
+                float(os.environ.get('LOGIN_CLIENT_BURST', 20)),
+                float(os.environ.get('LOGIN_CLIENT_PER_MINUTE', 30))
+            )
+        return self._clients
+
+    @property
+    def max_concurrent(self) -> int:
+        if self._max_concurrent is None:
+            self._max_concurrent = max(1, int(os.environ.get('LOGIN_MAX_CONCURRENT_VERIFICATIONS', 16)))
+        return self._max_concurrent
+
+    @property
+    def trusted_proxy_hops(self) -> int:
+        """Proxies in front of the app that append to X-Forwarded-For (the ingress by default)"""
+        if self._trusted_proxy_hops is None:
+            self._trusted_proxy_hops = max(0, int(os.environ.get('TRUSTED_PROXY_HOPS', 1)))
+        return self._trusted_proxy_hops
+
+    def client_address(self, peer: Optional[str], forwarded_for: Optional[str]) -> str:
+        """Address of the client behind our trusted proxies.
+
+        Each trusted proxy appends the address it received the request from,
+        so the client is the entry just before the trusted hops; anything
+        further left was supplied by the client and cannot be trusted.
+        """
+        chain = [hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]
+        chain.append(peer or "unknown")
+        return chain[max(0, len(chain) - 1 - self.trusted_proxy_hops)]
+
+    def admit(self, account_key: str, client_address: str):
+        """Charge one attempt to both the account and the client buckets"""
+        wait = self.clients.take(client_address)
+        if wait:
+            self.rejected["client"] += 1
+            raise LoginRateLimited("client", int(wait) + 1)
+
+        wait = self.accounts.take(account_key)
+        if wait:
+            self.rejected["account"] += 1
+            raise LoginRateLimited("account", int(wait) + 1)
+
+        self.admitted += 1
+
+    def reset_account(self, account_key: str):
+        """Forget failed attempts after a successful login"""
+        self.accounts.reset(account_key)
+
+    @contextmanager
+    def verification_slot(self):
+        """Hold one of the globally capped password verification slots"""
+        if self._active >= self.max_concurrent:
+            self.rejected["concurrency"] += 1
+            raise LoginRateLimited("concurrency", 1)
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "active_verifications": self._active,
+            "max_concurrent_verifications": self.max_concurrent,
+            "trusted_proxy_hops": self.trusted_proxy_hops,
+            "tracked_accounts": len(self.accounts),
+            "tracked_clients": len(self.clients)
+        }
+
+
+# Singleton instance
+login_limiter = LoginLimiter()
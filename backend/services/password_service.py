@@ -0,0 +1,210 @@
+"""
+Password Hashing Service for UNIFY Platform
+Runs bcrypt hashing and verification on a bounded worker pool so that
+login bursts do not block the event loop
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Number of recent latency samples kept per operation for percentiles
+LATENCY_WINDOW = 512
+
+# bcrypt accepts cost factors 4..31; 12 matches bcrypt.gensalt() default
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _verify(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Read the cost factor from a '$2b$12$...' bcrypt hash"""
+    parts = hashed.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class _OperationStats:
+    """Call counters and latency samples for a single operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_ms, 2)
+        }
+
+
+class PasswordService:
+    """Async facade over bcrypt backed by a thread or process pool"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._executor: Optional[Executor] = None
+        self._executor_type = None
+        self._workers = None
+        self._max_queue = None
+        self._rounds = None
+        self._pending = 0
+        self._stats = {"hash": _OperationStats(), "verify": _OperationStats()}
+
+    @property
+    def executor_type(self) -> str:
+        if self._executor_type is None:
+            value = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread').lower()
+            self._executor_type = value if value in ("thread", "process") else "thread"
+        return self._executor_type
+
+    @property
+    def workers(self) -> int:
+        if self._workers is None:
+            default = min(4, os.cpu_count() or 1)
+            self._workers = max(1, int(os.environ.get('PASSWORD_HASH_WORKERS', default)))
+        return self._workers
+
+    @property
+    def max_queue(self) -> int:
+        if self._max_queue is None:
+            self._max_queue = max(1, int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 64)))
+        return self._max_queue
+
+    @property
+    def rounds(self) -> int:
+        if self._rounds is None:
+            rounds = int(os.environ.get('BCRYPT_ROUNDS', DEFAULT_ROUNDS))
+            self._rounds = min(MAX_ROUNDS, max(MIN_ROUNDS, rounds))
+        return self._rounds
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="bcrypt"
+                )
+            logger.info(f"Password hashing pool started: {self.executor_type} x {self.workers}")
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        stats = self._stats[operation]
+        if self._pending >= self.max_queue:
+            stats.rejected += 1
+            raise PasswordServiceBusy(f"Password {operation} queue is full")
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            self._pending -= 1
+            stats.record((time.perf_counter() - started) * 1000)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with a fresh salt at the configured cost"""
+        hashed = await self._run("hash", _hash, password.encode('utf-8'), self.rounds)
+        return hashed.decode('utf-8')
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Check a password against a stored bcrypt hash"""
+        return await self._run("verify", _verify, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when a stored hash was made with a different cost factor"""
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds != self.rounds
+
+    def stats(self) -> Dict:
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "rounds": self.rounds,
+            "pending": self._pending,
+            "hash": self._stats["hash"].snapshot(),
+            "verify": self._stats["verify"].snapshot()
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def benchmark(rounds_range, samples: int = 3) -> List[Dict]:
+    """Time hash and verify at each cost factor on this machine"""
+    password = b"benchmark-password"
+    results = []
+    for rounds in rounds_range:
+        hash_times = []
+        verify_times = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hashed = _hash(password, rounds)
+            hash_times.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            _verify(password, hashed)
+            verify_times.append((time.perf_counter() - started) * 1000)
+
+        results.append({
+            "rounds": rounds,
+            "hash_ms": round(sorted(hash_times)[len(hash_times) // 2], 2),
+            "verify_ms": round(sorted(verify_times)[len(verify_times) // 2], 2)
+        })
+    return results
+
+
+# Singleton instance
+password_service = PasswordService()
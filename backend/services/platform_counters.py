@@ -0,0 +1,145 @@
+"""
+Platform Counters for UNIFY Platform
+A single materialized document of platform-wide totals, maintained with
+atomic $inc on the write paths so the super admin dashboard is one read.
+
+Every $inc is mirrored into a "pending" sub-document. A rebuild clears it,
+counts the source collections, then sets each counter to its count plus
+whatever landed in pending meanwhile, so increments made during a rebuild
+are never lost.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_ID = "platform"
+
+# How long one worker may hold the rebuild lease
+REBUILD_LEASE = timedelta(minutes=5)
+
+
+class PlatformCounters:
+    """Maintains the platform_counters document"""
+
+    def __init__(self):
+        self._db = None
+
+    def bind(self, db):
+        self._db = db
+
+    @property
+    def collection(self):
+        return self._db.platform_counters
+
+    async def increment(self, fields: Dict[str, float]):
+        """Apply $inc to counter fields, e.g. {"leads": 3}"""
+        fields = {key: value for key, value in fields.items() if value}
+        if not fields:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": COUNTERS_ID},
+                {
+                    "$inc": {**fields, **{f"pending.{key}": value for key, value in fields.items()}},
+                    "$set": {"updated_at": datetime.now(timezone.utc)}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            # Counters drift until the next rebuild; never fail the write path
+            logger.error(f"Failed to update platform counters: {str(e)}")
+
+    async def payment_status_changed(self, old_status: Optional[str], new_status: str, amount: float):
+        """Move one payment and its amount from one status bucket to another"""
+        fields = {
+            f"payments.{new_status}.count": 1,
+            f"payments.{new_status}.total": amount
+        }
+        if old_status:
+            fields[f"payments.{old_status}.count"] = -1
+            fields[f"payments.{old_status}.total"] = -amount
+        await self.increment(fields)
+
+    async def ensure(self):
+        """Build the counters once so later $inc upserts start from real totals"""
+        # An $inc may upsert the document before any rebuild; built_at marks a real one
+        if await self.collection.find_one({"_id": COUNTERS_ID, "built_at": {"$exists": True}}, {"_id": 1}) is None:
+            await self.rebuild()
+
+    async def read(self) -> Dict:
+        counters = await self.collection.find_one({"_id": COUNTERS_ID}, {"pending": 0, "rebuild_until": 0})
+        if counters is None or "built_at" not in counters:
+            counters = await self.rebuild() or counters or {}
+        return counters
+
+    async def rebuild(self) -> Optional[Dict]:
+        """Recompute every counter from the source collections.
+
+        Returns None without rebuilding while another worker holds the lease.
+        """
+        db = self._db
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"_id": COUNTERS_ID},
+            {"$setOnInsert": {"rebuild_until": None}},
+            upsert=True
+        )
+        # Taking the lease also clears pending: increments from here on collect
+        # there and are added back on top of the counts
+        previous = await self.collection.find_one_and_update(
+            {"_id": COUNTERS_ID, "$or": [{"rebuild_until": None}, {"rebuild_until": {"$lt": now}}]},
+            {"$set": {"pending": {}, "rebuild_until": now + REBUILD_LEASE}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            return None
+
+        try:
+            payment_stats = await db.payments.aggregate([
+                {"$group": {
+                    "_id": "$status",
+                    "count": {"$sum": 1},
+                    "total": {"$sum": "$amount"}
+                }}
+            ]).to_list(100)
+
+            totals = {
+                "universities.total": await db.universities.count_documents({}),
+                "universities.active": await db.universities.count_documents({"is_active": True}),
+                "students": await db.users.count_documents({"role": "student"}),
+                "leads": await db.leads.count_documents({}),
+                "applications": await db.applications.count_documents({})
+            }
+            # Statuses no payment has any more are zeroed rather than left stale
+            for status in previous.get("payments", {}):
+                totals[f"payments.{status}.count"] = 0
+                totals[f"payments.{status}.total"] = 0
+            for stat in payment_stats:
+                if stat["_id"]:
+                    totals[f"payments.{stat['_id']}.count"] = stat["count"]
+                    totals[f"payments.{stat['_id']}.total"] = stat["total"]
+
+            now = datetime.now(timezone.utc)
+            return await self.collection.find_one_and_update(
+                {"_id": COUNTERS_ID},
+                [
+                    {"$set": {
+                        path: {"$add": [value, {"$ifNull": [f"$pending.{path}", 0]}]}
+                        for path, value in totals.items()
+                    }},
+                    {"$set": {"pending": {}, "rebuild_until": None, "built_at": now, "updated_at": now}}
+                ],
+                projection={"pending": 0, "rebuild_until": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            await self.collection.update_one({"_id": COUNTERS_ID}, {"$set": {"rebuild_until": None}})
+            raise
+
+
+# Singleton instance
+platform_counters = PlatformCounters()
@@ -0,0 +1,84 @@
+"""
+Query Result Cache for UNIFY Platform
+Small in-process TTL cache for expensive read-only aggregation results,
+with single-flight so concurrent misses on one key share a single compute
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """Bounded TTL cache of computed query results"""
+
+    def __init__(self, ttl: float, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value, _ = await self.get_with_age(key, compute)
+        return value
+
+    async def get_with_age(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, float]:
+        """Return (value, seconds since it was computed)"""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], time.monotonic() - entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Someone is already computing this key; wait for their result
+            self.coalesced += 1
+            try:
+                value, computed_at = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request computing it went away; compute it ourselves
+                return await self.get_with_age(key, compute)
+            return value, time.monotonic() - computed_at
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an error with no waiters is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            computed_at = time.monotonic()
+            future.set_result((value, computed_at))
+            self._entries[key] = (value, computed_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value, 0.0
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight)
+        }
@@ -0,0 +1,317 @@
+"""
+Resumable Uploads for UNIFY Platform
+Chunked uploads that survive dropped connections: the client initiates an
+upload, PUTs chunks at explicit offsets, asks for the received offset after
+a failure, and completes once every byte is in. Partial files live on disk
+next to the other upload temp files; the upload state lives in MongoDB so
+any worker can take the next chunk, and a sweeper removes expired uploads.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from services.upload_service import ReceivedUpload, UploadError, upload_service
+
+logger = logging.getLogger(__name__)
+
+UPLOADING = "uploading"
+COMPLETING = "completing"
+COMPLETED = "completed"
+
+# A chunk holds the upload this long; a crashed request frees it afterwards
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+# Completed uploads are kept briefly so a retried /complete returns the same document
+COMPLETED_RETENTION = timedelta(hours=1)
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the received bytes end"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Expected offset {offset}", status_code=409)
+        self.offset = offset
+
+
+def _create(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def _open_at(path: Path, offset: int):
+    """Open for writing at offset, dropping bytes a broken request left past it"""
+    handle = open(path, "r+b")
+    handle.truncate(offset)
+    handle.seek(offset)
+    return handle
+
+
+def _close(handle):
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class ResumableUploads:
+    """Upload sessions in MongoDB with their bytes in partial files on disk"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._ttl = None
+        self._chunk_size = None
+        self._sweep_interval = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self.started = 0
+        self.completed = 0
+        self.expired = 0
+        self.bytes_received = 0
+
+    @property
+    def ttl(self) -> timedelta:
+        """Idle time after which an unfinished upload is discarded"""
+        if self._ttl is None:
+            self._ttl = timedelta(hours=float(os.environ.get('RESUMABLE_UPLOAD_TTL_HOURS', 24)))
+        return self._ttl
+
+    @property
+    def chunk_size(self) -> int:
+        """Suggested chunk size; small enough to finish on a poor mobile link"""
+        if self._chunk_size is None:
+            self._chunk_size = max(64 * 1024, int(os.environ.get('RESUMABLE_CHUNK_SIZE', 1024 * 1024)))
+        return self._chunk_size
+
+    @property
+    def sweep_interval(self) -> float:
+        if self._sweep_interval is None:
+            self._sweep_interval = max(1.0, float(os.environ.get('RESUMABLE_SWEEP_SECONDS', 300)))
+        return self._sweep_interval
+
+    @property
+    def directory(self) -> Path:
+        return upload_service.temp_dir / "resumable"
+
+    def path_for(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def bind(self, collection):
+        self._collection = collection
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Failed to sweep resumable uploads: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def sweep(self):
+        """Delete expired uploads and their partial files"""
+        now = datetime.now(timezone.utc)
+        expired = await self._collection.find(
+            {"expires_at": {"$lt": now}, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]},
+            {"_id": 0, "id": 1, "status": 1}
+        ).to_list(None)
+        for upload in expired:
+            await asyncio.to_thread(_unlink, self.path_for(upload["id"]))
+            await self._collection.delete_one({"id": upload["id"], "expires_at": {"$lt": now}})
+            if upload.get("status") != COMPLETED:
+                self.expired += 1
+
+    async def create(self, student_id: str, fields: Dict) -> Dict:
+        """Start an upload session for an already validated document"""
+        now = datetime.now(timezone.utc)
+        upload = {
+            "id": str(uuid.uuid4()),
+            "document_id": str(uuid.uuid4()),
+            "student_id": student_id,
+            **fields,
+            "offset": 0,
+            "status": UPLOADING,
+            "locked_until": None,
+            "created_at": now,
+            "expires_at": now + self.ttl
+        }
+        await asyncio.to_thread(_create, self.path_for(upload["id"]))
+        await self._collection.insert_one(upload)
+        upload.pop("_id", None)
+        self.started += 1
+        return upload
+
+    async def get(self, upload_id: str, student_id: str) -> Dict:
+        upload = await self._collection.find_one(
+            {"id": upload_id, "student_id": student_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 0}
+        )
+        if upload is None:
+            raise UploadError("Upload not found or expired", status_code=404)
+        return upload
+
+    async def _lock(self, upload_id: str, student_id: str, query: Dict, update: Dict) -> Optional[Dict]:
+        """Take the upload for one request; None if it exists but query does not match"""
+        now = datetime.now(timezone.utc)
+        upload = await self._collection.find_one_and_update(
+            {
+                "id": upload_id,
+                "student_id": student_id,
+                "expires_at": {"$gt": now},
+                "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}],
+                **query
+            },
+            {"$set": {**update, "locked_until": now + LOCK_TIMEOUT}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if upload is not None:
+            return upload
+        current = await self.get(upload_id, student_id)
+        if current["locked_until"] is not None and current["locked_until"].replace(tzinfo=timezone.utc) > now:
+            raise UploadError("Another request is writing this upload", status_code=409)
+        return None
+
+    async def append(self, upload_id: str, student_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """Write a chunk starting at offset; returns the new received offset.
+
+        Bytes that arrive before a dropped connection are kept, so the
+        client resumes from wherever the transfer actually stopped.
+        """
+        upload = await self._lock(upload_id, student_id, {"status": UPLOADING}, {})
+        if upload is None:
+            raise UploadError("Upload is already complete", status_code=409)
+        if offset != upload["offset"]:
+            await self._collection.update_one({"id": upload_id}, {"$set": {"locked_until": None}})
+            raise OffsetMismatch(upload["offset"])
+
+        try:
+            handle = await asyncio.to_thread(_open_at, self.path_for(upload_id), offset)
+        except FileNotFoundError:
+            await self.abort(upload_id, student_id)
+            raise UploadError("Upload not found or expired", status_code=404)
+        received = offset
+        try:
+            async for chunk in chunks:
+                if received + len(chunk) > upload["file_size"]:
+                    raise UploadError("Chunk runs past the declared file size", status_code=413)
+                await asyncio.to_thread(handle.write, chunk)
+                received += len(chunk)
+        finally:
+            await asyncio.to_thread(_close, handle)
+            self.bytes_received += received - offset
+            await self._collection.update_one(
+                {"id": upload_id},
+                {"$set": {
+                    "offset": received,
+                    "locked_until": None,
+                    "expires_at": datetime.now(timezone.utc) + self.ttl
+                }}
+            )
+        return received
+
+    async def begin_complete(self, upload_id: str, student_id: str) -> Dict:
+        """Claim a fully received upload for completion.
+
+        Only one request can hold the claim, so one upload yields at most one
+        document. An already completed upload is returned as-is.
+        """
+        upload = await self._lock(
+            upload_id, student_id,
+            {"status": {"$in": [UPLOADING, COMPLETING]}, "$expr": {"$eq": ["$offset", "$file_size"]}},
+            {"status": COMPLETING}
+        )
+        if upload is not None:
+            return upload
+        upload = await self.get(upload_id, student_id)
+        if upload["status"] == COMPLETED:
+            return upload
+        raise UploadError(
+            f"Upload is incomplete: {upload['offset']} of {upload['file_size']} bytes received",
+            status_code=409
+        )
+
+    async def received_file(self, upload: Dict) -> ReceivedUpload:
+        """The finished partial file as a ReceivedUpload; raises if it fails the declared hash"""
+        path = self.path_for(upload["id"])
+        sha256 = await asyncio.to_thread(_sha256_file, path)
+        if upload.get("sha256") and upload["sha256"] != sha256:
+            # Corrupt somewhere along the way; the only fix is to send it again
+            await self.abort(upload["id"], upload["student_id"])
+            raise UploadError("Uploaded content does not match the declared sha256", status_code=422)
+        return ReceivedUpload(
+            {"application_id": upload["application_id"], "document_name": upload["document_name"]},
+            upload["file_name"], upload.get("content_type") or "application/octet-stream",
+            path, upload["file_size"], sha256
+        )
+
+    async def finish(self, upload_id: str, document_id: str):
+        await self._collection.update_one(
+            {"id": upload_id},
+            {"$set": {
+                "status": COMPLETED,
+                "document_id": document_id,
+                "locked_until": None,
+                "expires_at": datetime.now(timezone.utc) + COMPLETED_RETENTION
+            }}
+        )
+        self.completed += 1
+
+    async def release(self, upload_id: str):
+        """Give up a completion claim so the client can retry it"""
+        await self._collection.update_one(
+            {"id": upload_id, "status": COMPLETING},
+            {"$set": {"status": UPLOADING, "locked_until": None}}
+        )
+
+    async def abort(self, upload_id: str, student_id: str) -> bool:
+        result = await self._collection.delete_one(
+            {"id": upload_id, "student_id": student_id, "status": {"$ne": COMPLETED}}
+        )
+        if result.deleted_count:
+            await asyncio.to_thread(_unlink, self.path_for(upload_id))
+        return bool(result.deleted_count)
+
+    def stats(self) -> Dict:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "expired": self.expired,
+            "bytes_received": self.bytes_received
+        }
+
+
+# Singleton instance
+resumable_uploads = ResumableUploads()
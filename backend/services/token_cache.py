@@ -0,0 +1,91 @@
+"""
+Verified Token Cache for UNIFY Platform
+Keeps decoded JWT claims in a bounded LRU so repeated requests with the
+same bearer token skip signature verification. Revocation is checked on
+every request by the token revocation list, so entries are never stale
+in a way that matters and need no invalidation
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenCache:
+    """LRU/TTL cache of decoded token claims keyed by token digest"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._max_size = None
+        self._ttl = None
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            self._max_size = max(1, int(os.environ.get('TOKEN_CACHE_SIZE', 10000)))
+        return self._max_size
+
+    @property
+    def ttl(self) -> int:
+        """Upper bound on entry lifetime, limits staleness across workers"""
+        if self._ttl is None:
+            self._ttl = max(1, int(os.environ.get('TOKEN_CACHE_TTL_SECONDS', 300)))
+        return self._ttl
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: dict):
+        expires_at = time.time() + self.ttl
+        if claims.get("exp"):
+            expires_at = min(expires_at, float(claims["exp"]))
+
+        digest = self._digest(token)
+        self._entries[digest] = (dict(claims), expires_at)
+        self._entries.move_to_end(digest)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Singleton instance
+token_cache = TokenCache()
@@ -0,0 +1,222 @@
+"""
+Token Revocation List for UNIFY Platform
+Revoked JWT ids live in MongoDB; each worker keeps a Bloom filter of them so
+the per-request check only touches the database on a filter hit.
+
+Revoking every token of a user (password change, deactivation) stores a
+cutoff instead: tokens issued before it are rejected. Cutoffs are few and
+short-lived, so each worker holds all of them in memory and picks up new
+ones on the same sync as the filter.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# revoked_at comes from the revoking worker's clock before its insert commits,
+# so re-read a few seconds before the watermark to catch late commits
+WATERMARK_SAFETY = timedelta(seconds=5)
+
+# jti of a user cutoff entry; token jtis are hex, so these cannot collide
+USER_CUTOFF_PREFIX = "user:"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationList:
+    """Revoked token ids with a per-worker Bloom filter fast path"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._capacity = None
+        self._error_rate = None
+        self._sync_interval = None
+        self._rebuild_interval = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._filter: Optional[BloomFilter] = None
+        # user id -> epoch seconds; tokens issued before it are revoked
+        self._user_cutoffs: Dict[str, float] = {}
+        self._watermark = None
+        self._rebuilt_at = 0.0
+        self.checks = 0
+        self.filter_hits = 0
+        self.revoked_hits = 0
+
+    @property
+    def capacity(self) -> int:
+        if self._capacity is None:
+            self._capacity = max(1000, int(os.environ.get('TOKEN_REVOCATION_CAPACITY', 100000)))
+        return self._capacity
+
+    @property
+    def error_rate(self) -> float:
+        if self._error_rate is None:
+            self._error_rate = float(os.environ.get('TOKEN_REVOCATION_ERROR_RATE', 0.001))
+        return self._error_rate
+
+    @property
+    def sync_interval(self) -> float:
+        if self._sync_interval is None:
+            self._sync_interval = max(0.5, float(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', 5)))
+        return self._sync_interval
+
+    @property
+    def rebuild_interval(self) -> float:
+        """Full rebuilds drop ids whose tokens have since expired"""
+        if self._rebuild_interval is None:
+            self._rebuild_interval = max(60.0, float(os.environ.get('TOKEN_REVOCATION_REBUILD_SECONDS', 3600)))
+        return self._rebuild_interval
+
+    async def start(self, collection):
+        """Load the filter and keep it in sync with the revoked_tokens collection"""
+        self._collection = collection
+        await self.rebuild()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def rebuild(self):
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        cutoffs: Dict[str, float] = {}
+        watermark = self._watermark
+        async for entry in self._collection.find({}, {"_id": 0, "jti": 1, "user_id": 1, "revoked_at": 1, "not_before": 1}):
+            if "not_before" in entry:
+                cutoffs[entry["user_id"]] = entry["not_before"]
+            else:
+                bloom.add(entry["jti"])
+            if watermark is None or entry["revoked_at"] > watermark:
+                watermark = entry["revoked_at"]
+        if bloom.count > self.capacity:
+            logger.warning(f"Revoked token count {bloom.count} exceeds filter capacity {self.capacity}")
+        self._filter = bloom
+        self._user_cutoffs = cutoffs
+        self._watermark = watermark
+        self._rebuilt_at = time.monotonic()
+
+    async def refresh(self):
+        """Add ids and user cutoffs revoked by any worker since the last watermark"""
+        query = {"revoked_at": {"$gte": self._watermark - WATERMARK_SAFETY}} if self._watermark else {}
+        async for entry in self._collection.find(query, {"_id": 0, "jti": 1, "user_id": 1, "revoked_at": 1, "not_before": 1}):
+            if "not_before" in entry:
+                self._set_cutoff(entry["user_id"], entry["not_before"])
+            # The overlap re-reads recent ids; adding them again would only inflate the count
+            elif entry["jti"] not in self._filter:
+                self._filter.add(entry["jti"])
+            if self._watermark is None or entry["revoked_at"] > self._watermark:
+                self._watermark = entry["revoked_at"]
+
+    def _set_cutoff(self, user_id: str, not_before: float):
+        if not_before > self._user_cutoffs.get(user_id, 0.0):
+            self._user_cutoffs[user_id] = not_before
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                if time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+                    await self.rebuild()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to sync token revocation list: {str(e)}")
+
+    async def revoke(self, jti: str, user_id: str, expires_at: datetime):
+        await self._collection.update_one(
+            {"jti": jti},
+            {"$setOnInsert": {
+                "jti": jti,
+                "user_id": user_id,
+                "revoked_at": datetime.now(timezone.utc),
+                "expires_at": expires_at
+            }},
+            upsert=True
+        )
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    async def revoke_user(self, user_id: str, token_lifetime: timedelta):
+        """Revoke every token issued to a user until now"""
+        revoked_at = datetime.now(timezone.utc)
+        not_before = time.time()
+        await self._collection.update_one(
+            {"jti": USER_CUTOFF_PREFIX + user_id},
+            {"$set": {
+                "user_id": user_id,
+                "revoked_at": revoked_at,
+                "not_before": not_before,
+                # Once every token issued before the cutoff has expired it is moot
+                "expires_at": revoked_at + token_lifetime
+            }},
+            upsert=True
+        )
+        self._set_cutoff(user_id, not_before)
+
+    def is_user_revoked(self, user_id: Optional[str], issued_at: Union[int, float, None]) -> bool:
+        """Whether a token was issued before its user's cutoff; tokens without iat predate cutoffs"""
+        cutoff = self._user_cutoffs.get(user_id)
+        return cutoff is not None and (issued_at or 0) < cutoff
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or self._collection is None:
+            return False
+        self.checks += 1
+        if self._filter is not None and jti not in self._filter:
+            return False
+
+        self.filter_hits += 1
+        revoked = await self._collection.find_one({"jti": jti}, {"_id": 0, "jti": 1}) is not None
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    def stats(self) -> Dict:
+        return {
+            "filter_entries": self._filter.count if self._filter else 0,
+            "filter_bits": self._filter.size if self._filter else 0,
+            "user_cutoffs": len(self._user_cutoffs),
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "revoked_hits": self.revoked_hits,
+            "false_positives": self.filter_hits - self.revoked_hits
+        }
+
+
+# Singleton instance
+token_revocation = TokenRevocationList()
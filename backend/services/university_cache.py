@@ -0,0 +1,144 @@
+"""
+University Cache for UNIFY Platform
+Per-worker LRU of university documents. Every write bumps config_version and
+config_updated_at on the document; each worker polls for recently changed
+universities and drops entries whose version moved, so other workers see
+an update within one sync interval
+"""
+import asyncio
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Re-read a few seconds before the watermark to cover in-flight writes
+WATERMARK_SAFETY = timedelta(seconds=5)
+
+
+class UniversityCache:
+    """Versioned LRU of university documents keyed by university id"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._max_size = None
+        self._ttl = None
+        self._sync_interval = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._watermark: Optional[datetime] = None
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            self._max_size = max(1, int(os.environ.get('UNIVERSITY_CACHE_SIZE', 1000)))
+        return self._max_size
+
+    @property
+    def ttl(self) -> float:
+        """Upper bound on staleness for writes that bypass versioned()"""
+        if self._ttl is None:
+            self._ttl = float(os.environ.get('UNIVERSITY_CACHE_TTL_SECONDS', 300))
+        return self._ttl
+
+    @property
+    def sync_interval(self) -> float:
+        if self._sync_interval is None:
+            self._sync_interval = max(0.5, float(os.environ.get('UNIVERSITY_CACHE_SYNC_SECONDS', 2)))
+        return self._sync_interval
+
+    def bind(self, collection):
+        self._collection = collection
+
+    def start(self):
+        if self._task is None:
+            self._watermark = datetime.now(timezone.utc)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync university cache: {str(e)}")
+
+    async def sync(self):
+        """Drop cached universities that another worker has changed"""
+        started = datetime.now(timezone.utc)
+        changed = await self._collection.find(
+            {"config_updated_at": {"$gte": self._watermark - WATERMARK_SAFETY}},
+            {"_id": 0, "id": 1, "config_version": 1}
+        ).to_list(None)
+        for university in changed:
+            entry = self._entries.get(university["id"])
+            if entry is not None and entry[0].get("config_version") != university.get("config_version"):
+                self.invalidate(university["id"])
+        self._watermark = started
+
+    @staticmethod
+    def versioned(update: Dict) -> Dict:
+        """Add the version bump to a university update document"""
+        update = dict(update)
+        update["$inc"] = {**update.get("$inc", {}), "config_version": 1}
+        update["$set"] = {**update.get("$set", {}), "config_updated_at": datetime.now(timezone.utc)}
+        return update
+
+    async def get(self, university_id: str) -> Optional[Dict]:
+        """University document without _id; callers get their own copy"""
+        entry = self._entries.get(university_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(university_id)
+            self.hits += 1
+            return copy.deepcopy(entry[0])
+
+        self.misses += 1
+        university = await self._collection.find_one({"id": university_id}, {"_id": 0})
+        if university is None:
+            return None
+        self._entries[university_id] = (university, time.monotonic() + self.ttl)
+        self._entries.move_to_end(university_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return copy.deepcopy(university)
+
+    def invalidate(self, university_id: str):
+        if self._entries.pop(university_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "sync_interval_seconds": self.sync_interval,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+# Singleton instance
+university_cache = UniversityCache()
@@ -0,0 +1,230 @@
+"""
+Upload Service for UNIFY Platform
+Streams multipart/form-data uploads straight to disk, enforcing the size
+limit as bytes arrive instead of buffering the whole file in memory
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Text fields are small; anything bigger is a malformed or hostile request
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadError(Exception):
+    """Malformed upload, or the limit callback rejected it"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File size exceeds {max_bytes / (1024 * 1024):g}MB limit", status_code=413)
+        self.max_bytes = max_bytes
+
+
+class ReceivedUpload:
+    """A file part written to a temporary path, plus the form fields sent before it"""
+
+    def __init__(self, fields: Dict[str, str], file_name: str, content_type: str,
+                 path: Path, size: int, sha256: str):
+        self.fields = fields
+        self.file_name = file_name
+        self.content_type = content_type
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    async def move_to(self, destination: Path):
+        await asyncio.to_thread(_move, self.path, destination)
+        self.path = destination
+
+    async def discard(self):
+        await asyncio.to_thread(_unlink, self.path)
+
+
+def _move(source: Path, destination: Path):
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, destination)
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _open_temp(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4().hex}.part"
+    return path, open(path, "wb")
+
+
+class _PartCollector:
+    """Turns MultipartParser callbacks into a list of events per fed chunk"""
+
+    def __init__(self, boundary: bytes):
+        self.events: List[Tuple] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        self.events.append(("part", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self.events.append(("data", data[start:end]))
+
+    def _on_part_end(self):
+        self.events.append(("end",))
+
+    def feed(self, chunk: bytes) -> List[Tuple]:
+        self.parser.write(chunk)
+        events, self.events = self.events, []
+        return events
+
+
+class UploadService:
+    """Receives streamed multipart uploads into a temporary directory"""
+
+    def __init__(self):
+        # Load config lazily to ensure .env is loaded first
+        self._temp_dir = None
+        self.received = 0
+        self.rejected_too_large = 0
+        self.bytes_received = 0
+
+    @property
+    def temp_dir(self) -> Path:
+        """Kept under the upload root so finished files can be renamed into place"""
+        if self._temp_dir is None:
+            self._temp_dir = Path(os.environ.get('UPLOAD_TEMP_DIR', '/app/uploads/tmp'))
+        return self._temp_dir
+
+    async def receive(
+        self,
+        request,
+        file_field: str,
+        prepare: Callable[[Dict[str, str], str], Awaitable[int]]
+    ) -> ReceivedUpload:
+        """Stream the request body, writing the file part to a temp file.
+
+        Text fields must come before the file part. When the file part starts,
+        ``prepare(fields, file_name)`` validates them and returns the size
+        limit in bytes; the upload is aborted as soon as it is exceeded.
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadError("Expected multipart/form-data")
+
+        collector = _PartCollector(params[b"boundary"])
+        fields: Dict[str, str] = {}
+        part_name: Optional[str] = None
+        field_value = b""
+        upload: Optional[ReceivedUpload] = None
+        handle = None
+        digest = None
+        max_bytes = 0
+        size = 0
+
+        try:
+            async for chunk in request.stream():
+                for event in collector.feed(chunk):
+                    if event[0] == "part":
+                        _, options = parse_options_header(event[1].get(b"content-disposition", b""))
+                        part_name = options.get(b"name", b"").decode("utf-8", "replace")
+                        field_value = b""
+                        if part_name != file_field:
+                            continue
+                        if upload is not None:
+                            raise UploadError("Only one file may be uploaded per request")
+                        file_name = os.path.basename(options.get(b"filename", b"").decode("utf-8", "replace"))
+                        if not file_name:
+                            raise UploadError("File name is required")
+                        max_bytes = await prepare(fields, file_name)
+                        path, handle = await asyncio.to_thread(_open_temp, self.temp_dir)
+                        upload = ReceivedUpload(
+                            fields, file_name,
+                            event[1].get(b"content-type", b"application/octet-stream").decode("latin-1"),
+                            path, 0, ""
+                        )
+                        digest = hashlib.sha256()
+                    elif event[0] == "data":
+                        if part_name == file_field:
+                            size += len(event[1])
+                            if size > max_bytes:
+                                self.rejected_too_large += 1
+                                raise UploadTooLarge(max_bytes)
+                            digest.update(event[1])
+                            await asyncio.to_thread(handle.write, event[1])
+                        else:
+                            field_value += event[1]
+                            if len(field_value) > MAX_FIELD_BYTES:
+                                raise UploadError(f"Field {part_name} is too large")
+                    elif event[0] == "end":
+                        if part_name != file_field:
+                            fields[part_name] = field_value.decode("utf-8", "replace")
+                        part_name = None
+            collector.parser.finalize()
+        except BaseException:
+            if handle is not None:
+                await asyncio.to_thread(handle.close)
+                await upload.discard()
+            raise
+
+        if upload is None:
+            raise UploadError(f"Missing file field '{file_field}'")
+
+        await asyncio.to_thread(handle.close)
+        upload.size = size
+        upload.sha256 = digest.hexdigest()
+        self.received += 1
+        self.bytes_received += size
+        return upload
+
+    def stats(self) -> Dict:
+        return {
+            "received": self.received,
+            "rejected_too_large": self.rejected_too_large,
+            "bytes_received": self.bytes_received
+        }
+
+
+# Singleton instance
+upload_service = UploadService()
@@ -74,7 +74,7 @@ export function AdminLayout({ children }) {
     newPassword: '',
     confirmPassword: ''
   });
-  const { user, logout, token, isSuperAdmin, isUniversityAdmin, isCounsellingManager, isCounsellor } = useAuth();
+  const { user, logout, replaceToken, token, isSuperAdmin, isUniversityAdmin, isCounsellingManager, isCounsellor } = useAuth();
   const { theme, toggleTheme } = useTheme();
   const location = useLocation();
   const navigate = useNavigate();
@@ -104,7 +104,7 @@ export function AdminLayout({ children }) {
 
     setPasswordLoading(true);
     try {
-      await axios.put(
+      const response = await axios.put(
         `${API}/api/auth/change-password`,
         {
           current_password: passwordForm.currentPassword,
@@ -112,6 +112,8 @@ export function AdminLayout({ children }) {
         },
         { headers: { Authorization: `Bearer ${token}` } }
       );
+      // Other sessions are signed out; this one carries on with the new token
+      replaceToken(response.data.access_token);
       toast.success('Password changed successfully');
       setChangePasswordOpen(false);
       setPasswordForm({ currentPassword: '', newPassword: '', confirmPassword: '' });
@@ -84,7 +84,20 @@ export function AuthProvider({ children }) {
     }
   };
 
+  // Swap in a token the server reissued, e.g. after a password change
+  const replaceToken = (access_token) => {
+    setToken(access_token);
+    localStorage.setItem('unify-token', access_token);
+    axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
+  };
+
   const logout = () => {
+    if (token) {
+      // Revoke the token server-side; local state is cleared regardless
+      axios.post(`${API}/auth/logout`, {}, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {});
+    }
     setToken(null);
     setUser(null);
     localStorage.removeItem('unify-token');
@@ -106,6 +119,7 @@ export function AuthProvider({ children }) {
       loading,
       login,
       logout,
+      replaceToken,
       studentRegister,
       isAuthenticated,
       isSuperAdmin,
@@ -48,7 +48,7 @@ export const superAdminAPI = {
   getUniversity: (id) => api.get(`/superadmin/universities/${id}`),
   createUniversity: (data) => api.post('/superadmin/universities', data),
   updateUniversity: (id, data) => api.put(`/superadmin/universities/${id}`, data),
-  paymentsOverview: () => api.get('/superadmin/payments/overview'),
+  paymentsOverview: (params) => api.get('/superadmin/payments/overview', { params }),
   analytics: () => api.get('/superadmin/analytics'),
 };
 
@@ -76,8 +76,14 @@ export const universityAPI = {
   // Sessions
   createSession: (data) => api.post('/university/sessions', data),
   listSessions: () => api.get('/university/sessions'),
+
+  // Lead import webhook key; the plaintext key is only returned on rotation
+  rotateLeadImportKey: () => api.post('/university/integrations/lead-import-key'),
+  revokeLeadImportKey: () => api.delete('/university/integrations/lead-import-key'),
 };
 
+const IMPORT_POLL_INTERVAL = 1500;
+
 // Lead APIs
 export const leadAPI = {
   create: (data) => api.post('/leads', data),
@@ -88,8 +94,33 @@ export const leadAPI = {
   bulkReassign: (data) => api.post('/leads/bulk-reassign', data),
   addNote: (id, content) => api.post(`/leads/${id}/notes`, { content }),
   addFollowUp: (id, data) => api.post(`/leads/${id}/follow-ups`, data),
+  // Imports run as background jobs: these return 202 with a job_id
+  bulkUpload: (leads) => api.post('/leads/bulk-upload', { leads }),
+  // Raw CSV/XLSX file, parsed on the server; mapping is { leadField: 'Column header' }
+  importFile: (file, mapping) => {
+    const formData = new FormData();
+    if (mapping) {
+      formData.append('mapping', JSON.stringify(mapping));
+    }
+    formData.append('file', file);
+    return api.post('/leads/import-file', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
   importShiksha: (leads) => api.post('/leads/import/shiksha', { source: 'shiksha', leads }),
   importCollegedunia: (leads) => api.post('/leads/import/collegedunia', { source: 'collegedunia', leads }),
+  getImportJob: (jobId) => api.get(`/leads/import-jobs/${jobId}`),
+  listImportJobs: () => api.get('/leads/import-jobs'),
+  cancelImportJob: (jobId) => api.post(`/leads/import-jobs/${jobId}/cancel`),
+  // Poll an import job until it finishes; onProgress receives each snapshot
+  waitForImportJob: async (jobId, onProgress) => {
+    for (;;) {
+      const { data: job } = await leadAPI.getImportJob(jobId);
+      if (onProgress) onProgress(job);
+      if (!['staging', 'queued', 'running'].includes(job.status)) return job;
+      await new Promise((resolve) => setTimeout(resolve, IMPORT_POLL_INTERVAL));
+    }
+  },
 };
 
 // Application APIs
@@ -128,9 +159,84 @@ export const studentAPI = {
   getUniversityInfo: () => api.get('/student/university-info'),
 };
 
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+};
+
 // Document APIs
+// Files larger than this use the resumable upload API when not uploading direct to storage
+const RESUMABLE_THRESHOLD = 2 * 1024 * 1024;
+const RESUMABLE_MAX_RETRIES = 8;
+
 export const documentAPI = {
-  upload: (data) => api.post('/documents/upload', data),
+  // Fields must be appended before the file; the server streams the file part
+  upload: (formData) => api.post('/documents/upload', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
+  // Upload straight to object storage when the server offers it, else via the API
+  uploadFile: async (applicationId, documentName, file) => {
+    const contentType = file.type || 'application/octet-stream';
+    const sha256 = await sha256Hex(file);
+    const { data } = await api.post('/documents/upload-url', {
+      application_id: applicationId,
+      document_name: documentName,
+      file_name: file.name,
+      file_size: file.size,
+      sha256,
+      content_type: contentType,
+    });
+    if (!data.direct) {
+      if (file.size > RESUMABLE_THRESHOLD) {
+        return documentAPI.uploadResumable(applicationId, documentName, file, sha256);
+      }
+      const formData = new FormData();
+      formData.append('application_id', applicationId);
+      formData.append('document_name', documentName);
+      formData.append('file', file);
+      return documentAPI.upload(formData);
+    }
+    if (data.upload) {
+      // Plain fetch so our Authorization header is not sent to the storage host
+      const res = await fetch(data.upload.url, { method: data.upload.method, headers: data.upload.headers, body: file });
+      if (!res.ok) throw new Error('Upload to storage failed');
+    }
+    return api.post('/documents/upload-complete', { upload_id: data.upload_id });
+  },
+  // Chunked upload that picks up from the last received byte after a network drop
+  uploadResumable: async (applicationId, documentName, file, sha256) => {
+    const { data: upload } = await api.post('/documents/uploads', {
+      application_id: applicationId,
+      document_name: documentName,
+      file_name: file.name,
+      file_size: file.size,
+      sha256,
+      content_type: file.type || 'application/octet-stream',
+    });
+    let offset = upload.offset;
+    let failures = 0;
+    while (offset < file.size) {
+      try {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        const res = await api.put(`/documents/uploads/${upload.upload_id}`, chunk, {
+          params: { offset },
+          headers: { 'Content-Type': 'application/octet-stream' },
+        });
+        offset = res.data.offset;
+        failures = 0;
+      } catch (err) {
+        if (err.response && err.response.status !== 409) throw err;
+        if (++failures > RESUMABLE_MAX_RETRIES) throw err;
+        await new Promise((resolve) => setTimeout(resolve, Math.min(1000 * 2 ** failures, 30000)));
+        // Ask the server how far it got rather than trusting our own count
+        const { data: status } = await api.get(`/documents/uploads/${upload.upload_id}`);
+        offset = status.offset;
+      }
+    }
+    return api.post(`/documents/uploads/${upload.upload_id}/complete`);
+  },
+  getUrl: (documentId) => api.get(`/documents/${documentId}/url`),
+  download: (documentId) => api.get(`/documents/${documentId}/download`, { responseType: 'blob' }),
   getApplicationDocuments: (applicationId) => api.get(`/documents/application/${applicationId}`),
   getMyDocuments: () => api.get('/documents/my-documents'),
   verify: (documentId, data) => api.put(`/documents/${documentId}/verify`, data),
@@ -19,17 +19,23 @@ const COLORS = ['#10B981', '#EF4444', '#F59E0B', '#6366F1', '#EC4899'];
 
 export default function PaymentsPage() {
   const [overview, setOverview] = useState([]);
+  const [overviewTotals, setOverviewTotals] = useState(null);
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
+  const [page, setPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(1);
 
   useEffect(() => {
     loadPayments();
-  }, []);
+  }, [page, search]);
 
   const loadPayments = async () => {
     try {
-      const response = await superAdminAPI.paymentsOverview();
+      // Search and paging run on the server so every university is reachable
+      const response = await superAdminAPI.paymentsOverview({ page, limit: 20, search: search || undefined });
       setOverview(response.data.data || []);
+      setOverviewTotals(response.data.totals || null);
+      setTotalPages(response.data.pages || 1);
     } catch (err) {
       console.error('Failed to load payments:', err);
     } finally {
@@ -37,8 +43,8 @@ export default function PaymentsPage() {
     }
   };
 
-  // Calculate totals
-  const totals = overview.reduce((acc, uni) => ({
+  // Platform-wide totals come from the server; fall back to summing the page
+  const totals = overviewTotals || overview.reduce((acc, uni) => ({
     total_collected: acc.total_collected + (uni.total_collected || 0),
     total_refunded: acc.total_refunded + (uni.total_refunded || 0),
     successful_payments: acc.successful_payments + (uni.successful_payments || 0),
@@ -67,10 +73,6 @@ export default function PaymentsPage() {
     { name: 'Failed', value: totals.failed_payments, color: '#EF4444' },
   ].filter(d => d.value > 0);
 
-  const filteredOverview = overview.filter(uni => 
-    !search || uni.university_name?.toLowerCase().includes(search.toLowerCase())
-  );
-
   if (loading) {
     return (
       <AdminLayout>
@@ -246,7 +248,10 @@ export default function PaymentsPage() {
                   <Input
                     placeholder="Search university..."
                     value={search}
-                    onChange={(e) => setSearch(e.target.value)}
+                    onChange={(e) => {
+                      setSearch(e.target.value);
+                      setPage(1);
+                    }}
                     className="pl-10"
                   />
                 </div>
@@ -280,14 +285,14 @@ export default function PaymentsPage() {
                 </TableRow>
               </TableHeader>
               <TableBody>
-                {filteredOverview.length === 0 ? (
+                {overview.length === 0 ? (
                   <TableRow>
                     <TableCell colSpan={7} className="text-center py-8 text-slate-500">
                       No payment data found
                     </TableCell>
                   </TableRow>
                 ) : (
-                  filteredOverview.map((uni, index) => (
+                  overview.map((uni, index) => (
                     <TableRow key={index}>
                       <TableCell>
                         <div className="flex items-center gap-3">
@@ -334,6 +339,29 @@ export default function PaymentsPage() {
             </Table>
           </CardContent>
         </Card>
+
+        {/* Pagination */}
+        {totalPages > 1 && (
+          <div className="flex items-center justify-center gap-2">
+            <Button
+              variant="outline"
+              disabled={page === 1}
+              onClick={() => setPage(p => p - 1)}
+            >
+              Previous
+            </Button>
+            <span className="text-sm text-slate-600 dark:text-slate-400">
+              Page {page} of {totalPages}
+            </span>
+            <Button
+              variant="outline"
+              disabled={page >= totalPages}
+              onClick={() => setPage(p => p + 1)}
+            >
+              Next
+            </Button>
+          </div>
+        )}
       </div>
     </AdminLayout>
   );
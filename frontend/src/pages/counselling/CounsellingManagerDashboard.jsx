@@ -92,8 +92,8 @@ export default function CounsellingManagerDashboard() {
   const handleFileSelect = (e) => {
     const file = e.target.files?.[0];
     if (file) {
-      if (!file.name.endsWith('.csv')) {
-        toast.error('Please select a CSV file');
+      if (!/\.(csv|xlsx)$/i.test(file.name)) {
+        toast.error('Please select a CSV or Excel (.xlsx) file');
         return;
       }
       setUploadFile(file);
@@ -109,47 +109,24 @@ export default function CounsellingManagerDashboard() {
 
     setUploading(true);
     try {
-      const formData = new FormData();
-      formData.append('file', uploadFile);
-
-      // Read file as text and send as JSON
-      const text = await uploadFile.text();
-      const lines = text.split('\n').filter(line => line.trim());
-      const headers = lines[0].split(',').map(h => h.trim().toLowerCase());
-      
-      const leads = [];
-      for (let i = 1; i < lines.length; i++) {
-        const values = lines[i].split(',').map(v => v.trim());
-        if (values.length >= 3) {
-          const lead = {};
-          headers.forEach((header, idx) => {
-            lead[header] = values[idx] || '';
-          });
-          leads.push({
-            name: lead.name || lead.full_name || '',
-            email: lead.email || '',
-            phone: lead.phone || lead.mobile || '',
-            source: lead.source || 'bulk_upload',
-            course_interest: lead.course || lead.course_interest || ''
-          });
-        }
-      }
-
-      const res = await axios.post(`${API}/api/leads/bulk-upload`, { leads }, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-
-      setUploadResult({
-        success: res.data.created || 0,
-        failed: res.data.failed || 0,
-        duplicates: res.data.duplicates || 0
+      // The server streams and parses the file, so large sheets are fine
+      const res = await leadAPI.importFile(uploadFile);
+      const job = await leadAPI.waitForImportJob(res.data.job_id, (progress) => {
+        setUploadResult({
+          success: progress.created || 0,
+          failed: progress.failed || 0,
+          duplicates: progress.duplicates || 0
+        });
       });
       
-      toast.success(`${res.data.created} leads imported successfully`);
+      if (job.status !== 'completed') {
+        throw new Error(job.error || `Import ${job.status}`);
+      }
+      toast.success(`${job.created} leads imported successfully`);
       loadDashboardData();
     } catch (err) {
-      toast.error(err.response?.data?.detail || 'Failed to upload leads');
-      setUploadResult({ error: err.response?.data?.detail || 'Upload failed' });
+      toast.error(err.response?.data?.detail || err.message || 'Failed to upload leads');
+      setUploadResult({ error: err.response?.data?.detail || err.message || 'Upload failed' });
     } finally {
       setUploading(false);
     }
@@ -387,11 +364,11 @@ export default function CounsellingManagerDashboard() {
               </div>
 
               <div className="space-y-2">
-                <Label>Upload CSV File</Label>
+                <Label>Upload CSV or Excel File</Label>
                 <input
                   ref={fileInputRef}
                   type="file"
-                  accept=".csv"
+                  accept=".csv,.xlsx"
                   onChange={handleFileSelect}
                   className="hidden"
                 />
@@ -403,7 +380,7 @@ export default function CounsellingManagerDashboard() {
                   {uploadFile ? (
                     <p className="font-medium text-blue-600">{uploadFile.name}</p>
                   ) : (
-                    <p className="text-slate-500">Click to select CSV file</p>
+                    <p className="text-slate-500">Click to select CSV or .xlsx file</p>
                   )}
                 </div>
               </div>
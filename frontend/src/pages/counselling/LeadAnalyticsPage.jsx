@@ -107,8 +107,13 @@ export default function LeadAnalyticsPage() {
         res = await leadAPI.importCollegedunia(leads);
       }
 
-      setImportResult(res.data);
-      toast.success(`Import complete: ${res.data.created} leads created`);
+      const job = await leadAPI.waitForImportJob(res.data.job_id);
+      setImportResult(job);
+      if (job.status === 'completed') {
+        toast.success(`Import complete: ${job.created} leads created`);
+      } else {
+        toast.error(job.error || `Import ${job.status}`);
+      }
       loadAnalytics();
     } catch (err) {
       toast.error(err.response?.data?.detail || 'Import failed');
@@ -32,6 +32,10 @@ export default function InstitutionPage() {
     }
   };
 
+  // Resized variants for uploaded images; older entries only have the original
+  const galleryVariant = (imageUrl, name) =>
+    university?.gallery_variants?.find(v => v.url === imageUrl)?.[name] || imageUrl;
+
   const openGallery = (index) => {
     setCurrentImageIndex(index);
     setGalleryOpen(true);
@@ -197,8 +201,9 @@ export default function InstitutionPage() {
                     className="aspect-video rounded-lg overflow-hidden border hover:border-blue-500 transition-colors group"
                   >
                     <img
-                      src={`${API}${imageUrl}`}
+                      src={`${API}${galleryVariant(imageUrl, 'thumb')}`}
                       alt={`Campus ${index + 1}`}
+                      loading="lazy"
                       className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                     />
                   </button>
@@ -237,7 +242,7 @@ export default function InstitutionPage() {
             </button>
             
             <img
-              src={`${API}${university.gallery[currentImageIndex]}`}
+              src={`${API}${galleryVariant(university.gallery[currentImageIndex], 'full')}`}
               alt={`Campus ${currentImageIndex + 1}`}
               className="max-h-[80vh] max-w-[90vw] object-contain"
             />
@@ -223,24 +223,10 @@ export default function StudentApplicationPage() {
     setUploading(true);
     
     try {
-      // Convert file to base64
-      const reader = new FileReader();
-      reader.onload = async () => {
-        const base64Data = reader.result.split(',')[1]; // Remove data:... prefix
-        
-        await documentAPI.upload({
-          application_id: application.id,
-          document_name: documentName,
-          file_name: file.name,
-          file_type: file.name.split('.').pop(),
-          file_size: file.size,
-          file_data: base64Data
-        });
-        
-        toast.success(`${documentName} uploaded successfully`);
-        await loadData(); // Refresh documents
-      };
-      reader.readAsDataURL(file);
+      await documentAPI.uploadFile(application.id, documentName, file);
+      
+      toast.success(`${documentName} uploaded successfully`);
+      await loadData(); // Refresh documents
     } catch (err) {
       toast.error(err.response?.data?.detail || 'Failed to upload document');
     } finally {
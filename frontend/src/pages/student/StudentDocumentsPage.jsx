@@ -105,16 +105,11 @@ export default function StudentDocumentsPage() {
         return;
       }
 
-      // Convert to base64
-      const reader = new FileReader();
-      reader.onloadend = () => {
-        setUploadData(prev => ({
-          ...prev,
-          file: reader.result,
-          fileName: file.name
-        }));
-      };
-      reader.readAsDataURL(file);
+      setUploadData(prev => ({
+        ...prev,
+        file,
+        fileName: file.name
+      }));
     }
   };
 
@@ -127,12 +122,7 @@ export default function StudentDocumentsPage() {
 
     try {
       setUploading(true);
-      await documentAPI.upload({
-        application_id: application.id,
-        doc_type: uploadData.doc_type,
-        file_data: uploadData.file,
-        file_name: uploadData.fileName
-      });
+      await documentAPI.uploadFile(application.id, uploadData.doc_type, uploadData.file);
       
       toast.success('Document uploaded successfully');
       setShowUploadDialog(false);
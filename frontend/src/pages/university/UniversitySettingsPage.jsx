@@ -40,7 +40,8 @@ export default function UniversitySettingsPage() {
   const [aboutSettings, setAboutSettings] = useState({
     about: '',
     facilities: [],
-    gallery: []
+    gallery: [],
+    galleryVariants: []
   });
 
   const [newFacility, setNewFacility] = useState('');
@@ -83,7 +84,8 @@ export default function UniversitySettingsPage() {
       setAboutSettings({
         about: data.about || '',
         facilities: data.facilities || [],
-        gallery: data.gallery || []
+        gallery: data.gallery || [],
+        galleryVariants: data.gallery_variants || []
       });
       
       if (data.config || data.registration_config) {
@@ -174,23 +176,19 @@ export default function UniversitySettingsPage() {
 
     setUploading(true);
     try {
-      const reader = new FileReader();
-      reader.onload = async () => {
-        const base64Data = reader.result.split(',')[1];
-        
-        const res = await axios.post(`${API}/api/university/gallery/upload`, {
-          file_name: file.name,
-          file_type: file.name.split('.').pop(),
-          file_data: base64Data
-        }, { headers: { Authorization: `Bearer ${token}` } });
-
-        setAboutSettings({
-          ...aboutSettings,
-          gallery: [...aboutSettings.gallery, res.data.image_url]
-        });
-        toast.success('Image uploaded');
-      };
-      reader.readAsDataURL(file);
+      const formData = new FormData();
+      formData.append('file', file);
+
+      const res = await axios.post(`${API}/api/university/gallery/upload`, formData, {
+        headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'multipart/form-data' }
+      });
+
+      setAboutSettings({
+        ...aboutSettings,
+        gallery: [...aboutSettings.gallery, res.data.image_url],
+        galleryVariants: [...aboutSettings.galleryVariants, { url: res.data.image_url, ...res.data.variants }]
+      });
+      toast.success('Image uploaded');
     } catch (err) {
       toast.error('Failed to upload image');
     } finally {
@@ -198,6 +196,9 @@ export default function UniversitySettingsPage() {
     }
   };
 
+  const galleryThumb = (imageUrl) =>
+    aboutSettings.galleryVariants.find(v => v.url === imageUrl)?.thumb || imageUrl;
+
   const deleteGalleryImage = async (imageUrl) => {
     if (!confirm('Delete this image?')) return;
     
@@ -208,7 +209,8 @@ export default function UniversitySettingsPage() {
       });
       setAboutSettings({
         ...aboutSettings,
-        gallery: aboutSettings.gallery.filter(img => img !== imageUrl)
+        gallery: aboutSettings.gallery.filter(img => img !== imageUrl),
+        galleryVariants: aboutSettings.galleryVariants.filter(v => v.url !== imageUrl)
       });
       toast.success('Image deleted');
     } catch (err) {
@@ -430,8 +432,9 @@ export default function UniversitySettingsPage() {
                       {aboutSettings.gallery.map((imageUrl, index) => (
                         <div key={index} className="relative group aspect-video rounded-lg overflow-hidden border">
                           <img
-                            src={`${API}${imageUrl}`}
+                            src={`${API}${galleryThumb(imageUrl)}`}
                             alt={`Gallery ${index + 1}`}
+                            loading="lazy"
                             className="w-full h-full object-cover"
                           />
                           <button
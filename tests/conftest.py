@@ -0,0 +1,10 @@
+"""
+Shared test setup: makes the backend's services and models importable so
+the service-level tests can run without a live server
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -1,11 +1,13 @@
 """
 Backend API Tests for UNIFY - Iteration 3
-Testing: Change Password, Document Upload, Test Module, Super Admin Login, University Edit
+Testing: Change Password, Document Upload, Resumable Uploads, Test Module, Super Admin Login, University Edit
 """
 import pytest
 import requests
 import os
 import base64
+import hashlib
+import uuid
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -193,6 +195,163 @@ class TestDocumentUploadAPI:
         print("✓ Document list endpoint exists")
 
 
+class TestResumableDocumentUpload:
+    """Resumable (chunked) document upload tests"""
+    
+    CONTENT = b"%PDF-1.4\n" + b"resumable upload test content\n" * 200 + b"%%EOF\n"
+    
+    @pytest.fixture(scope="class")
+    def student(self):
+        """Register a student at a fresh university; returns (token, application_id)"""
+        admin = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": SUPER_ADMIN_EMAIL,
+            "password": SUPER_ADMIN_PASSWORD,
+            "role": "super_admin"
+        }).json()["access_token"]
+        code = f"RES{uuid.uuid4().hex[:6].upper()}"
+        create_resp = requests.post(
+            f"{BASE_URL}/api/superadmin/universities",
+            json={
+                "name": f"Resumable Test University {code}",
+                "code": code,
+                "email": f"test{code.lower()}@example.com",
+                "phone": "1234567890",
+                "address": "Test Address"
+            },
+            headers={"Authorization": f"Bearer {admin}"}
+        )
+        assert create_resp.status_code == 200, f"Create failed: {create_resp.text}"
+        
+        register_resp = requests.post(f"{BASE_URL}/api/student/register", json={
+            "registration_data": {
+                "name": "Resumable Student",
+                "email": f"resumable_{code.lower()}@example.com",
+                "phone": "9876500000",
+                "password": "testpass123"
+            },
+            "university_code": code
+        })
+        assert register_resp.status_code == 200, f"Register failed: {register_resp.text}"
+        data = register_resp.json()
+        return data["access_token"], data["application_id"]
+    
+    def start_upload(self, student, sha256=None):
+        token, application_id = student
+        response = requests.post(
+            f"{BASE_URL}/api/documents/uploads",
+            json={
+                "application_id": application_id,
+                "document_name": "10th Marksheet",
+                "file_name": "marksheet.pdf",
+                "file_size": len(self.CONTENT),
+                "sha256": sha256 or hashlib.sha256(self.CONTENT).hexdigest(),
+                "content_type": "application/pdf"
+            },
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, f"Start failed: {response.text}"
+        upload = response.json()
+        assert upload["offset"] == 0
+        assert upload["status"] == "uploading"
+        return upload["upload_id"]
+    
+    def put_chunk(self, student, upload_id, offset, chunk):
+        return requests.put(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}",
+            params={"offset": offset},
+            data=chunk,
+            headers={"Authorization": f"Bearer {student[0]}", "Content-Type": "application/octet-stream"}
+        )
+    
+    def complete(self, student, upload_id):
+        return requests.post(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}/complete",
+            headers={"Authorization": f"Bearer {student[0]}"}
+        )
+    
+    def test_resumable_upload_requires_auth(self):
+        """Test that the resumable upload endpoints need a student token"""
+        response = requests.post(f"{BASE_URL}/api/documents/uploads", json={})
+        assert response.status_code in [401, 403], f"Unexpected status: {response.status_code}"
+        print("✓ Resumable upload endpoint requires auth")
+    
+    def test_chunked_upload_resume_and_complete(self, student):
+        """Test chunks, offset mismatch, resume via GET and idempotent completion"""
+        upload_id = self.start_upload(student)
+        half = len(self.CONTENT) // 2
+        
+        response = self.put_chunk(student, upload_id, 0, self.CONTENT[:half])
+        assert response.status_code == 200
+        assert response.json()["offset"] == half
+        
+        # A retried chunk at a stale offset is refused with the offset to resume from
+        response = self.put_chunk(student, upload_id, 0, self.CONTENT[:half])
+        assert response.status_code == 409
+        assert response.headers["Upload-Offset"] == str(half)
+        
+        response = requests.get(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}",
+            headers={"Authorization": f"Bearer {student[0]}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["offset"] == half
+        
+        # Completing before every byte is in is refused
+        assert self.complete(student, upload_id).status_code == 409
+        
+        response = self.put_chunk(student, upload_id, half, self.CONTENT[half:])
+        assert response.status_code == 200
+        assert response.json()["offset"] == len(self.CONTENT)
+        
+        response = self.complete(student, upload_id)
+        assert response.status_code == 200, f"Complete failed: {response.text}"
+        document_id = response.json()["document_id"]
+        
+        # A retried completion returns the same document rather than a second one
+        response = self.complete(student, upload_id)
+        assert response.status_code == 200
+        assert response.json()["document_id"] == document_id
+        
+        # A completed upload can no longer be cancelled
+        response = requests.delete(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}",
+            headers={"Authorization": f"Bearer {student[0]}"}
+        )
+        assert response.status_code == 404
+        print(f"✓ Resumable upload completed as document {document_id}")
+    
+    def test_chunk_past_declared_size_rejected(self, student):
+        """Test a chunk running past file_size is refused"""
+        upload_id = self.start_upload(student)
+        response = self.put_chunk(student, upload_id, 0, self.CONTENT + b"extra")
+        assert response.status_code == 413
+        print("✓ Oversized chunk rejected")
+    
+    def test_sha256_mismatch_rejected(self, student):
+        """Test completion fails when the bytes do not match the declared hash"""
+        upload_id = self.start_upload(student, sha256="0" * 64)
+        assert self.put_chunk(student, upload_id, 0, self.CONTENT).status_code == 200
+        response = self.complete(student, upload_id)
+        assert response.status_code == 422
+        print("✓ Hash mismatch rejected")
+    
+    def test_cancel_upload(self, student):
+        """Test DELETE discards an unfinished upload"""
+        upload_id = self.start_upload(student)
+        response = requests.delete(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}",
+            headers={"Authorization": f"Bearer {student[0]}"}
+        )
+        assert response.status_code == 200
+        
+        response = requests.get(
+            f"{BASE_URL}/api/documents/uploads/{upload_id}",
+            headers={"Authorization": f"Bearer {student[0]}"}
+        )
+        assert response.status_code == 404
+        print("✓ Resumable upload cancelled")
+
+
 class TestUniversityManagement:
     """University CRUD tests"""
     
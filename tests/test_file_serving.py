@@ -0,0 +1,180 @@
+"""
+Test File Serving
+Tests for:
+- _parse_range() single ranges, suffix ranges and unsatisfiable ranges
+- serve_file() 200 / 206 / 304 / 416 responses
+- Content-Disposition with non-ASCII file names
+"""
+from email.utils import formatdate
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from services.file_serving import _parse_range, content_disposition, serve_file
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+SIZE = len(CONTENT)
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(CONTENT)
+
+    async def download(request):
+        return await serve_file(request, path, "Marksheet.pdf", media_type="application/pdf")
+
+    async def download_missing(request):
+        return await serve_file(request, tmp_path / "missing.bin", "missing.pdf")
+
+    app = Starlette(routes=[
+        Route("/file", download, methods=["GET", "HEAD"]),
+        Route("/missing", download_missing)
+    ])
+    return TestClient(app)
+
+
+class TestParseRange:
+    """Range header parsing"""
+
+    def test_closed_range(self):
+        assert _parse_range("bytes=0-99", SIZE) == (0, 99)
+        print("✓ Closed range")
+
+    def test_open_ended_range(self):
+        assert _parse_range("bytes=100-", SIZE) == (100, SIZE - 1)
+        print("✓ Open-ended range")
+
+    def test_suffix_range(self):
+        """bytes=-N is the final N bytes, all of them if N exceeds the size"""
+        assert _parse_range("bytes=-100", SIZE) == (SIZE - 100, SIZE - 1)
+        assert _parse_range(f"bytes=-{SIZE * 2}", SIZE) == (0, SIZE - 1)
+        print("✓ Suffix range")
+
+    def test_end_clamped_to_size(self):
+        assert _parse_range(f"bytes=10-{SIZE * 2}", SIZE) == (10, SIZE - 1)
+        print("✓ End clamped")
+
+    def test_ignored_ranges(self):
+        """Other units, multiple ranges and garbage fall back to the full body"""
+        assert _parse_range("items=0-1", SIZE) is None
+        assert _parse_range("bytes=0-1,5-6", SIZE) is None
+        assert _parse_range("bytes=a-b", SIZE) is None
+        print("✓ Unsupported ranges ignored")
+
+    def test_unsatisfiable(self):
+        with pytest.raises(ValueError):
+            _parse_range(f"bytes={SIZE}-", SIZE)
+        with pytest.raises(ValueError):
+            _parse_range("bytes=50-10", SIZE)
+        print("✓ Unsatisfiable ranges raise")
+
+
+class TestServeFile:
+    """Conditional and ranged responses"""
+
+    def test_full_response(self, client):
+        response = client.get("/file")
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"]
+        assert response.headers["last-modified"]
+        print("✓ Full response")
+
+    def test_range_response(self, client):
+        response = client.get("/file", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{SIZE}"
+        assert response.headers["content-length"] == "100"
+        print("✓ 206 Partial Content")
+
+    def test_suffix_range_response(self, client):
+        response = client.get("/file", headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[-10:]
+        print("✓ 206 for suffix range")
+
+    def test_unsatisfiable_range(self, client):
+        response = client.get("/file", headers={"Range": f"bytes={SIZE + 10}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{SIZE}"
+        print("✓ 416 Range Not Satisfiable")
+
+    def test_multi_range_gets_full_body(self, client):
+        response = client.get("/file", headers={"Range": "bytes=0-1,5-6"})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        print("✓ Multi-range falls back to 200")
+
+    def test_if_none_match(self, client):
+        etag = client.get("/file").headers["etag"]
+        response = client.get("/file", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+        assert client.get("/file", headers={"If-None-Match": "*"}).status_code == 304
+        print("✓ 304 on If-None-Match")
+
+    def test_if_modified_since(self, client):
+        last_modified = client.get("/file").headers["last-modified"]
+        assert client.get("/file", headers={"If-Modified-Since": last_modified}).status_code == 304
+        assert client.get("/file", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+        print("✓ 304 on If-Modified-Since")
+
+    def test_if_none_match_takes_precedence(self, client):
+        """A stale If-None-Match wins over a matching If-Modified-Since"""
+        last_modified = client.get("/file").headers["last-modified"]
+        response = client.get("/file", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        print("✓ If-None-Match precedence")
+
+    def test_if_range(self, client):
+        """A range is honoured only while If-Range still matches"""
+        etag = client.get("/file").headers["etag"]
+        assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+        response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        print("✓ If-Range")
+
+    def test_head_range(self, client):
+        response = client.head("/file", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206
+        assert response.content == b""
+        print("✓ HEAD with Range")
+
+    def test_missing_file(self, client):
+        assert client.get("/missing").status_code == 404
+        print("✓ 404 for missing file")
+
+    def test_content_disposition(self, client):
+        assert client.get("/file").headers["content-disposition"] == (
+            "inline; filename=\"Marksheet.pdf\"; filename*=UTF-8''Marksheet.pdf"
+        )
+        print("✓ Content-Disposition")
+
+
+class TestContentDisposition:
+    """RFC 5987 file names"""
+
+    def test_non_ascii_name(self):
+        header = content_disposition("attachment", "मार्कशीट résumé.pdf")
+        assert header.startswith("attachment; filename=\"")
+        assert "filename*=UTF-8''%E0%A4%AE" in header
+        header.encode("latin-1")  # must be sendable as a header value
+        print("✓ Non-ASCII names encoded")
+
+    def test_quotes_cannot_break_out(self):
+        header = content_disposition("inline", 'a"; filename="evil.exe')
+        fallback = header.split('filename="', 1)[1].split('"', 1)[0]
+        assert '"' not in fallback and ";" not in fallback
+        assert "%22" in header
+        print("✓ Quotes escaped")
+
+    def test_empty_fallback(self):
+        assert 'filename="download"' in content_disposition("inline", "实验")
+        print("✓ Fallback name for non-Latin names")
@@ -6,6 +6,8 @@ Test Iteration 5: New Features Testing
 - Student Institution Page - Shows university info and gallery
 - Counselling Manager Dashboard - Shows stats and team performance
 - Bulk Lead Upload - POST /api/leads/bulk-upload
+- Lead File Import - POST /api/leads/import-file, /api/leads/import-jobs
+- Lead Import Webhook Key - /api/university/integrations/lead-import-key
 - Assignment Rules API - PUT /api/leads/assignment-rules
 - Counsellor Dashboard - Shows personal lead stats
 - Team Management Page - Shows counsellor list
@@ -15,6 +17,7 @@ import pytest
 import requests
 import os
 import base64
+import time
 from datetime import datetime
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://admit-hub.preview.emergentagent.com')
@@ -27,6 +30,21 @@ SUPER_ADMIN_EMAIL = "admin@unify.com"
 SUPER_ADMIN_PASSWORD = "9939350820@#!"
 
 
+def wait_for_import_job(api_client, token, job_id, timeout=60):
+    """Poll a lead import job until it leaves the queue"""
+    deadline = time.time() + timeout
+    while True:
+        response = api_client.get(
+            f"{BASE_URL}/api/leads/import-jobs/{job_id}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        job = response.json()
+        if job["status"] not in ("staging", "queued", "running") or time.time() > deadline:
+            return job
+        time.sleep(1)
+
+
 class TestSetup:
     """Setup fixtures for testing"""
     
@@ -142,14 +160,11 @@ class TestGalleryUpload(TestSetup):
         # This is a minimal valid PNG file
         test_image_base64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
         
+        # Multipart upload; drop the session's JSON content type so requests sets the boundary
         response = api_client.post(
             f"{BASE_URL}/api/university/gallery/upload",
-            json={
-                "file_name": "test_image.png",
-                "file_type": "png",
-                "file_data": test_image_base64
-            },
-            headers={"Authorization": f"Bearer {university_admin_token}"}
+            files={"file": ("test_image.png", base64.b64decode(test_image_base64), "image/png")},
+            headers={"Authorization": f"Bearer {university_admin_token}", "Content-Type": None}
         )
         assert response.status_code == 200
         data = response.json()
@@ -162,12 +177,8 @@ class TestGalleryUpload(TestSetup):
         """Test gallery upload rejects invalid file types"""
         response = api_client.post(
             f"{BASE_URL}/api/university/gallery/upload",
-            json={
-                "file_name": "test.pdf",
-                "file_type": "pdf",
-                "file_data": "dGVzdA=="  # "test" in base64
-            },
-            headers={"Authorization": f"Bearer {university_admin_token}"}
+            files={"file": ("test.pdf", b"test", "application/pdf")},
+            headers={"Authorization": f"Bearer {university_admin_token}", "Content-Type": None}
         )
         assert response.status_code == 400
         print("Invalid file type correctly rejected")
@@ -279,8 +290,9 @@ class TestBulkLeadUpload(TestSetup):
             json={"leads": test_leads},
             headers={"Authorization": f"Bearer {cm_token}"}
         )
-        assert response.status_code == 200
-        data = response.json()
+        assert response.status_code == 202
+        data = wait_for_import_job(api_client, cm_token, response.json()["job_id"])
+        assert data["status"] == "completed"
         assert "created" in data
         assert "failed" in data
         assert "duplicates" in data
@@ -299,13 +311,198 @@ class TestBulkLeadUpload(TestSetup):
             json={"leads": test_leads},
             headers={"Authorization": f"Bearer {cm_token}"}
         )
-        assert response.status_code == 200
-        data = response.json()
+        assert response.status_code == 202
+        data = wait_for_import_job(api_client, cm_token, response.json()["job_id"])
         # Should fail for invalid leads
-        assert data["failed"] >= 0
+        assert data["failed"] == 2
+        assert len(data["errors"]) == 2
         print(f"Bulk upload with invalid data: {data['failed']} failed as expected")
 
 
+class TestLeadFileImport(TestSetup):
+    """Test CSV file import and import job tracking"""
+    
+    @pytest.fixture(scope="class")
+    def cm_token(self, api_client, university_admin_token):
+        """Create a Counselling Manager and get token"""
+        cm_person_id = f"CM_FILE_{datetime.now().strftime('%H%M%S')}"
+        api_client.post(
+            f"{BASE_URL}/api/university/staff",
+            json={
+                "name": "Test CM File",
+                "email": f"testcmfile_{datetime.now().strftime('%H%M%S')}@test.com",
+                "person_id": cm_person_id,
+                "password": "testpass123",
+                "role": "counselling_manager"
+            },
+            headers={"Authorization": f"Bearer {university_admin_token}"}
+        )
+        
+        login_response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+            "university_id": UNIVERSITY_ID,
+            "person_id": cm_person_id,
+            "password": "testpass123",
+            "role": "counselling_manager"
+        })
+        
+        if login_response.status_code == 200:
+            return login_response.json().get("access_token")
+        pytest.skip("Counselling Manager authentication failed")
+    
+    def import_file(self, api_client, token, content, file_name="leads.csv", mapping=None):
+        data = {"mapping": mapping} if mapping else None
+        return api_client.post(
+            f"{BASE_URL}/api/leads/import-file",
+            data=data,
+            files={"file": (file_name, content, "text/csv")},
+            headers={"Authorization": f"Bearer {token}", "Content-Type": None}
+        )
+    
+    def test_import_csv_file(self, api_client, cm_token):
+        """Test POST /api/leads/import-file queues a job that imports the rows"""
+        timestamp = datetime.now().strftime('%H%M%S%f')
+        csv_content = (
+            "Full Name,E-Mail,Mobile,Course\n"
+            f"File Lead 1 {timestamp},FileLead1_{timestamp}@Test.com,+91 91{timestamp[:8]},B.Tech CS\n"
+            "\n"
+            f"File Lead 2 {timestamp},filelead2_{timestamp}@test.com,92{timestamp[:8]},MBA\n"
+            f"File Lead 3 {timestamp},filelead1_{timestamp}@test.com,93{timestamp[:8]},MBA\n"
+            ",,,\n"
+            ",missing_name_{timestamp}@test.com,,\n"
+        ).encode()
+        
+        response = self.import_file(api_client, cm_token, csv_content, mapping='{"email": "E-Mail"}')
+        assert response.status_code == 202
+        accepted = response.json()
+        assert accepted["total_rows"] == 4
+        
+        job = wait_for_import_job(api_client, cm_token, accepted["job_id"])
+        assert job["status"] == "completed"
+        assert job["created"] == 2
+        # Same email as row 2 once lowercased
+        assert job["duplicates"] == 1
+        assert job["failed"] == 1
+        # Errors point at the line in the file, counting the header and blank lines
+        assert job["errors"][0]["row"] == 7
+        print(f"File import: {job['created']} created, {job['duplicates']} duplicates, {job['failed']} failed")
+    
+    def test_import_file_rejects_bad_input(self, api_client, cm_token):
+        """Test unsupported types, bad mappings and unusable files return 400"""
+        response = self.import_file(api_client, cm_token, b"name,email\n", file_name="leads.txt")
+        assert response.status_code == 400
+        
+        response = self.import_file(api_client, cm_token, b"name,email\n", mapping='{"nickname": "Name"}')
+        assert response.status_code == 400
+        
+        response = self.import_file(api_client, cm_token, b"first,last\nA,B\n")
+        assert response.status_code == 400
+        
+        oversized_field = b'name,email\nA,"' + b"x" * 200000 + b'"\n'
+        response = self.import_file(api_client, cm_token, oversized_field)
+        assert response.status_code == 400
+        print("Invalid lead files correctly rejected")
+    
+    def test_list_and_get_import_jobs(self, api_client, cm_token):
+        """Test GET /api/leads/import-jobs and /api/leads/import-jobs/{job_id}"""
+        response = api_client.get(
+            f"{BASE_URL}/api/leads/import-jobs",
+            headers={"Authorization": f"Bearer {cm_token}"}
+        )
+        assert response.status_code == 200
+        jobs = response.json()["data"]
+        assert len(jobs) > 0
+        assert "worker" not in jobs[0]
+        
+        response = api_client.get(
+            f"{BASE_URL}/api/leads/import-jobs/{jobs[0]['id']}",
+            headers={"Authorization": f"Bearer {cm_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["id"] == jobs[0]["id"]
+        
+        response = api_client.get(
+            f"{BASE_URL}/api/leads/import-jobs/does-not-exist",
+            headers={"Authorization": f"Bearer {cm_token}"}
+        )
+        assert response.status_code == 404
+    
+    def test_cancel_import_job(self, api_client, cm_token):
+        """Test POST /api/leads/import-jobs/{job_id}/cancel"""
+        timestamp = datetime.now().strftime('%H%M%S%f')
+        rows = "".join(f"Cancel Lead {i},cancel{i}_{timestamp}@test.com\n" for i in range(5000))
+        response = self.import_file(api_client, cm_token, f"name,email\n{rows}".encode())
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        
+        response = api_client.post(
+            f"{BASE_URL}/api/leads/import-jobs/{job_id}/cancel",
+            headers={"Authorization": f"Bearer {cm_token}"}
+        )
+        # The worker may already have finished a small import
+        assert response.status_code in (200, 409)
+        job = wait_for_import_job(api_client, cm_token, job_id)
+        assert job["status"] == ("cancelled" if response.status_code == 200 else "completed")
+        
+        # A finished job cannot be cancelled again
+        response = api_client.post(
+            f"{BASE_URL}/api/leads/import-jobs/{job_id}/cancel",
+            headers={"Authorization": f"Bearer {cm_token}"}
+        )
+        assert response.status_code == 409
+        print(f"Import job ended as {job['status']}")
+
+
+class TestLeadImportWebhookKey(TestSetup):
+    """Test lead import webhook API key rotation and revocation"""
+    
+    def post_webhook(self, api_client, api_key):
+        timestamp = datetime.now().strftime('%H%M%S%f')
+        return api_client.post(
+            f"{BASE_URL}/api/leads/import/webhook",
+            params={"source": "shiksha", "api_key": api_key},
+            json={"name": f"Webhook Lead {timestamp}", "email": f"webhook_{timestamp}@test.com"}
+        )
+    
+    def test_rotate_and_revoke_key(self, api_client, university_admin_token):
+        """Test a rotated key works, the old one stops working, and revoke disables it"""
+        headers = {"Authorization": f"Bearer {university_admin_token}"}
+        
+        response = api_client.post(f"{BASE_URL}/api/university/integrations/lead-import-key", headers=headers)
+        assert response.status_code == 200
+        first_key = response.json()["api_key"]
+        assert response.json()["key_prefix"] == first_key[:8]
+        
+        response = self.post_webhook(api_client, first_key)
+        assert response.status_code == 202
+        assert response.json()["total_rows"] == 1
+        
+        response = api_client.post(f"{BASE_URL}/api/university/integrations/lead-import-key", headers=headers)
+        assert response.status_code == 200
+        second_key = response.json()["api_key"]
+        assert second_key != first_key
+        
+        # Other workers drop the old key at their next cache sync
+        time.sleep(3)
+        assert self.post_webhook(api_client, first_key).status_code == 401
+        assert self.post_webhook(api_client, second_key).status_code == 202
+        
+        response = api_client.delete(f"{BASE_URL}/api/university/integrations/lead-import-key", headers=headers)
+        assert response.status_code == 200
+        time.sleep(3)
+        assert self.post_webhook(api_client, second_key).status_code == 401
+        
+        # Nothing left to revoke
+        response = api_client.delete(f"{BASE_URL}/api/university/integrations/lead-import-key", headers=headers)
+        assert response.status_code == 404
+        print("Lead import key rotation and revocation verified")
+    
+    def test_webhook_rejects_unknown_key(self, api_client):
+        """Test the webhook returns 401 for a key that was never issued"""
+        assert self.post_webhook(api_client, "uli_not-a-real-key").status_code == 401
+        # Served from the negative cache the second time; still rejected
+        assert self.post_webhook(api_client, "uli_not-a-real-key").status_code == 401
+
+
 class TestAssignmentRules(TestSetup):
     """Test Assignment Rules feature"""
     
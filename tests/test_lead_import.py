@@ -0,0 +1,179 @@
+"""
+Test Lead Import
+Tests for:
+- Duplicates within an import and against stored leads, however typed
+- Per-row failures and their row numbers
+- BulkWriteError accounting: inserted rows counted, failed rows reported
+"""
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from services.lead_import import ROW_NUMBER_FIELD, LeadImporter, build_bulk_upload_lead
+
+JOB = {"university_id": "uni-1", "created_by": "user-1", "created_by_name": "Test Manager"}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeLeads:
+    """The slice of the leads collection LeadImporter uses"""
+
+    def __init__(self, existing=(), fail_indexes=()):
+        self.docs = list(existing)
+        self.fail_indexes = set(fail_indexes)
+        self.find_calls = 0
+        self.insert_calls = 0
+
+    def find(self, query, projection=None):
+        self.find_calls += 1
+        emails, phones = set(), set()
+        for condition in query["$or"]:
+            emails |= set(condition.get("email", {}).get("$in", []))
+            phones |= set(condition.get("phone", {}).get("$in", []))
+        return FakeCursor([
+            doc for doc in self.docs
+            if doc["university_id"] == query["university_id"] and (doc["email"] in emails or doc["phone"] in phones)
+        ])
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        errors = [
+            {"index": index, "code": 11000, "errmsg": f"E11000 duplicate key error for {doc['email']}"}
+            for index, doc in enumerate(docs) if index in self.fail_indexes
+        ]
+        inserted = [doc for index, doc in enumerate(docs) if index not in self.fail_indexes]
+        self.docs.extend(inserted)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+
+
+def import_rows(collection, rows, batch_size=1000):
+    importer = LeadImporter(collection, JOB["university_id"], lambda row: build_bulk_upload_lead(row, JOB))
+    return asyncio.run(importer.add_rows(rows, batch_size=batch_size))
+
+
+def stored(email="", phone=""):
+    return {"university_id": JOB["university_id"], "email": email, "phone": phone}
+
+
+class TestDuplicates:
+    """Duplicate detection"""
+
+    def test_duplicates_within_import(self):
+        """Rows repeating an earlier row's email or phone, however typed, are duplicates"""
+        collection = FakeLeads()
+        result = import_rows(collection, [
+            {"name": "A", "email": "asha@example.com", "phone": "+91 98765-43210"},
+            {"name": "B", "email": " ASHA@Example.com "},
+            {"name": "C", "email": "chetan@example.com", "phone": "919876543210"},
+            {"name": "D", "email": "dev@example.com"}
+        ])
+        assert result.as_dict() == {"created": 2, "failed": 0, "duplicates": 2}
+        assert [doc["email"] for doc in collection.docs] == ["asha@example.com", "dev@example.com"]
+        assert collection.docs[0]["phone"] == "919876543210"
+        print("✓ Duplicates within an import")
+
+    def test_duplicates_of_stored_leads(self):
+        """Rows matching a stored lead are duplicates, including a lead stored
+        as typed before normalization when the row repeats it as typed"""
+        collection = FakeLeads(existing=[
+            stored(email="old@example.com", phone="919876543210"),
+            stored(email="Typed@Example.com", phone="+91 11111 22222")
+        ])
+        result = import_rows(collection, [
+            {"name": "A", "email": "OLD@example.com"},
+            {"name": "B", "email": "Typed@Example.com"},
+            {"name": "C", "email": "c@example.com", "phone": "+91 98765-43210"},
+            {"name": "D", "email": "new@example.com", "phone": "+91 11111 22222"},
+            {"name": "E", "email": "e@example.com"}
+        ])
+        assert result.as_dict() == {"created": 1, "failed": 0, "duplicates": 4}
+        print("✓ Duplicates of stored leads")
+
+    def test_other_university_is_not_a_duplicate(self):
+        collection = FakeLeads(existing=[{"university_id": "uni-2", "email": "a@example.com", "phone": ""}])
+        result = import_rows(collection, [{"name": "A", "email": "a@example.com"}])
+        assert result.created == 1 and result.duplicates == 0
+        print("✓ Duplicates are per university")
+
+    def test_one_query_per_chunk(self):
+        """Each chunk costs one find and one insert_many"""
+        collection = FakeLeads()
+        rows = [{"name": f"L{n}", "email": f"l{n}@example.com"} for n in range(25)]
+        result = import_rows(collection, rows, batch_size=10)
+        assert result.created == 25
+        assert collection.find_calls == 3 and collection.insert_calls == 3
+        print("✓ One round trip pair per chunk")
+
+
+class TestFailures:
+    """Failed rows and their numbers"""
+
+    def test_invalid_rows_fail_with_row_numbers(self):
+        collection = FakeLeads()
+        result = import_rows(collection, [
+            {"name": "A", "email": "a@example.com"},
+            {"email": "no-name@example.com"},
+            {"name": "No contact"},
+            {"name": "Bad email", "email": "not-an-email"},
+            {"name": "B", "email": "b@example.com", "phone": "98765"}
+        ])
+        assert result.as_dict() == {"created": 2, "failed": 3, "duplicates": 0}
+        assert [error["row"] for error in result.errors] == [2, 3, 4]
+        print("✓ Invalid rows fail with their row numbers")
+
+    def test_row_number_field(self):
+        """Rows from a file report the file line they came from"""
+        result = import_rows(FakeLeads(), [
+            {"name": "A", "email": "a@example.com", ROW_NUMBER_FIELD: 2},
+            {"email": "x@example.com", ROW_NUMBER_FIELD: 5}
+        ])
+        assert result.errors[0]["row"] == 5
+        print("✓ File line numbers in errors")
+
+    def test_numbering_continues_across_chunks(self):
+        rows = [{"name": f"L{n}", "email": f"l{n}@example.com"} for n in range(12)]
+        rows[10] = {"name": "Broken"}
+        result = import_rows(FakeLeads(), rows, batch_size=5)
+        assert result.errors == [{"row": 11, "error": result.errors[0]["error"]}]
+        print("✓ Row numbers continue across chunks")
+
+
+class TestBulkWriteErrors:
+    """Partial insert_many failures"""
+
+    def test_bulk_write_error_accounting(self):
+        """Inserted rows count as created; each write error fails its own row"""
+        collection = FakeLeads(fail_indexes={1, 3})
+        result = import_rows(collection, [
+            {"name": "A", "email": "a@example.com"},
+            {"name": "B", "email": "b@example.com"},
+            {"email": "invalid@example.com"},
+            {"name": "C", "email": "c@example.com"},
+            {"name": "D", "email": "d@example.com"}
+        ])
+        assert result.as_dict() == {"created": 2, "failed": 3, "duplicates": 0}
+        # Insert indexes 1 and 3 are rows 2 and 5: row 3 never reached the insert
+        assert sorted(error["row"] for error in result.errors) == [2, 3, 5]
+        assert any("E11000" in error["error"] for error in result.errors)
+        print("✓ BulkWriteError accounting")
+
+    def test_counts_cover_every_row(self):
+        """created + failed + duplicates equals the rows given"""
+        collection = FakeLeads(existing=[stored(email="dup@example.com")], fail_indexes={0})
+        rows = [
+            {"name": "A", "email": "a@example.com"},
+            {"name": "Dup", "email": "dup@example.com"},
+            {"name": "B", "email": "b@example.com"},
+            {"email": "bad@example.com"}
+        ]
+        result = import_rows(collection, rows)
+        assert result.created + result.failed + result.duplicates == len(rows)
+        print("✓ Counts cover every row")
@@ -0,0 +1,175 @@
+"""
+Test Query Result Cache
+Tests for:
+- Cached results are served until the TTL lapses
+- Concurrent misses on one key share a single compute (single-flight)
+- Errors reach every waiter and are not cached
+- A cancelled leader hands the compute to a waiter
+"""
+import asyncio
+
+import pytest
+
+from services.query_cache import QueryCache
+
+
+class Compute:
+    """Counts calls; each call waits for release before returning"""
+
+    def __init__(self, value="result", error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return f"{self.value}-{self.calls}"
+
+
+async def settle():
+    """Let every ready task run until it blocks"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestQueryCache:
+    """Caching and TTL"""
+
+    def test_hit_within_ttl(self):
+        """A second read within the TTL does not recompute"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            compute = Compute()
+            compute.release.set()
+            assert await cache.get_or_compute("k", compute) == "result-1"
+            assert await cache.get_or_compute("k", compute) == "result-1"
+            assert compute.calls == 1
+            assert cache.hits == 1 and cache.misses == 1
+
+        asyncio.run(run())
+        print("✓ Cached within TTL")
+
+    def test_recompute_after_ttl(self):
+        """An expired entry is computed again"""
+        async def run():
+            cache = QueryCache(ttl=0)
+            compute = Compute()
+            compute.release.set()
+            await cache.get_or_compute("k", compute)
+            assert await cache.get_or_compute("k", compute) == "result-2"
+
+        asyncio.run(run())
+        print("✓ Recomputed after TTL")
+
+    def test_bounded_size(self):
+        """The oldest entries are dropped beyond max_entries"""
+        async def run():
+            cache = QueryCache(ttl=60, max_entries=2)
+            for key in ("a", "b", "c"):
+                compute = Compute(key)
+                compute.release.set()
+                await cache.get_or_compute(key, compute)
+            assert cache.stats()["size"] == 2
+            assert "a" not in cache._entries
+
+        asyncio.run(run())
+        print("✓ Size bounded")
+
+
+class TestSingleFlight:
+    """Concurrent misses on one key"""
+
+    def test_concurrent_misses_share_one_compute(self):
+        """Ten concurrent readers cause one compute and all get its result"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            compute = Compute()
+            readers = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(10)]
+            await settle()
+            compute.release.set()
+            results = await asyncio.gather(*readers)
+            assert results == ["result-1"] * 10
+            assert compute.calls == 1
+            assert cache.coalesced == 9
+            assert cache.stats()["inflight"] == 0
+
+        asyncio.run(run())
+        print("✓ Single compute for concurrent misses")
+
+    def test_different_keys_compute_separately(self):
+        """Single-flight is per key"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            compute = Compute()
+            compute.release.set()
+            await asyncio.gather(cache.get_or_compute("a", compute), cache.get_or_compute("b", compute))
+            assert compute.calls == 2
+
+        asyncio.run(run())
+        print("✓ Keys computed separately")
+
+    def test_error_reaches_waiters_and_is_not_cached(self):
+        """Waiters get the leader's error; the next read computes again"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            compute = Compute(error=RuntimeError("boom"))
+            readers = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+            await settle()
+            compute.release.set()
+            results = await asyncio.gather(*readers, return_exceptions=True)
+            assert all(isinstance(result, RuntimeError) for result in results)
+            assert compute.calls == 1
+
+            retry = Compute()
+            retry.release.set()
+            assert await cache.get_or_compute("k", retry) == "result-1"
+
+        asyncio.run(run())
+        print("✓ Errors shared, not cached")
+
+    def test_cancelled_leader_hands_over_to_waiter(self):
+        """When the computing request is cancelled, a waiter computes instead"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            leader_compute = Compute("leader")
+            leader = asyncio.create_task(cache.get_or_compute("k", leader_compute))
+            await settle()
+
+            waiter_compute = Compute("waiter")
+            waiter_compute.release.set()
+            waiter = asyncio.create_task(cache.get_or_compute("k", waiter_compute))
+            await settle()
+
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            assert await waiter == "waiter-1"
+            assert leader_compute.calls == 1 and waiter_compute.calls == 1
+            assert cache.stats()["inflight"] == 0
+
+        asyncio.run(run())
+        print("✓ Cancelled leader hands over")
+
+    def test_cancelled_waiter_does_not_cancel_leader(self):
+        """A waiter going away leaves the shared compute running"""
+        async def run():
+            cache = QueryCache(ttl=60)
+            compute = Compute()
+            leader = asyncio.create_task(cache.get_or_compute("k", compute))
+            await settle()
+            waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+            await settle()
+
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            compute.release.set()
+            assert await leader == "result-1"
+            assert compute.calls == 1
+
+        asyncio.run(run())
+        print("✓ Cancelled waiter leaves leader running")
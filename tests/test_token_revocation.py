@@ -0,0 +1,212 @@
+"""
+Test Token Revocation List
+Tests for:
+- BloomFilter never reports a revoked id as absent
+- refresh() picks up ids revoked by other workers from the watermark
+- User cutoffs revoke tokens issued before them
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from services.token_revocation import WATERMARK_SAFETY, BloomFilter, TokenRevocationList
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeRevokedTokens:
+    """The slice of the revoked_tokens collection the revocation list uses"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None):
+        docs = list(self.docs.values())
+        if query:
+            since = query["revoked_at"]["$gte"]
+            docs = [doc for doc in docs if doc["revoked_at"] >= since]
+        return FakeCursor([dict(doc) for doc in docs])
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["jti"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["jti"], {"jti": query["jti"]})
+        doc.update(update.get("$set", {}))
+        for key, value in update.get("$setOnInsert", {}).items():
+            doc.setdefault(key, value)
+
+    def insert(self, jti, revoked_at):
+        """A revocation written directly, as another worker would"""
+        self.docs[jti] = {"jti": jti, "user_id": "u1", "revoked_at": revoked_at}
+
+
+def make_revocation_list(collection) -> TokenRevocationList:
+    revocations = TokenRevocationList()
+    revocations._collection = collection
+    return revocations
+
+
+class TestBloomFilter:
+    """BloomFilter membership"""
+
+    def test_no_false_negatives(self):
+        """Every added key is reported present, even past capacity"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [uuid.uuid4().hex for _ in range(3000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+        assert bloom.count == 3000
+        print("✓ No false negatives over 3x capacity")
+
+    def test_false_positive_rate_within_capacity(self):
+        """Within capacity the false positive rate stays near the configured one"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for _ in range(5000):
+            bloom.add(uuid.uuid4().hex)
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(20000))
+        assert false_positives / 20000 < 0.03
+        print(f"✓ False positive rate {false_positives / 20000:.4f}")
+
+    def test_empty_filter(self):
+        """An empty filter contains nothing"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.001)
+        assert "anything" not in bloom
+        print("✓ Empty filter is empty")
+
+
+class TestRevocationRefresh:
+    """Keeping a worker's filter in sync with revoked_tokens"""
+
+    def test_rebuild_loads_existing_revocations(self):
+        """rebuild() loads every revoked id and sets the watermark to the newest"""
+        async def run():
+            collection = FakeRevokedTokens()
+            now = datetime.now(timezone.utc)
+            collection.insert("a", now - timedelta(minutes=2))
+            collection.insert("b", now - timedelta(minutes=1))
+            revocations = make_revocation_list(collection)
+            await revocations.rebuild()
+            assert await revocations.is_revoked("a")
+            assert await revocations.is_revoked("b")
+            assert not await revocations.is_revoked("c")
+            assert revocations._watermark == now - timedelta(minutes=1)
+
+        asyncio.run(run())
+        print("✓ Rebuild loads existing revocations")
+
+    def test_refresh_picks_up_other_workers_revocations(self):
+        """Ids revoked after the watermark reach the filter on refresh"""
+        async def run():
+            collection = FakeRevokedTokens()
+            revocations = make_revocation_list(collection)
+            await revocations.rebuild()
+
+            collection.insert("late", datetime.now(timezone.utc))
+            assert "late" not in revocations._filter
+            await revocations.refresh()
+            assert await revocations.is_revoked("late")
+
+        asyncio.run(run())
+        print("✓ Refresh adds new revocations")
+
+    def test_refresh_rereads_the_safety_window(self):
+        """An id committed late with revoked_at just before the watermark is not missed"""
+        async def run():
+            collection = FakeRevokedTokens()
+            now = datetime.now(timezone.utc)
+            collection.insert("first", now)
+            revocations = make_revocation_list(collection)
+            await revocations.rebuild()
+
+            # Stamped before the watermark by a slower worker, committed after the rebuild
+            collection.insert("straggler", now - WATERMARK_SAFETY / 2)
+            await revocations.refresh()
+            assert await revocations.is_revoked("straggler")
+
+        asyncio.run(run())
+        print("✓ Refresh covers late commits inside the safety window")
+
+    def test_refresh_does_not_recount_overlap(self):
+        """Ids re-read in the overlap are not added to the filter twice"""
+        async def run():
+            collection = FakeRevokedTokens()
+            collection.insert("a", datetime.now(timezone.utc))
+            revocations = make_revocation_list(collection)
+            await revocations.rebuild()
+            await revocations.refresh()
+            await revocations.refresh()
+            assert revocations._filter.count == 1
+
+        asyncio.run(run())
+        print("✓ Overlap is not recounted")
+
+    def test_revoke_is_visible_immediately(self):
+        """The revoking worker sees its own revocation without a refresh"""
+        async def run():
+            collection = FakeRevokedTokens()
+            revocations = make_revocation_list(collection)
+            await revocations.rebuild()
+            await revocations.revoke("mine", "u1", datetime.now(timezone.utc) + timedelta(hours=1))
+            assert await revocations.is_revoked("mine")
+
+        asyncio.run(run())
+        print("✓ Own revocation visible immediately")
+
+
+class TestUserCutoffs:
+    """Revoking every token of a user"""
+
+    def test_cutoff_revokes_older_tokens_on_every_worker(self):
+        """Tokens issued before the cutoff are rejected once each worker syncs"""
+        async def run():
+            collection = FakeRevokedTokens()
+            revoking, other = make_revocation_list(collection), make_revocation_list(collection)
+            await revoking.rebuild()
+            await other.rebuild()
+
+            issued_before = time.time()
+            await revoking.revoke_user("u1", timedelta(hours=24))
+            assert revoking.is_user_revoked("u1", issued_before)
+            assert not other.is_user_revoked("u1", issued_before)
+
+            await other.refresh()
+            assert other.is_user_revoked("u1", issued_before)
+            assert not other.is_user_revoked("u1", time.time())
+            assert not other.is_user_revoked("u2", issued_before)
+
+        asyncio.run(run())
+        print("✓ User cutoff reaches every worker")
+
+    def test_token_without_iat_predates_cutoff(self):
+        """Tokens from before iat was issued count as older than any cutoff"""
+        async def run():
+            revocations = make_revocation_list(FakeRevokedTokens())
+            await revocations.rebuild()
+            await revocations.revoke_user("u1", timedelta(hours=24))
+            assert revocations.is_user_revoked("u1", None)
+
+        asyncio.run(run())
+        print("✓ Tokens without iat are revoked by a cutoff")
+
+    def test_rebuild_keeps_cutoffs_out_of_filter(self):
+        """A rebuild restores cutoffs without adding them to the Bloom filter"""
+        async def run():
+            collection = FakeRevokedTokens()
+            await make_revocation_list(collection).revoke_user("u1", timedelta(hours=24))
+            fresh = make_revocation_list(collection)
+            await fresh.rebuild()
+            assert fresh.is_user_revoked("u1", 0)
+            assert fresh._filter.count == 0
+
+        asyncio.run(run())
+        print("✓ Rebuild restores user cutoffs")